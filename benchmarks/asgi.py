@@ -0,0 +1,189 @@
+"""Нагрузочный тест страниц заметок: WSGI против ASGI.
+
+Запросы подаются прямо в обработчики Django, без сети и без сервера,
+с заданным числом одновременных запросов. Сравниваются три режима:
+
+* wsgi — синхронные представления, пул потоков как у gthread-сервера;
+* asgi-sync — синхронные представления под ASGI (через пул адаптера);
+* asgi-async — асинхронные представления (NOTES_ASYNC_VIEWS=1).
+
+Каждый режим запускается в отдельном процессе со своей тестовой базой:
+
+    python benchmarks/asgi.py --concurrency 64 --requests 3000
+
+Кеш готовых страниц отключён, чтобы все режимы честно отрисовывали
+страницу; включить его можно флагом --page-cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import setup_django, summary, test_database, wsgi_request
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def prepare(args):
+    """Создаёт автора с заметками; возвращает cookie сессии и адреса."""
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    author = get_user_model().objects.create(username='bench')
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {i}', text='Текст заметки. ' * 50,
+             slug=f'note-{i}', author=author)
+        for i in range(args.notes)
+    )
+    client = Client()
+    client.force_login(author)
+    cookie = f'{settings.SESSION_COOKIE_NAME}=' + (
+        client.cookies[settings.SESSION_COOKIE_NAME].value
+    )
+    paths = [reverse('notes:list')] + [
+        reverse('notes:detail', args=(f'note-{i}',))
+        for i in range(0, args.notes, max(1, args.notes // 20))
+    ]
+    return cookie, paths
+
+
+def run_wsgi(paths, cookie, args):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+
+    def call(path):
+        status, elapsed = wsgi_request(handler, 'GET', path, cookie)
+        return status == 200, elapsed
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(call, paths))
+        return results, time.perf_counter() - started
+
+
+def run_asgi(paths, cookie, args):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+
+    async def call(path):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'), (b'cookie', cookie.encode()),
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        sent = []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {'type': 'http.request', 'body': b''}
+            # Клиент не отключается: обработчик сам отменит ожидание.
+            await asyncio.Future()
+
+        statuses = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        started = time.perf_counter()
+        await handler(scope, receive, send)
+        return statuses[0] == 200, (time.perf_counter() - started) * 1000
+
+    async def main():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited(path):
+            async with semaphore:
+                return await call(path)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(limited(path) for path in paths))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def run_mode(args):
+    """Один режим в текущем процессе; печатает результат в JSON."""
+    setup_django()
+    from django.conf import settings
+
+    if not args.page_cache:
+        settings.CACHES[settings.NOTES_CACHE_ALIAS] = {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    with test_database():
+        cookie, paths = prepare(args)
+        workload = [
+            paths[i % len(paths)] for i in range(args.requests)
+        ]
+        runner = run_wsgi if args.mode == 'wsgi' else run_asgi
+        # Прогрев: шаблоны, соединения, кеш транслитерации.
+        runner(paths, cookie, args)
+        results, elapsed = runner(workload, cookie, args)
+    failed = sum(1 for ok, _ in results if not ok)
+    stats = summary([latency for _, latency in results])
+    stats.update(
+        mode=args.mode, failed=failed, rps=len(results) / elapsed,
+        async_views=settings.NOTES_ASYNC_VIEWS,
+    )
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--page-cache', action='store_true')
+    args = parser.parse_args()
+    if args.mode:
+        return run_mode(args)
+
+    print(f'{"режим":<12} {"rps":>8} {"p50":>9} {"p99":>9} {"ошибок":>7}')
+    for mode in MODES:
+        env = dict(
+            os.environ, NOTES_ASYNC_VIEWS='1' if mode == 'asgi-async' else '0'
+        )
+        command = [sys.executable, __file__, '--mode', mode] + [
+            f'--{name}={value}' for name, value in (
+                ('notes', args.notes),
+                ('requests', args.requests),
+                ('concurrency', args.concurrency),
+            )
+        ] + (['--page-cache'] if args.page_cache else [])
+        output = subprocess.run(
+            command, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        stats = json.loads(output.strip().splitlines()[-1])
+        print(
+            f'{mode:<12} {stats["rps"]:8.1f} {stats["p50"]:7.2f}ms '
+            f'{stats["p99"]:7.2f}ms {stats["failed"]:>7}'
+        )
+
+
+if __name__ == '__main__':
+    main()
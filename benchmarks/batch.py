@@ -0,0 +1,100 @@
+"""Бенчмарк пакетного API против HTML-форм.
+
+Создаёт, изменяет и удаляет --notes заметок двумя способами:
+по одной заметке через формы (POST и переход на notes:success, как
+делает скрипт, повторяющий действия браузера) и одним запросом
+к notes:batch на каждый вид операций:
+
+    python benchmarks/batch.py --notes 1000
+"""
+import argparse
+import json
+import time
+
+from common import setup_django, test_database
+
+
+def timed(name, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f'{name:<28} {elapsed:8.2f}s {count / elapsed:10.0f} заметок/с')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    count = args.notes
+    with test_database():
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(get_user_model().objects.create(username='bench'))
+        client.get(reverse('notes:add'))
+        token = client.cookies['csrftoken'].value
+
+        def form(name, args=(), data=None):
+            client.post(
+                reverse(name, args=args),
+                dict(data or {}, csrfmiddlewaretoken=token), follow=True,
+            )
+
+        def batch(operations):
+            response = client.post(
+                reverse('notes:batch'),
+                json.dumps({'operations': operations}),
+                content_type='application/json', HTTP_X_CSRFTOKEN=token,
+            )
+            assert response.json()['failed'] == 0, response.json()
+
+        totals = {'forms': 0, 'batch': 0}
+        for path, prefix in (('forms', 'form'), ('batch', 'api')):
+            slugs = [f'{prefix}-{i}' for i in range(count)]
+            creates = [
+                {'title': f'Заметка {i}', 'text': 'Текст', 'slug': slug}
+                for i, slug in enumerate(slugs)
+            ]
+            if path == 'forms':
+                steps = (
+                    ('create', lambda: [
+                        form('notes:add', data=data) for data in creates
+                    ]),
+                    ('update', lambda: [
+                        form('notes:edit', (slug,), dict(data, text='Новый'))
+                        for slug, data in zip(slugs, creates)
+                    ]),
+                    ('delete', lambda: [
+                        form('notes:delete', (slug,)) for slug in slugs
+                    ]),
+                )
+            else:
+                steps = (
+                    ('create', lambda: batch([
+                        {'op': 'create', 'data': data} for data in creates
+                    ])),
+                    ('update', lambda: batch([
+                        {'op': 'update', 'slug': slug,
+                         'data': {'text': 'Новый'}}
+                        for slug in slugs
+                    ])),
+                    ('delete', lambda: batch([
+                        {'op': 'delete', 'slug': slug} for slug in slugs
+                    ])),
+                )
+            for op, func in steps:
+                totals[path] += timed(f'{path}: {op}', count, func)
+            assert not Note.objects.exists()
+        print(f'Пакетный API быстрее в '
+              f'{totals["forms"] / totals["batch"]:.1f} раз')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Общие утилиты бенчмарков.
+
+Бенчмарки запускаются как обычные скрипты из корня проекта, например
+``python benchmarks/search.py --notes 1000000``. Каждый создаёт
+отдельную тестовую базу во временном файле и удаляет её в конце.
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Настраивает Django на тестовую базу во временном файле."""
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    import django
+    from django.conf import settings
+
+    workdir = tempfile.mkdtemp(prefix='yanote-bench-')
+    for alias, database in settings.DATABASES.items():
+        database.setdefault('TEST', {})['NAME'] = os.path.join(
+            workdir, f'{alias}.sqlite3'
+        )
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Создаёт тестовые базы на время бенчмарка."""
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def wsgi_request(handler, method, path, cookie='', body=b'', headers=None):
+    """Передаёт запрос прямо в WSGI-обработчик Django.
+
+    Возвращает код ответа и длительность в мс.
+    """
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'testserver',
+        'HTTP_COOKIE': cookie,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        **(headers or {}),
+    }
+    statuses = []
+    started = time.perf_counter()
+    response = handler(
+        environ, lambda status, response_headers: statuses.append(status)
+    )
+    b''.join(response)
+    response.close()
+    elapsed = (time.perf_counter() - started) * 1000
+    return int(statuses[0].split()[0]), elapsed
+
+
+def measure(func, repeat):
+    """Вызывает func repeat раз и возвращает длительности в мс."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(samples):
+    return {
+        'count': len(samples),
+        'mean': statistics.fmean(samples),
+        'p50': percentile(samples, 0.50),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'max': max(samples),
+    }
+
+
+def report(name, samples):
+    """Печатает сводку по длительностям в мс."""
+    stats = summary(samples)
+    print(
+        f'{name:<40} n={stats["count"]:<6} '
+        f'p50={stats["p50"]:8.2f}ms p95={stats["p95"]:8.2f}ms '
+        f'p99={stats["p99"]:8.2f}ms max={stats["max"]:8.2f}ms'
+    )
+    return stats
+
+
+@contextmanager
+def timer(name):
+    """Печатает время выполнения блока."""
+    started = time.perf_counter()
+    yield
+    print(f'{name}: {time.perf_counter() - started:.2f}s')
@@ -0,0 +1,111 @@
+"""Бенчмарк сжатия длинных текстов заметок.
+
+Заметки похожи на вставленные журналы: строки с временем, уровнем
+и идентификаторами, в среднем по --text-kb КиБ. Сначала меряются
+размер таблицы notes_note и время открытия страницы заметки без
+сжатия, затем команда compress_notes сжимает все заметки (zlib,
+и zstd, если установлен пакет zstandard), и замеры повторяются.
+Перед замером размера база сжимается VACUUM, кеш страниц очищается
+перед каждым запросом:
+
+    python benchmarks/compression.py --notes 1000 --text-kb 64
+"""
+import argparse
+import random
+import time
+from io import StringIO
+
+from common import setup_django, summary, test_database
+
+LEVELS = ('INFO', 'INFO', 'INFO', 'DEBUG', 'WARNING', 'ERROR')
+
+
+def log_text(rng, size):
+    """Текст, похожий на журнал сервиса, примерно из size байт."""
+    lines = []
+    length = 0
+    while length < size:
+        line = (
+            f'2024-05-{rng.randint(1, 28):02} '
+            f'{rng.randint(0, 23):02}:{rng.randint(0, 59):02}:'
+            f'{rng.randint(0, 59):02}.{rng.randint(0, 999):03} '
+            f'{rng.choice(LEVELS):<7} worker-{rng.randint(1, 16)} '
+            f'request_id={rng.getrandbits(64):016x} '
+            f'GET /api/items/{rng.randint(1, 10 ** 6)} '
+            f'status={rng.choice((200, 200, 200, 404, 500))} '
+            f'duration={rng.uniform(0, 900):.1f}ms'
+        )
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--text-kb', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.cache import caches
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes import compression
+    from notes.models import Note
+
+    methods = ['off', 'zlib'] + (['zstd'] if compression.zstandard else [])
+    rng = random.Random(0)
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        for start in range(0, args.notes, 100):
+            Note.objects.bulk_create(
+                Note(title=f'Журнал {i}', slug=f'log-{i}', author=author,
+                     text=log_text(rng, rng.randint(
+                         args.text_kb * 512, args.text_kb * 1536
+                     )))
+                for i in range(start, min(start + 100, args.notes))
+            )
+        client = Client()
+        client.force_login(author)
+        slugs = [f'log-{i}' for i in range(args.notes)]
+
+        def table_size():
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = 'notes_note'"
+                )
+                return cursor.fetchone()[0]
+
+        def read_latencies():
+            latencies = []
+            for _ in range(args.requests):
+                caches['notes'].clear()
+                url = reverse('notes:detail', args=(rng.choice(slugs),))
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200
+            return latencies
+
+        print(f'{"сжатие":<7} {"таблица":>10} {"пересжатие":>11} '
+              f'{"p50":>9} {"p95":>9}')
+        for method in methods:
+            settings.NOTES_TEXT_COMPRESSION = method
+            started = time.perf_counter()
+            call_command('compress_notes', stdout=StringIO())
+            elapsed = time.perf_counter() - started
+            size = table_size()
+            stats = summary(read_latencies())
+            print(f'{method:<7} {size / 2 ** 20:6.1f} МиБ {elapsed:10.1f}s '
+                  f'{stats["p50"]:7.2f}ms {stats["p95"]:7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Бенчмарк условных запросов к страницам заметок.
+
+Сравнивает полный ответ 200 и повторную проверку с If-None-Match (304)
+по времени и объёму переданных данных:
+
+    python benchmarks/conditional.py --notes 1000 --text-kb 50
+"""
+import argparse
+
+from common import measure, report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--text-kb', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import caches
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        text = ('Текст заметки. ' * (args.text_kb * 64))[:args.text_kb * 1024]
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {i}', text=text, slug=f'note-{i}',
+                 author=author)
+            for i in range(args.notes)
+        )
+        client = Client()
+        client.force_login(author)
+        urls = {
+            'detail': reverse(
+                'notes:detail', args=(f'note-{args.notes // 2}',)
+            ),
+            'list': reverse('notes:list'),
+        }
+        for name, url in urls.items():
+            client.get(url)
+            etag = client.get(url)['ETag']
+            sizes = {}
+
+            def full():
+                # Без кеша страниц: сравниваем с честной отрисовкой.
+                caches['notes'].clear()
+                sizes['full'] = len(client.get(url).content)
+
+            def revalidate():
+                caches['notes'].clear()
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                assert response.status_code == 304
+                sizes['revalidate'] = len(response.content)
+
+            full_stats = report(f'{name}: 200', measure(full, args.requests))
+            cond_stats = report(
+                f'{name}: 304', measure(revalidate, args.requests)
+            )
+            speedup = full_stats['p50'] / cond_stats['p50']
+            print(
+                f'{name}: тело {sizes["full"]} Б -> {sizes["revalidate"]} Б, '
+                f'p50 быстрее в {speedup:.1f} раз'
+            )
+
+
+if __name__ == '__main__':
+    main()
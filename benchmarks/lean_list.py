@@ -0,0 +1,93 @@
+"""Бенчмарк списка заметок с большими текстами.
+
+Заметки в среднем по --text-kb КиБ. Список пролистывается целиком
+дважды: с полными строками заметок (как раньше) и с лёгкими, без
+текста (NoteQuerySet.summaries). Кеш страниц очищается перед каждым
+запросом, чтобы мерить чтение из базы, а не из кеша:
+
+    python benchmarks/lean_list.py --notes 1000 --text-kb 100
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from contextlib import nullcontext
+from unittest import mock
+
+from common import setup_django, summary, test_database
+
+MODES = ('full', 'lean')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--text-kb', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import caches
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note, NoteQuerySet
+
+    rng = random.Random(0)
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        for start in range(0, args.notes, 100):
+            Note.objects.bulk_create(
+                Note(title=f'Заметка {i}', slug=f'note-{i}', author=author,
+                     text='x' * rng.randint(
+                         args.text_kb * 512, args.text_kb * 1536
+                     ))
+                for i in range(start, min(start + 100, args.notes))
+            )
+        client = Client()
+        client.force_login(author)
+        url = reverse('notes:list')
+
+        def walk(traced=False):
+            """Пролистывает список; отдаёт время и пик памяти страниц."""
+            params = {}
+            while True:
+                caches['notes'].clear()
+                if traced:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                response = client.get(url, params)
+                elapsed = (time.perf_counter() - started) * 1000
+                peak = 0
+                if traced:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                yield elapsed, peak
+                page = response.context['page_obj']
+                if not page.has_next():
+                    return
+                params = {'after': page.next_cursor}
+
+        print(f'{"режим":<6} {"страниц":>8} {"p50":>9} {"p95":>9} '
+              f'{"пик памяти":>12}')
+        for mode in MODES:
+            patch = (
+                mock.patch.object(
+                    NoteQuerySet, 'summaries', lambda queryset: queryset
+                )
+                if mode == 'full' else nullcontext()
+            )
+            with patch:
+                latencies = [
+                    elapsed
+                    for _ in range(args.rounds) for elapsed, _ in walk()
+                ]
+                peak = max(peak for _, peak in walk(traced=True))
+            stats = summary(latencies)
+            print(f'{mode:<6} {stats["count"]:8} {stats["p50"]:7.1f}ms '
+                  f'{stats["p95"]:7.1f}ms {peak / 2 ** 20:9.1f} МиБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк истории версий заметок.
+
+Заметка размером --text-kb КиБ правится --edits раз: каждая правка
+меняет несколько случайных строк. Печатается размер истории против
+полных копий текста, время записи правки и время восстановления
+каждой версии (худший случай — NOTES_REVISION_SNAPSHOT_INTERVAL - 1
+дельт), а также время страницы истории:
+
+    python benchmarks/revisions.py --text-kb 256 --edits 200
+"""
+import argparse
+import random
+import time
+
+from common import measure, report, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--text-kb', type=int, default=256)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--lines-per-edit', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note, NoteRevision
+    from notes.revisions import revision_text
+
+    rng = random.Random(0)
+    lines = []
+    while sum(map(len, lines)) < args.text_kb * 1024:
+        lines.append(
+            f'{len(lines):06} ' + ' '.join(
+                rng.choice(('запрос', 'ответ', 'кеш', 'шард', 'индекс'))
+                for _ in range(8)
+            ) + '\n'
+        )
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        note = Note.objects.create(
+            title='Журнал', slug='log', text=''.join(lines), author=author
+        )
+        texts = [note.text]
+        saves = []
+        for _ in range(args.edits):
+            for _ in range(args.lines_per_edit):
+                index = rng.randrange(len(lines))
+                lines[index] = f'{index:06} правка {rng.random()}\n'
+            note.text = ''.join(lines)
+            started = time.perf_counter()
+            note.save()
+            saves.append((time.perf_counter() - started) * 1000)
+            texts.append(note.text)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat "
+                "WHERE name = 'notes_noterevision'"
+            )
+            stored = cursor.fetchone()[0]
+        full = sum(len(text.encode()) for text in texts[:-1])
+        snapshots = NoteRevision.objects.filter(is_snapshot=True).count()
+        print(f'версий: {args.edits}, снимков: {snapshots} '
+              f'(каждая {settings.NOTES_REVISION_SNAPSHOT_INTERVAL}-я)')
+        print(f'полные копии: {full / 2 ** 20:.1f} МиБ, '
+              f'история: {stored / 2 ** 20:.2f} МиБ')
+        report('запись правки', saves)
+
+        stored_revisions = list(
+            NoteRevision.objects.summaries().order_by('number')
+        )
+        timings = []
+        for revision in stored_revisions:
+            started = time.perf_counter()
+            text = revision_text(revision)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert text == texts[revision.number - 1]
+        report('восстановление версии', timings)
+
+        client = Client()
+        client.force_login(author)
+        url = reverse('notes:history', args=(note.slug,))
+        report('страница истории', measure(lambda: client.get(url), 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""Бенчмарк задержки всех маршрутов приложения.
+
+Наполняет базу пользователями (--users), заметками (--notes-per-user)
+с текстами по --text-kb КиБ и замеряет каждый маршрут notes:* и users:*:
+p50/p95/p99 задержки и число SQL-запросов на запрос. Страницы
+с кешем меряются как есть, с прогретым кешем. Если маршрут появился
+в urls.py, а в бенчмарке его нет, запуск завершается ошибкой.
+
+Результаты сохраняются в JSON (--output) и сравниваются с прошлым
+запуском (--baseline). Маршрут считается регрессией, если выбранная
+метрика (--metric) выросла больше чем на --threshold (доля) и при этом
+больше чем на --min-delta-ms, либо если выросло число запросов.
+При регрессии скрипт завершается с кодом 1:
+
+    python benchmarks/routes.py --output before.json
+    python benchmarks/routes.py --baseline before.json --threshold 0.2
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import count
+
+from common import setup_django, summary, test_database
+
+PASSWORD = 'bench-password-1'
+
+
+def seed(args):
+    """Создаёт пользователей с заметками; отдаёт пользователей."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    from notes.models import Note
+
+    User = get_user_model()
+    # Хеш пароля считается один раз: PBKDF2 намеренно медленный.
+    password = make_password(PASSWORD)
+    users = User.objects.bulk_create(
+        User(username=f'bench-{i}', password=password)
+        for i in range(args.users)
+    )
+    text = ('Строка заметки: отчёт сервер запрос. ' * (
+        args.text_kb * 1024 // 40 + 1
+    ))[:args.text_kb * 1024]
+    for user in users:
+        Note.objects.bulk_create(
+            (Note(title=f'Заметка {i}', slug=f'note-{i}', text=text,
+                  author=user)
+             for i in range(args.notes_per_user)),
+            batch_size=1000,
+        )
+        # Пара правок — у первой заметки появляется история.
+        note = Note.objects.get(author=user, slug='note-0')
+        for number in range(2):
+            note.text = f'{text}\nПравка {number}'
+            note.save()
+    return users
+
+
+def build_cases(users, args):
+    """Маршрут → функция, которая делает i-й запрос клиентом."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    author = users[0]
+    # Заметки, которые удаляет маршрут delete, — по одной на запрос.
+    Note.objects.bulk_create(
+        Note(title=f'Удалить {i}', slug=f'delete-{i}', text='Текст',
+             author=author)
+        for i in range(args.requests + 1)
+    )
+    notes = args.notes_per_user
+    numbers = count()
+
+    def note_url(name, i, *extra):
+        return reverse(name, args=(f'note-{i % notes}', *extra))
+
+    def post_batch(client, i):
+        return client.post(
+            reverse('notes:batch'),
+            json.dumps({'operations': [
+                {'op': 'create',
+                 'data': {'title': f'Пакет {i}', 'text': 'Текст'}},
+                {'op': 'update', 'slug': f'note-{i % notes}',
+                 'data': {'text': f'Пакет {i}'}},
+            ]}),
+            content_type='application/json',
+        )
+
+    def post_import(client, i):
+        upload = SimpleUploadedFile(
+            'notes.jsonl',
+            ''.join(
+                json.dumps({'title': f'Импорт {i} {j}', 'text': 'Текст'},
+                           ensure_ascii=False) + '\n'
+                for j in range(10)
+            ).encode(),
+        )
+        return client.post(reverse('notes:import'), {'file': upload})
+
+    return {
+        'notes:home': lambda client, i: client.get(reverse('notes:home')),
+        'notes:add': lambda client, i: client.get(reverse('notes:add')),
+        'notes:add POST': lambda client, i: client.post(
+            reverse('notes:add'), {'title': f'Новая {i}', 'text': 'Текст'}
+        ),
+        'notes:import': lambda client, i: client.get(reverse('notes:import')),
+        'notes:import POST': post_import,
+        'notes:export jsonl': lambda client, i: client.get(
+            reverse('notes:export', args=('jsonl',))
+        ),
+        'notes:export csv': lambda client, i: client.get(
+            reverse('notes:export', args=('csv',))
+        ),
+        'notes:export zip': lambda client, i: client.get(
+            reverse('notes:export', args=('zip',))
+        ),
+        'notes:edit': lambda client, i: client.get(note_url('notes:edit', i)),
+        'notes:edit POST': lambda client, i: client.post(
+            note_url('notes:edit', i),
+            {'title': f'Заметка {i % notes}', 'text': f'Правка {i}',
+             'slug': f'note-{i % notes}'},
+        ),
+        'notes:detail': lambda client, i: client.get(
+            note_url('notes:detail', i)
+        ),
+        'notes:delete': lambda client, i: client.get(
+            note_url('notes:delete', i)
+        ),
+        'notes:delete POST': lambda client, i: client.post(
+            reverse('notes:delete', args=(f'delete-{i + 1}',))
+        ),
+        'notes:history': lambda client, i: client.get(
+            reverse('notes:history', args=('note-0',))
+        ),
+        'notes:revision': lambda client, i: client.get(
+            reverse('notes:revision', args=('note-0', 1 + i % 2))
+        ),
+        'notes:list': lambda client, i: client.get(reverse('notes:list')),
+        'notes:search': lambda client, i: client.get(
+            reverse('notes:search'), {'q': 'отчёт сервер'}
+        ),
+        'notes:batch POST': post_batch,
+        'notes:success': lambda client, i: client.get(
+            reverse('notes:success')
+        ),
+        'users:login': lambda client, i: client.get(reverse('users:login')),
+        'users:login POST': lambda client, i: client.post(
+            reverse('users:login'),
+            {'username': author.username, 'password': PASSWORD},
+        ),
+        'users:logout POST': lambda client, i: client.post(
+            reverse('users:logout')
+        ),
+        'users:signup': lambda client, i: client.get(reverse('users:signup')),
+        'users:signup POST': lambda client, i: client.post(
+            reverse('users:signup'),
+            {'username': f'signup-{next(numbers)}',
+             'password1': PASSWORD, 'password2': PASSWORD},
+        ),
+    }
+
+
+def route_names():
+    """Имена всех маршрутов notes:* и users:* из urls.py."""
+    from django.urls import get_resolver
+
+    names = set()
+    for namespace in ('notes', 'users'):
+        resolver = get_resolver().namespace_dict[namespace][1]
+        names.update(
+            f'{namespace}:{name}' for name in resolver.reverse_dict
+            if isinstance(name, str)
+        )
+    return names
+
+
+def run_case(call, author, requests):
+    """Задержки в мс и числа запросов к базе для requests вызовов."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    latencies = []
+    queries = []
+    # Первый запрос прогревает кеш и не учитывается.
+    for i in range(-1, requests):
+        # Вход не замеряется: logout и login выходят из сессии.
+        client.force_login(author)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = call(client, i)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code < 400, (response.status_code, i)
+        if i >= 0:
+            latencies.append(elapsed)
+            queries.append(len(captured))
+    stats = summary(latencies)
+    return {
+        'count': stats['count'],
+        'p50': stats['p50'],
+        'p95': stats['p95'],
+        'p99': stats['p99'],
+        'mean': stats['mean'],
+        'queries': statistics.median(queries),
+        'max_queries': max(queries),
+    }
+
+
+def compare(results, baseline, args):
+    """Маршруты, которые стали медленнее или делают больше запросов."""
+    regressions = []
+    for name, old in baseline['routes'].items():
+        new = results['routes'].get(name)
+        if new is None:
+            continue
+        before, after = old[args.metric], new[args.metric]
+        if (
+            after > before * (1 + args.threshold)
+            and after - before > args.min_delta_ms
+        ):
+            regressions.append(
+                f'{name}: {args.metric} {before:.2f} → {after:.2f} мс'
+            )
+        if new['queries'] > old['queries']:
+            regressions.append(
+                f'{name}: запросов {old["queries"]} → {new["queries"]}'
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--notes-per-user', type=int, default=500)
+    parser.add_argument('--text-kb', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument(
+        '--routes', nargs='*', help='Замерить только эти маршруты.',
+    )
+    parser.add_argument('--output', help='Куда сохранить результаты JSON.')
+    parser.add_argument('--baseline', help='Результаты JSON для сравнения.')
+    parser.add_argument(
+        '--metric', choices=('p50', 'p95', 'p99'), default='p95',
+    )
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+
+    # Выгрузка пишет в журнал строку на каждый запрос.
+    logging.disable(logging.INFO)
+
+    with test_database():
+        users = seed(args)
+        cases = build_cases(users, args)
+        missing = route_names() - {name.split()[0] for name in cases}
+        if missing:
+            parser.error(
+                'Нет замеров для маршрутов: ' + ', '.join(sorted(missing))
+            )
+        selected = args.routes or list(cases)
+        unknown = set(selected) - set(cases)
+        if unknown:
+            parser.error('Неизвестные маршруты: ' + ', '.join(sorted(unknown)))
+        results = {
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'users': args.users,
+                'notes_per_user': args.notes_per_user,
+                'text_kb': args.text_kb,
+                'requests': args.requests,
+            },
+            'routes': {},
+        }
+        print(f'{"маршрут":<20} {"p50":>9} {"p95":>9} {"p99":>9} '
+              f'{"запросов":>9}')
+        for name in selected:
+            stats = run_case(cases[name], users[0], args.requests)
+            results['routes'][name] = stats
+            print(f'{name:<20} {stats["p50"]:7.2f}ms {stats["p95"]:7.2f}ms '
+                  f'{stats["p99"]:7.2f}ms {stats["queries"]:9g}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args)
+        if regressions:
+            print('Регрессии:', *regressions, sep='\n  ')
+            sys.exit(1)
+        print('Регрессий нет.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Бенчмарк полнотекстового поиска.
+
+Наполняет базу заметками и замеряет время search_notes для
+случайных авторов и слов. Цель — p99 ниже --target-ms на 1M заметок:
+
+    python benchmarks/search.py --notes 1000000 --authors 1000
+"""
+import argparse
+import random
+from itertools import accumulate
+
+from common import measure, report, setup_django, test_database, timer
+
+LATIN = (
+    'report deploy server backup invoice meeting travel recipe budget '
+    'garden review release ticket sprint python django database query'
+).split()
+CYRILLIC = (
+    'отчёт встреча покупки рецепт бюджет поездка задача релиз сервер '
+    'заметка идея книга фильм список дача ремонт здоровье учёба'
+).split()
+SYLLABLES = 'ка ло ми ну ре со та фе ba ko li mu ne ro si tu'.split()
+
+
+def build_vocabulary(size, rng):
+    """Словарь с распределением Ципфа, как у живого текста."""
+    words = LATIN + CYRILLIC
+    known = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in known:
+            known.add(word)
+            words.append(word)
+    cum_weights = list(accumulate(1 / rank for rank in range(1, size + 1)))
+    return words, cum_weights
+
+
+VOCABULARY, CUM_WEIGHTS = build_vocabulary(20000, random.Random(1))
+
+
+def words(rng, count):
+    return rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=count)
+
+
+def seed(notes, authors, words_per_note, batch_size=10000):
+    from django.db import connection, transaction
+
+    rng = random.Random(42)
+    with connection.cursor() as cursor, transaction.atomic():
+        cursor.executemany(
+            'INSERT INTO auth_user (id, password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, date_joined) '
+            "VALUES (%s, '', 0, %s, '', '', '', 0, 1, '2024-01-01')",
+            [(pk, f'user{pk}') for pk in range(1, authors + 1)],
+        )
+    for start in range(0, notes, batch_size):
+        rows = []
+        for pk in range(start + 1, min(notes, start + batch_size) + 1):
+            title = ' '.join(words(rng, 3))
+            text = ' '.join(words(rng, words_per_note))
+            rows.append((pk, title, text, f'note-{pk}', pk % authors + 1))
+        with connection.cursor() as cursor, transaction.atomic():
+            cursor.executemany(
+                'INSERT INTO notes_note (id, title, text, slug, author_id) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=100000)
+    parser.add_argument('--authors', type=int, default=1000)
+    parser.add_argument('--words', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--target-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from notes.search import search_notes
+
+    with test_database():
+        with timer(f'Наполнение {args.notes} заметками'):
+            seed(args.notes, args.authors, args.words)
+        users = list(get_user_model().objects.all())
+        rng = random.Random(7)
+
+        def single_word():
+            search_notes(rng.choice(users), words(rng, 1)[0], 50)
+
+        def two_words():
+            search_notes(rng.choice(users), ' '.join(words(rng, 2)), 50)
+
+        def missing_word():
+            search_notes(rng.choice(users), 'несуществующее', 50)
+
+        worst = 0
+        for name, func in (
+            ('одно слово', single_word),
+            ('два слова', two_words),
+            ('нет совпадений', missing_word),
+        ):
+            stats = report(name, measure(func, args.queries))
+            worst = max(worst, stats['p99'])
+        verdict = 'OK' if worst < args.target_ms else 'FAIL'
+        print(f'p99 {worst:.2f}ms, цель {args.target_ms}ms: {verdict}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Микробенчмарк транслитерации заголовков.
+
+Сравнивает pytils.translit.slugify с кешированным notes.slugs на
+наборе заголовков, где популярные заголовки повторяются:
+
+    python benchmarks/slugs.py --titles 100000
+"""
+import argparse
+import random
+import time
+
+from common import setup_django
+
+WORDS = (
+    'заметка список покупок план встреча идея задача отчёт дела книга '
+    'фильм рецепт note todo meeting ideas draft report plan shopping'
+).split()
+
+
+def make_titles(count, distinct, rng):
+    """Заголовки из distinct вариантов с распределением Ципфа."""
+    variants = [
+        ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) + f' {number}'
+        for number in range(distinct)
+    ]
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    return rng.choices(variants, weights=weights, k=count)
+
+
+def run(name, func, titles):
+    started = time.perf_counter()
+    func(titles)
+    elapsed = time.perf_counter() - started
+    print(f'{name:<32} {elapsed * 1000:9.1f}ms '
+          f'{elapsed / len(titles) * 1e6:7.2f}us/заголовок')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100000)
+    parser.add_argument('--distinct', type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+    from pytils.translit import slugify
+
+    from notes import slugs
+
+    titles = make_titles(args.titles, args.distinct, random.Random(42))
+    max_length = 100
+
+    baseline = run(
+        'pytils.slugify',
+        lambda items: [slugify(title)[:max_length] for title in items],
+        titles,
+    )
+    slugs.slugify.cache_clear()
+    cold = run(
+        'make_slug, холодный кеш',
+        lambda items: [slugs.make_slug(title, max_length) for title in items],
+        titles,
+    )
+    warm = run(
+        'make_slug, тёплый кеш',
+        lambda items: [slugs.make_slug(title, max_length) for title in items],
+        titles,
+    )
+    slugs.slugify.cache_clear()
+    batch = run(
+        'make_slugs, холодный кеш',
+        lambda items: slugs.make_slugs(items, max_length),
+        titles,
+    )
+    print(f'Ускорение: холодный x{baseline / cold:.1f}, '
+          f'тёплый x{baseline / warm:.1f}, пакетный x{baseline / batch:.1f}')
+    print('Кеш:', slugs.cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Бенчмарк профилей базы: одновременные чтение и запись.
+
+Потоки-читатели открывают список и страницы заметок, потоки-писатели
+создают заметки через форму. Запросы идут прямо в WSGI-обработчик,
+поэтому соединения с базой открываются и закрываются так же, как на
+сервере. Каждый профиль запускается в отдельном процессе:
+
+    python benchmarks/sqlite_profile.py --readers 8 --writers 4
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from common import setup_django, summary, test_database, wsgi_request
+
+PROFILES = ('default', 'production')
+
+
+def run_profile(args):
+    """Нагрузка на один профиль; печатает результат в JSON."""
+    setup_django()
+    # Ошибки «database is locked» считаются, а не печатаются.
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    opened = []
+    connection_created.connect(
+        lambda **kwargs: opened.append(1), weak=False
+    )
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {i}', text='Текст заметки. ' * 50,
+                 slug=f'note-{i}', author=author)
+            for i in range(args.notes)
+        )
+        client = Client()
+        client.force_login(author)
+        client.get(reverse('notes:add'))
+        cookies = {
+            name: client.cookies[name].value
+            for name in (settings.SESSION_COOKIE_NAME, 'csrftoken')
+        }
+        cookie = '; '.join(
+            f'{name}={value}' for name, value in cookies.items()
+        )
+        handler = WSGIHandler()
+        add_url = reverse('notes:add')
+        list_url = reverse('notes:list')
+        opened.clear()
+        deadline = time.monotonic() + args.seconds
+
+        def reader(number):
+            rng = random.Random(number)
+            samples = []
+            while time.monotonic() < deadline:
+                if rng.random() < 0.2:
+                    path = list_url
+                else:
+                    slug = f'note-{rng.randrange(args.notes)}'
+                    path = reverse('notes:detail', args=(slug,))
+                status, elapsed = wsgi_request(handler, 'GET', path, cookie)
+                samples.append(('read', status == 200, elapsed))
+            return samples
+
+        def writer(number):
+            samples = []
+            counter = 0
+            while time.monotonic() < deadline:
+                counter += 1
+                body = urlencode({
+                    'title': f'Новая {number}-{counter}',
+                    'text': 'Текст',
+                    'csrfmiddlewaretoken': cookies['csrftoken'],
+                }).encode()
+                status, elapsed = wsgi_request(
+                    handler, 'POST', add_url, cookie, body,
+                    {'CONTENT_TYPE': 'application/x-www-form-urlencoded'},
+                )
+                samples.append(('write', status == 302, elapsed))
+            return samples
+
+        workers = [reader] * args.readers + [writer] * args.writers
+        with ThreadPoolExecutor(len(workers)) as executor:
+            futures = [
+                executor.submit(worker, number)
+                for number, worker in enumerate(workers)
+            ]
+            samples = [
+                sample for future in futures for sample in future.result()
+            ]
+    result = {
+        'profile': settings.NOTES_DB_PROFILE, 'connections': len(opened),
+    }
+    for kind in ('read', 'write'):
+        latencies = [ms for name, ok, ms in samples if name == kind and ok]
+        stats = summary(latencies) if latencies else {'count': 0}
+        stats['errors'] = sum(
+            1 for name, ok, _ in samples if name == kind and not ok
+        )
+        stats['rps'] = stats['count'] / args.seconds
+        result[kind] = stats
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profile', choices=PROFILES)
+    parser.add_argument('--notes', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    if args.profile:
+        return run_profile(args)
+
+    print(f'{"профиль":<11} {"операция":<9} {"в сек":>8} {"p50":>9} '
+          f'{"p99":>9} {"ошибок":>7} {"соединений":>11}')
+    for profile in PROFILES:
+        command = [sys.executable, __file__, '--profile', profile] + [
+            f'--{name}={getattr(args, name)}'
+            for name in ('notes', 'readers', 'writers', 'seconds')
+        ]
+        output = subprocess.run(
+            command, env=dict(os.environ, NOTES_DB_PROFILE=profile),
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        for kind in ('read', 'write'):
+            stats = result[kind]
+            latency = (
+                f'{stats["p50"]:7.2f}ms {stats["p99"]:7.2f}ms'
+                if stats['count'] else f'{"-":>9} {"-":>9}'
+            )
+            print(f'{profile:<11} {kind:<9} {stats["rps"]:8.1f} {latency} '
+                  f'{stats["errors"]:>7} {result["connections"]:>11}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Бенчмарк потоковой отдачи длинной заметки.
+
+Страница заметки размером --text-mb МиБ открывается в обычном
+режиме и в потоковом (NOTES_DETAIL_STREAMING), с текстом как есть
+и сжатым zlib. Меряются время до первого и до последнего байта
+и пик памяти на запрос; кеш страниц очищается перед каждым запросом:
+
+    python benchmarks/streaming.py --text-mb 20
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from common import setup_django, summary, test_database
+
+WORDS = ('запрос', 'ответ', 'ошибка', 'таймаут', 'worker', '<tag>', '&')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--text-mb', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.cache import caches
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    rng = random.Random(0)
+    words = []
+    length = 0
+    while length < args.text_mb * 2 ** 20:
+        word = rng.choice(WORDS) + str(rng.randint(0, 999))
+        words.append(word)
+        length += len(word.encode()) + 1
+    text = ' '.join(words)
+    del words
+
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        client = Client()
+        client.force_login(author)
+        urls = {}
+        for compression in ('off', 'zlib'):
+            settings.NOTES_TEXT_COMPRESSION = compression
+            note = Note.objects.create(
+                title=f'Журнал {compression}', slug=f'log-{compression}',
+                text=text, author=author,
+            )
+            urls[compression] = reverse('notes:detail', args=(note.slug,))
+
+        def fetch(url, traced=False):
+            """Время до первого и последнего байта и пик памяти."""
+            caches['notes'].clear()
+            if traced:
+                tracemalloc.start()
+            started = time.perf_counter()
+            response = client.get(url)
+            chunks = (
+                response.streaming_content if response.streaming
+                else [response.content]
+            )
+            first = None
+            for _ in chunks:
+                if first is None:
+                    first = time.perf_counter() - started
+            last = time.perf_counter() - started
+            peak = 0
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            return first * 1000, last * 1000, peak
+
+        print(f'{"хранение":<9} {"режим":<9} {"первый байт":>12} '
+              f'{"последний":>10} {"пик памяти":>12}')
+        for compression, url in urls.items():
+            for streaming in (False, True):
+                settings.NOTES_DETAIL_STREAMING = streaming
+                fetch(url)
+                samples = [fetch(url) for _ in range(args.rounds)]
+                first = summary([sample[0] for sample in samples])
+                last = summary([sample[1] for sample in samples])
+                peak = fetch(url, traced=True)[2]
+                mode = 'поток' if streaming else 'целиком'
+                print(f'{compression:<9} {mode:<9} {first["p50"]:10.1f}ms '
+                      f'{last["p50"]:8.1f}ms {peak / 2 ** 20:8.1f} МиБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Бенчмарк очереди записи с групповым коммитом.
+
+Множество потоков одновременно создают заметки через форму; запросы
+идут прямо в WSGI-обработчик. Сравниваются прямая запись и очередь
+(NOTES_WRITE_QUEUE=1), обе на production-профиле базы:
+
+    python benchmarks/write_queue.py --writers 128 --seconds 10
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from common import setup_django, summary, test_database, wsgi_request
+
+MODES = ('direct', 'queue')
+
+
+def run_mode(args):
+    """Нагрузка в одном режиме; печатает результат в JSON."""
+    setup_django()
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes import writer
+
+    with test_database():
+        author = get_user_model().objects.create(username='bench')
+        client = Client()
+        client.force_login(author)
+        client.get(reverse('notes:add'))
+        token = client.cookies['csrftoken'].value
+        cookie = (
+            f'{settings.SESSION_COOKIE_NAME}='
+            f'{client.cookies[settings.SESSION_COOKIE_NAME].value}; '
+            f'csrftoken={token}'
+        )
+        handler = WSGIHandler()
+        url = reverse('notes:add')
+        deadline = time.monotonic() + args.seconds
+
+        def post(number):
+            samples = []
+            counter = 0
+            while time.monotonic() < deadline:
+                counter += 1
+                body = urlencode({
+                    'title': f'Заметка {number}-{counter}',
+                    'text': 'Текст',
+                    'csrfmiddlewaretoken': token,
+                }).encode()
+                status, elapsed = wsgi_request(
+                    handler, 'POST', url, cookie, body,
+                    {'CONTENT_TYPE': 'application/x-www-form-urlencoded'},
+                )
+                samples.append((status == 302, elapsed))
+            return samples
+
+        with ThreadPoolExecutor(args.writers) as executor:
+            samples = [
+                sample
+                for result in executor.map(post, range(args.writers))
+                for sample in result
+            ]
+        queue = writer.get_writer()
+        batches, committed = queue.batches, queue.committed
+        writer.stop_writer()
+    stats = summary([elapsed for ok, elapsed in samples if ok])
+    stats.update(
+        mode='queue' if settings.NOTES_WRITE_QUEUE else 'direct',
+        errors=sum(1 for ok, _ in samples if not ok),
+        rps=stats['count'] / args.seconds,
+        batch=committed / batches if batches else 1,
+    )
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--writers', type=int, default=128)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    if args.mode:
+        return run_mode(args)
+
+    print(f'{"режим":<8} {"записей/с":>10} {"p50":>9} {"p95":>9} '
+          f'{"p99":>9} {"ошибок":>7} {"пакет":>6}')
+    for mode in MODES:
+        env = dict(
+            os.environ,
+            NOTES_DB_PROFILE='production',
+            NOTES_WRITE_QUEUE='1' if mode == 'queue' else '0',
+        )
+        command = [
+            sys.executable, __file__, '--mode', mode,
+            f'--writers={args.writers}', f'--seconds={args.seconds}',
+        ]
+        output = subprocess.run(
+            command, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        stats = json.loads(output.strip().splitlines()[-1])
+        print(
+            f'{mode:<8} {stats["rps"]:10.1f} {stats["p50"]:7.1f}ms '
+            f'{stats["p95"]:7.1f}ms {stats["p99"]:7.1f}ms '
+            f'{stats["errors"]:>7} {stats["batch"]:6.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
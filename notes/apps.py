@@ -4,3 +4,31 @@ from django.apps import AppConfig
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from django.conf import settings
+        from django.contrib.auth.signals import user_logged_out
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import (
+            post_delete, post_save, pre_delete, pre_save,
+        )
+
+        from .auth import invalidate_cached_user
+        from .cache import invalidate_author
+        from .compression import register_functions
+        from .models import Note
+        from .revisions import record_revision
+        from .sharding import delete_author_notes
+
+        pre_save.connect(record_revision, sender=Note)
+        post_save.connect(invalidate_author, sender=Note)
+        post_delete.connect(invalidate_author, sender=Note)
+        pre_delete.connect(
+            delete_author_notes, sender=settings.AUTH_USER_MODEL
+        )
+        for signal in (post_save, post_delete):
+            signal.connect(
+                invalidate_cached_user, sender=settings.AUTH_USER_MODEL
+            )
+        user_logged_out.connect(invalidate_cached_user)
+        connection_created.connect(register_functions)
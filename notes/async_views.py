@@ -0,0 +1,156 @@
+"""Асинхронные представления заметок для запуска под ASGI.
+
+Классы называются так же, как в views, и подключаются вместо них
+настройкой NOTES_ASYNC_VIEWS. Пользователь загружается через
+request.auser(), запросы к базе идут через асинхронный ORM, поэтому
+обработчик не держит поток пула на всё время запроса.
+Кеш готовых страниц здесь не используется: бэкенды кеша синхронные.
+"""
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import IntegrityError
+from django.http import HttpResponseRedirect
+from django.shortcuts import aget_object_or_404, render
+from django.urls import reverse
+from django.views import generic
+
+from .conditional import AsyncConditionalGetMixin, page_parts
+from .forms import NoteForm
+from .models import Note
+from .pagination import KeysetPaginator
+from .routers import AsyncReplicaReadMixin
+from .sharding import ashard_for, is_sharded
+from .slugs import is_slug_conflict
+from .writer import awrite
+
+
+class NoteBase(generic.View):
+    """Базовый класс: только для вошедших и только свои заметки."""
+    template_name = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Шард ищется заранее: в get_queryset нельзя ждать запрос.
+        self.shard = (
+            await ashard_for(request.user.pk) if is_sharded() else None
+        )
+        return await super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Note.objects.for_author(self.request.user, self.shard)
+
+    async def get_object(self):
+        return await aget_object_or_404(
+            self.get_queryset(), slug=self.kwargs['slug']
+        )
+
+    def render(self, context):
+        return render(self.request, self.template_name, context)
+
+    def redirect_success(self):
+        return HttpResponseRedirect(reverse('notes:success'))
+
+
+class NotesList(AsyncReplicaReadMixin, AsyncConditionalGetMixin, NoteBase):
+    """Список всех заметок пользователя."""
+    template_name = 'notes/list.html'
+
+    async def get_page(self, queryset):
+        paginator = KeysetPaginator(queryset, settings.NOTES_PAGE_SIZE)
+        return await paginator.aget_page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+
+    async def get_validators(self):
+        page = await self.get_page(
+            self.get_queryset().values_list('pk', 'updated_at')
+        )
+        return page_parts(page, settings.NOTES_PAGE_SIZE), None
+
+    async def render_page(self):
+        page = await self.get_page(self.get_queryset().summaries())
+        return self.render({
+            'object_list': page.object_list,
+            'note_list': page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+        })
+
+
+class NoteDetail(AsyncReplicaReadMixin, AsyncConditionalGetMixin, NoteBase):
+    """Заметка подробно."""
+    template_name = 'notes/detail.html'
+
+    async def get_validators(self):
+        updated_at = await (
+            self.get_queryset().filter(slug=self.kwargs['slug'])
+            .values_list('updated_at', flat=True).afirst()
+        )
+        if updated_at is None:
+            return None
+        return ['detail', self.kwargs['slug'], updated_at.isoformat()], (
+            updated_at
+        )
+
+    async def render_page(self):
+        note = await self.get_object()
+        return self.render({'object': note, 'note': note})
+
+
+class NoteFormBase(NoteBase):
+    """Форма заметки: конфликт slug-а превращается в ошибку поля."""
+    template_name = 'notes/form.html'
+
+    async def get_instance(self):
+        raise NotImplementedError
+
+    def render_form(self, form):
+        return self.render({'form': form})
+
+    async def get(self, request, *args, **kwargs):
+        return self.render_form(NoteForm(instance=await self.get_instance()))
+
+    async def post(self, request, *args, **kwargs):
+        form = NoteForm(request.POST, instance=await self.get_instance())
+        if not form.is_valid():
+            return self.render_form(form)
+        note = form.save(commit=False)
+        try:
+            await awrite(note.save)
+        except IntegrityError as error:
+            if not is_slug_conflict(error):
+                raise
+            form.add_slug_conflict()
+            return self.render_form(form)
+        return self.redirect_success()
+
+
+class NoteCreate(NoteFormBase):
+    """Добавление заметки."""
+
+    async def get_instance(self):
+        return Note(author=self.request.user)
+
+
+class NoteUpdate(NoteFormBase):
+    """Редактирование заметки."""
+
+    async def get_instance(self):
+        return await self.get_object()
+
+
+class NoteDelete(NoteBase):
+    """Удаление заметки."""
+    template_name = 'notes/delete.html'
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.get_object()
+        return self.render({'object': note, 'note': note})
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.get_object()
+        await awrite(note.delete)
+        return self.redirect_success()
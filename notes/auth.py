@@ -0,0 +1,59 @@
+"""Кеш пользователя для request.user (профиль NOTES_SESSION_PROFILE=cached).
+
+AuthenticationMiddleware на каждом запросе загружает пользователя
+из базы по id из сессии. CachedModelBackend держит его в кеше
+NOTES_USER_CACHE_TIMEOUT секунд. Запись сбрасывается при любом
+сохранении пользователя (смена пароля, last_login при входе),
+удалении и выходе. Хеш пароля из закешированного объекта по-прежнему
+сверяется с сессией, так что смена пароля завершает чужие сессии.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.db import transaction
+
+from .cache import get_cache
+
+
+def user_key(user_id):
+    return f'notes:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        cache = get_cache()
+        user = cache.get(user_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(
+                    user_key(user_id), user, settings.NOTES_USER_CACHE_TIMEOUT
+                )
+        return user
+
+    async def aget_user(self, user_id):
+        cache = get_cache()
+        user = await cache.aget(user_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(
+                    user_key(user_id), user, settings.NOTES_USER_CACHE_TIMEOUT
+                )
+        return user
+
+
+def invalidate_cached_user(sender, instance=None, user=None, **kwargs):
+    """Сбрасывает кеш пользователя: сохранение, удаление или выход.
+
+    Как и invalidate_user, повторяет сброс после коммита: до него
+    параллельный запрос может закешировать старую версию.
+    """
+    user = instance or user
+    if user is None:
+        return
+    delete = partial(get_cache().delete, user_key(user.pk))
+    delete()
+    transaction.on_commit(delete)
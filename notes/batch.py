@@ -0,0 +1,217 @@
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .cache import invalidate_user
+from .importer import MAX_CHUNK_ATTEMPTS, assign_slugs, build_note
+from .models import Note
+from .revisions import record
+from .sharding import atomic_for
+from .slugs import is_slug_conflict
+
+OPERATIONS = ('create', 'update', 'delete')
+
+# Поля заметки, которые можно передать в create и update.
+FIELDS = ('title', 'text', 'slug')
+
+
+@dataclass
+class BatchResult:
+    """Итог пакета: результат каждой операции в порядке запроса."""
+    results: list = field(default_factory=list)
+
+    def add_error(self, index, message):
+        messages = message if isinstance(message, list) else [message]
+        self.results[index] = {
+            'index': index, 'status': 'error', 'errors': messages,
+        }
+
+    def add_ok(self, index, op, note):
+        self.results[index] = {
+            'index': index, 'status': 'ok', 'op': op,
+            'id': note.pk, 'slug': note.slug,
+        }
+
+    def counts(self):
+        counts = dict.fromkeys(OPERATIONS, 0)
+        counts['failed'] = 0
+        for item in self.results:
+            if item['status'] == 'ok':
+                counts[item['op']] += 1
+            else:
+                counts['failed'] += 1
+        return counts
+
+    def as_dict(self):
+        return {**self.counts(), 'results': self.results}
+
+
+def parse_operation(operation):
+    """Проверяет форму операции; возвращает (op, slug, data)."""
+    if not isinstance(operation, dict):
+        raise ValidationError('Операция должна быть объектом JSON.')
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        raise ValidationError(f'Неизвестная операция: {op}.')
+    data = operation.get('data', {})
+    if not isinstance(data, dict):
+        raise ValidationError('Поле data должно быть объектом JSON.')
+    unknown = set(data) - set(FIELDS)
+    if unknown:
+        raise ValidationError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+        )
+    slug = operation.get('slug')
+    if op != 'create' and not (isinstance(slug, str) and slug):
+        raise ValidationError('Для update и delete нужен slug заметки.')
+    return op, slug, data
+
+
+def plan_target(slug, targets, touched):
+    """Заметка для update или delete; одну заметку пакет меняет раз."""
+    note = targets.get(slug)
+    if note is None:
+        raise ValidationError(f'Заметка {slug} не найдена.')
+    if slug in touched:
+        raise ValidationError(
+            f'Заметка {slug} уже изменена в этом пакете.'
+        )
+    return note
+
+
+def plan_update(note, data):
+    """Применяет к заметке поля update; возвращает изменённые поля."""
+    slug = note.slug
+    for name, value in data.items():
+        setattr(note, name, value)
+    note.clean_fields(exclude=('author',))
+    fields = set(data)
+    if note.slug == slug:
+        fields.discard('slug')
+    return fields
+
+
+def plan(operations, author, result):
+    """Готовит заметки к записи, не меняя базу.
+
+    Заметки для update и delete загружаются одним запросом и только
+    среди заметок автора: чужая заметка неотличима от отсутствующей.
+    Возвращает списки (индекс, заметка) для каждого вида операции
+    и поля, которые меняет каждая операция update.
+    """
+    parsed = {}
+    for index, operation in enumerate(operations):
+        try:
+            parsed[index] = parse_operation(operation)
+        except ValidationError as error:
+            result.add_error(index, error.messages)
+    targets = {
+        note.slug: note
+        for note in Note.objects.for_author(author).filter(slug__in={
+            slug for op, slug, _ in parsed.values() if op != 'create'
+        })
+    }
+    planned = {op: [] for op in OPERATIONS}
+    changes = {}
+    touched = set()
+    for index, (op, slug, data) in parsed.items():
+        try:
+            if op == 'create':
+                note = build_note(data, author)
+            else:
+                note = plan_target(slug, targets, touched)
+                touched.add(slug)
+                if op == 'update':
+                    changes[index] = plan_update(note, data)
+        except ValidationError as error:
+            result.add_error(index, error.messages)
+            continue
+        planned[op].append((index, note))
+    return planned, changes
+
+
+def update_notes(notes, fields, using):
+    """Массовое обновление только изменившихся полей.
+
+    Дата изменения у всех заметок пакета одна, поэтому она ставится
+    отдельным простым UPDATE, а не выражением CASE для каждой строки.
+    """
+    if not notes:
+        return
+    record(notes, using)
+    if fields:
+        Note.objects.using(using).bulk_update(notes, sorted(fields))
+    now = timezone.now()
+    Note.objects.using(using).filter(
+        pk__in=[note.pk for note in notes]
+    ).update(updated_at=now)
+    for note in notes:
+        note.updated_at = now
+
+
+def apply(planned, changes, result, author, using):
+    """Записывает операции в шард автора массовыми запросами.
+
+    Сначала удаление, чтобы освободившиеся slug-и можно было занять
+    в том же пакете. Slug-и новых и переименованных заметок выбираются
+    так же, как при импорте.
+    """
+    deleted = [note for _, note in planned['delete']]
+    Note.objects.using(using).filter(
+        pk__in=[note.pk for note in deleted]
+    ).delete()
+    pending = [
+        (index, note) for index, note in planned['update']
+        if 'slug' in changes[index]
+    ] + planned['create']
+    valid = assign_slugs(
+        [note for _, note in pending], [index for index, _ in pending],
+        result, author,
+    )
+    valid_ids = {id(note) for note in valid}
+    updated = [
+        (index, note) for index, note in planned['update']
+        if 'slug' not in changes[index] or id(note) in valid_ids
+    ]
+    update_notes(
+        [note for _, note in updated],
+        set().union(*(changes[index] for index, _ in updated)),
+        using,
+    )
+    created = [
+        (index, note) for index, note in planned['create']
+        if id(note) in valid_ids
+    ]
+    Note.objects.using(using).bulk_create([note for _, note in created])
+    for op, items in (
+        ('delete', planned['delete']), ('update', updated),
+        ('create', created),
+    ):
+        for index, note in items:
+            result.add_ok(index, op, note)
+
+
+def run_batch(operations, author):
+    """Выполняет пакет операций create/update/delete над заметками автора.
+
+    Ошибочные операции попадают в результат с описанием ошибки,
+    остальные записываются вместе одной транзакцией.
+    """
+    for attempt in range(1, MAX_CHUNK_ATTEMPTS + 1):
+        result = BatchResult([None] * len(operations))
+        planned, changes = plan(operations, author, result)
+        try:
+            with atomic_for(author.pk) as alias:
+                apply(planned, changes, result, author, alias)
+        except IntegrityError as error:
+            # Slug заняли параллельно: пакет откатывается целиком
+            # и планируется заново.
+            if not is_slug_conflict(error) or attempt == MAX_CHUNK_ATTEMPTS:
+                raise
+            continue
+        break
+    if any(item['status'] == 'ok' for item in result.results):
+        invalidate_user(author.pk)
+    return result
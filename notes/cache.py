@@ -0,0 +1,141 @@
+import hashlib
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class CacheStats:
+    """Счётчики попаданий и промахов кеша в текущем процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[settings.NOTES_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    return f'notes:version:{user_id}'
+
+
+def new_version():
+    """Начальное значение счётчика.
+
+    Берётся из часов, а не с единицы: если счётчик вытеснят из кеша,
+    он не вернётся к старому значению и не оживит устаревшие записи.
+    """
+    return time.time_ns() // 1000
+
+
+def get_version(user_id):
+    cache = get_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        cache.add(version_key(user_id), new_version(), timeout=None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+def bump_version(user_id):
+    """Инвалидирует все записи пользователя за O(1)."""
+    cache = get_cache()
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.set(version_key(user_id), new_version(), timeout=None)
+
+
+class UserCache:
+    """Кеш данных одного пользователя.
+
+    Ключ каждой записи содержит текущую версию пользователя, поэтому
+    после изменения заметок старые записи просто перестают читаться
+    и со временем вытесняются бэкендом кеша.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.version = get_version(user_id)
+        self.cache = get_cache()
+
+    def make_key(self, *parts):
+        return ':'.join(
+            ['notes', str(self.user_id), str(self.version)]
+            + [str(part) for part in parts]
+        )
+
+    def get(self, *parts):
+        value = self.cache.get(self.make_key(*parts))
+        stats.record(value is not None)
+        return value
+
+    def set(self, value, *parts):
+        self.cache.set(
+            self.make_key(*parts), value, settings.NOTES_CACHE_TIMEOUT
+        )
+
+    def get_or_set(self, func, *parts):
+        value = self.get(*parts)
+        if value is None:
+            value = func()
+            self.set(value, *parts)
+        return value
+
+
+def page_key(request):
+    """Ключ HTML страницы или None, если страницу кешировать нельзя.
+
+    В страницу попадает CSRF-токен формы выхода, поэтому HTML
+    делится только между запросами с одним и тем же CSRF-cookie.
+    """
+    csrf_secret = request.META.get('CSRF_COOKIE')
+    if not csrf_secret:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(request.get_full_path().encode())
+    digest.update(csrf_secret.encode())
+    return ('html', digest.hexdigest())
+
+
+def invalidate_user(user_id):
+    """Сбрасывает кеш пользователя сейчас и ещё раз после коммита.
+
+    Пока транзакция не закрыта, параллельный запрос может прочитать
+    старые данные и закешировать их под уже новой версией.
+    """
+    bump_version(user_id)
+    transaction.on_commit(partial(bump_version, user_id))
+
+
+def invalidate_author(sender, instance, **kwargs):
+    """Сбрасывает кеш автора при сохранении и удалении заметки."""
+    invalidate_user(instance.author_id)
@@ -0,0 +1,142 @@
+"""Сжатие длинных текстов заметок (NOTES_TEXT_COMPRESSION).
+
+Текст от NOTES_TEXT_COMPRESSION_THRESHOLD байт хранится как BLOB:
+первый байт — метка формата (FORMATS), дальше сжатый UTF-8. Короткие
+и плохо сжимаемые тексты остаются строками, поэтому в одной таблице
+уживаются строки всех видов, а выключение сжатия не ломает чтение.
+Сжатие работает только в SQLite: другие базы не положат BLOB
+в текстовую колонку и сжимают длинные значения сами.
+
+Строка распаковывается при первом обращении к note.text, а не при
+загрузке из базы. values() и values_list() отдают значение в том
+виде, в каком оно хранится; текст из них получают через decompress().
+
+Пока сжатие включено, полнотекстовый индекс читает текст через
+SQL-функцию notes_text, которая регистрируется на каждом соединении
+Django. Менять notes_note в обход Django (например, из sqlite3) тогда
+нельзя: триггеры индекса не найдут функцию. Схему индекса переключает
+compress_notes (см. notes.search.set_index_schema); без сжатия в ней
+нет notes_text.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Метки формата в первом байте сжатого значения.
+FORMATS = {
+    'zlib': b'z',
+    'zstd': b's',
+}
+
+
+def get_zstandard():
+    if zstandard is None:
+        raise ImproperlyConfigured('Для сжатия zstd нужен пакет zstandard.')
+    return zstandard
+
+
+def compress(text, method=None):
+    """Отдаёт значение для хранения: сжатые байты или исходный текст."""
+    method = method or settings.NOTES_TEXT_COMPRESSION
+    if method == 'off':
+        return text
+    if method not in FORMATS:
+        raise ImproperlyConfigured(f'Неизвестный способ сжатия: {method}')
+    data = text.encode()
+    if len(data) < settings.NOTES_TEXT_COMPRESSION_THRESHOLD:
+        return text
+    if method == 'zlib':
+        packed = zlib.compress(data)
+    else:
+        packed = get_zstandard().ZstdCompressor().compress(data)
+    if len(packed) + 1 >= len(data):
+        return text
+    return FORMATS[method] + packed
+
+
+def decompress(value):
+    """Отдаёт текст по хранимому значению; строки возвращает как есть."""
+    if not isinstance(value, bytes):
+        return value
+    marker, packed = value[:1], value[1:]
+    if marker == FORMATS['zlib']:
+        data = zlib.decompress(packed)
+    elif marker == FORMATS['zstd']:
+        data = get_zstandard().ZstdDecompressor().decompress(packed)
+    else:
+        raise ValueError(f'Неизвестная метка сжатого текста: {marker!r}')
+    return data.decode()
+
+
+def stream_decompress(file, chunk_size):
+    """Распаковывает сжатое значение из файла порциями до chunk_size байт.
+
+    file — файлоподобный объект, например BLOB SQLite; первый байт
+    в нём — метка формата. Размер порции ограничен и на выходе:
+    сильно сжатый текст не распаковывается в память целиком.
+    """
+    marker = file.read(1)
+    if marker == FORMATS['zlib']:
+        decompressor = zlib.decompressobj()
+        while packed := file.read(chunk_size):
+            while packed:
+                yield decompressor.decompress(packed, chunk_size)
+                packed = decompressor.unconsumed_tail
+        yield decompressor.flush()
+    elif marker == FORMATS['zstd']:
+        reader = get_zstandard().ZstdDecompressor().stream_reader(file)
+        while data := reader.read(chunk_size):
+            yield data
+    else:
+        raise ValueError(f'Неизвестная метка сжатого текста: {marker!r}')
+
+
+def register_functions(sender, connection, **kwargs):
+    """Регистрирует notes_text для триггеров полнотекстового индекса."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'notes_text', 1, decompress, deterministic=True
+        )
+
+
+class LazyTextAttribute(DeferredAttribute):
+    """Распаковывает текст при первом обращении к атрибуту.
+
+    В отличие от DeferredAttribute, это data-дескриптор: иначе
+    значение из __dict__ экземпляра читалось бы в обход __get__.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, bytes):
+            value = decompress(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """Текстовое поле, длинные значения которого хранятся сжатыми."""
+
+    descriptor_class = LazyTextAttribute
+
+    def to_python(self, value):
+        return super().to_python(decompress(value))
+
+    def get_db_prep_save(self, value, connection):
+        value = super().get_db_prep_save(value, connection)
+        if connection.vendor == 'sqlite' and isinstance(value, str):
+            return compress(value)
+        return value
@@ -0,0 +1,95 @@
+import hashlib
+
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, parts):
+    """ETag страницы пользователя.
+
+    В страницу попадает CSRF-токен формы выхода, поэтому ETag зависит
+    и от CSRF-cookie: иначе браузер мог бы показать страницу
+    с токеном, который уже не подходит. get_token выдаёт cookie сразу,
+    если его ещё нет, — так ETag первого ответа совпадёт со следующим.
+    """
+    get_token(request)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(request.user.pk).encode())
+    digest.update(request.META['CSRF_COOKIE'].encode())
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(str(part).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def page_parts(page, page_size):
+    """Значения для ETag страницы списка из пар (id, дата изменения)."""
+    parts = ['list', page_size, page.has_next(), page.has_previous()]
+    for pk, updated_at in page.object_list:
+        parts.extend((pk, updated_at.isoformat()))
+    return parts
+
+
+def check_validators(request, parts, last_modified):
+    """Сверяет валидаторы с заголовками запроса.
+
+    Возвращает ETag, время изменения и готовый ответ 304/412 либо None,
+    если страницу нужно отрисовать.
+    """
+    etag = make_etag(request, parts)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    return etag, timestamp, response
+
+
+def set_validators(response, etag, timestamp):
+    if timestamp and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(timestamp)
+    response.headers.setdefault('ETag', etag)
+    return response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 Not Modified, не строя страницу заново.
+
+    Наследник реализует get_validators: один дешёвый запрос, который
+    возвращает значения для ETag и время изменения для Last-Modified,
+    либо None, если проверять нечего.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        etag, timestamp, response = check_validators(request, *validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag, timestamp)
+
+
+class AsyncConditionalGetMixin:
+    """То же для асинхронных представлений.
+
+    Наследник реализует корутины get_validators и render_page.
+    """
+
+    async def get_validators(self):
+        raise NotImplementedError
+
+    async def render_page(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        validators = await self.get_validators()
+        if validators is None:
+            return await self.render_page()
+        etag, timestamp, response = check_validators(request, *validators)
+        if response is None:
+            response = await self.render_page()
+        return set_validators(response, etag, timestamp)
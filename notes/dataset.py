@@ -0,0 +1,262 @@
+"""Синтетический набор данных для нагрузочного тестирования.
+
+Пользователи и заметки порождаются из зерна (seed) порциями. Порция
+зависит только от зерна и своего номера, а id пользователей и заметок
+считаются от номера, а не выдаются базой. Поэтому на одной и той же
+исходной базе набор получается одинаковым при любом числе процессов
+и любом порядке порций.
+
+Заголовки — кириллица и латиница из общего набора: у живых
+пользователей они тоже повторяются. Slug-и формируются по тем же
+правилам, что и в Note.save: транслитерация заголовка и суффиксы
+-2, -3 и т. д. при повторах у автора. Размер текста задаётся
+распределением, например ``lognormal:300:1.0`` (медиана и сигма),
+``uniform:100:5000`` или ``fixed:2048``; тексты — куски общего
+корпуса, поэтому их порождение почти ничего не стоит.
+
+Заметки пишутся executemany мимо моделей: на миллионах строк
+создание объектов и компиляция bulk_create дороже самой вставки.
+Значения готовит само поле, поэтому сжатие текстов соблюдается.
+"""
+import math
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from . import slugs
+from .models import Note
+from .sharding import shard_for
+
+LATIN_WORDS = (
+    'report deploy server backup invoice meeting travel recipe budget '
+    'garden review release ticket sprint python django database query '
+    'weekly plan ideas books movies shopping health study draft notes'
+).split()
+CYRILLIC_WORDS = (
+    'отчёт встреча покупки рецепт бюджет поездка задача релиз сервер '
+    'заметка идея книга фильм список дача ремонт здоровье учёба план '
+    'неделя черновик работа семья отпуск проект вопросы итоги расходы'
+).split()
+SYLLABLES = 'ка ло ми ну ре со та фе ba ko li mu ne ro si tu'.split()
+
+LATIN_NAMES = (
+    ('Alice', 'Bob', 'Carol', 'David', 'Emma', 'Frank', 'Grace', 'Henry'),
+    ('Smith', 'Brown', 'Wilson', 'Taylor', 'Clark', 'Lewis', 'Walker'),
+)
+CYRILLIC_NAMES = (
+    ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена', 'Юрий'),
+    ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев'),
+)
+
+DISTRIBUTIONS = {
+    'fixed': lambda rng, size: size,
+    'uniform': lambda rng, low, high: rng.uniform(low, high),
+    'lognormal': lambda rng, median, sigma: rng.lognormvariate(
+        math.log(median), sigma
+    ),
+}
+
+# Тексты вырезаются из корпуса такого размера; это и предел их длины.
+CORPUS_SIZE = 4 * 2 ** 20
+
+VOCABULARY_SIZE = 5000
+
+# Сколько разных заголовков на весь набор. Каждый транслитерируется
+# один раз и помещается в кеш slug-ов (NOTES_SLUG_CACHE_SIZE).
+TITLES = 5000
+
+NOTE_COLUMNS = ('id', 'title', 'text', 'slug', 'author_id', 'updated_at')
+
+
+def parse_text_size(spec):
+    """Распределение размера текста из строки вида lognormal:800:1.0."""
+    name, *params = spec.split(':')
+    if name not in DISTRIBUTIONS:
+        raise ValueError(
+            f'Неизвестное распределение {name}; '
+            f'доступны: {", ".join(DISTRIBUTIONS)}.'
+        )
+    try:
+        params = tuple(float(param) for param in params)
+        DISTRIBUTIONS[name](random.Random(), *params)
+    except (TypeError, ValueError):
+        raise ValueError(f'Неверные параметры распределения: {spec}.')
+    return (name, *params)
+
+
+@lru_cache(maxsize=1)
+def corpus(seed):
+    """Корпус текста; строится раз на процесс.
+
+    Частоты слов — по закону Ципфа, как у живого текста. Корпус
+    повторён дважды, чтобы кусок из любого места вырезался целиком.
+    """
+    rng = random.Random(f'{seed}:corpus')
+    words = list(LATIN_WORDS + CYRILLIC_WORDS)
+    known = set(words)
+    while len(words) < VOCABULARY_SIZE:
+        word = ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in known:
+            known.add(word)
+            words.append(word)
+    cum_weights = list(
+        accumulate(1 / rank for rank in range(1, len(words) + 1))
+    )
+    lines = []
+    size = 0
+    while size < CORPUS_SIZE:
+        line = ' '.join(
+            rng.choices(words, cum_weights=cum_weights, k=rng.randint(6, 16))
+        ).capitalize() + '.\n'
+        lines.append(line)
+        size += len(line)
+    return ''.join(lines)[:CORPUS_SIZE] * 2
+
+
+@lru_cache(maxsize=1)
+def titles(seed, latin_share):
+    """Заголовки набора с их slug-ами без суффиксов."""
+    rng = random.Random(f'{seed}:titles')
+    pool = [
+        ' '.join(rng.choices(
+            LATIN_WORDS if rng.random() < latin_share else CYRILLIC_WORDS,
+            k=rng.randint(1, 4),
+        )).capitalize()
+        for _ in range(TITLES)
+    ]
+    max_length = Note._meta.get_field('slug').max_length
+    return list(zip(pool, slugs.make_slugs(pool, max_length)))
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Параметры набора. Заметки делятся между пользователями поровну."""
+    users: int
+    notes: int
+    seed: int = 0
+    text_size: tuple = ('lognormal', 300.0, 1.0)
+    latin_share: float = 0.3
+    batch_size: int = 5000
+    password: str = ''
+    first_user_id: int = 1
+    first_note_id: int = 1
+
+    @property
+    def users_per_batch(self):
+        if not self.notes:
+            return self.batch_size
+        return max(1, self.batch_size * self.users // self.notes)
+
+    @property
+    def batches(self):
+        return math.ceil(self.users / self.users_per_batch)
+
+    def notes_of(self, user):
+        """Сколько заметок у пользователя с порядковым номером user."""
+        return self.notes // self.users + (user < self.notes % self.users)
+
+    def first_note_of(self, user):
+        """Порядковый номер первой заметки пользователя."""
+        return (
+            user * (self.notes // self.users)
+            + min(user, self.notes % self.users)
+        )
+
+
+def build_user(dataset, rng, user):
+    first_names, last_names = (
+        LATIN_NAMES if rng.random() < dataset.latin_share
+        else CYRILLIC_NAMES
+    )
+    first_name = rng.choice(first_names)
+    last_name = rng.choice(last_names)
+    pk = dataset.first_user_id + user
+    username = (
+        f'{slugs.slugify(first_name)}.{slugs.slugify(last_name)}.{pk}'
+    )
+    return get_user_model()(
+        pk=pk, username=username, first_name=first_name,
+        last_name=last_name, email=f'{username}@example.com',
+        password=dataset.password,
+    )
+
+
+def build_text(dataset, rng):
+    """Кусок корпуса случайной длины, начатый с границы слова."""
+    text = corpus(dataset.seed)
+    name, *params = dataset.text_size
+    size = DISTRIBUTIONS[name](rng, *params)
+    size = min(max(round(size), 1), CORPUS_SIZE)
+    start = text.find(' ', rng.randrange(CORPUS_SIZE)) + 1
+    return text[start:start + size]
+
+
+def build_notes(dataset, rng, user, author_id):
+    """Строки заметок пользователя со slug-ами, как у Note.save."""
+    max_length = Note._meta.get_field('slug').max_length
+    pool = titles(dataset.seed, dataset.latin_share)
+    first = dataset.first_note_id + dataset.first_note_of(user)
+    taken = set()
+    rows = []
+    for pk in range(first, first + dataset.notes_of(user)):
+        title, base = rng.choice(pool)
+        slug = base
+        number = 1
+        while slug in taken:
+            number += 1
+            slug = slugs.with_suffix(base, number, max_length)
+        taken.add(slug)
+        rows.append((pk, title, build_text(dataset, rng), slug, author_id))
+    return rows
+
+
+def insert_notes(rows, using):
+    """Вставляет строки заметок; значения готовят поля модели."""
+    connection = connections[using]
+    text_field = Note._meta.get_field('text')
+    updated_at = Note._meta.get_field('updated_at').get_db_prep_save(
+        timezone.now(), connection
+    )
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(Note._meta.db_table),
+        ', '.join(map(quote, NOTE_COLUMNS)),
+        ', '.join(['%s'] * len(NOTE_COLUMNS)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (pk, title, text_field.get_db_prep_save(text, connection),
+             slug, author_id, updated_at)
+            for pk, title, text, slug, author_id in rows
+        ])
+
+
+def generate_batch(dataset, number):
+    """Записывает порцию number; отдаёт число созданных заметок.
+
+    Пользователи пишутся в default, заметки — в шард автора.
+    """
+    rng = random.Random(f'{dataset.seed}:{number}')
+    first = number * dataset.users_per_batch
+    users = [
+        build_user(dataset, rng, user)
+        for user in range(
+            first, min(dataset.users, first + dataset.users_per_batch)
+        )
+    ]
+    shards = {}
+    for user, author in enumerate(users, start=first):
+        shards.setdefault(shard_for(author.pk), []).extend(
+            build_notes(dataset, rng, user, author.pk)
+        )
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        get_user_model().objects.using(DEFAULT_DB_ALIAS).bulk_create(users)
+        for alias, rows in shards.items():
+            with transaction.atomic(using=alias):
+                insert_notes(rows, alias)
+    return sum(map(len, shards.values()))
@@ -0,0 +1,117 @@
+import csv
+import json
+import logging
+import time
+import zipfile
+
+from .compression import decompress
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('id', 'title', 'slug', 'text')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'zip': 'application/zip',
+}
+
+# Размер порции ответа: мелкие строки склеиваются, чтобы не отдавать
+# серверу по одному чанку на заметку.
+BUFFER_SIZE = 64 * 1024
+
+
+class StreamBuffer:
+    """Файлоподобный буфер, из которого забирают накопленные байты."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.parts.append(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def iter_rows(queryset, chunk_size):
+    rows = queryset.order_by('pk').values_list(*FIELDS).iterator(
+        chunk_size=chunk_size
+    )
+    for *fields, text in rows:
+        yield (*fields, decompress(text))
+
+
+def write_jsonl(rows, buffer):
+    for row in rows:
+        buffer.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+        buffer.write('\n')
+        yield
+
+
+def write_csv(rows, buffer):
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        yield
+
+
+def write_zip(rows, buffer):
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for _, title, slug, text in rows:
+            with archive.open(f'{slug}.txt', 'w') as member:
+                member.write(f'{title}\n\n{text}'.encode())
+            yield
+
+
+WRITERS = {
+    'jsonl': write_jsonl,
+    'csv': write_csv,
+    'zip': write_zip,
+}
+
+
+def stream_export(queryset, fmt, chunk_size, label=''):
+    """Отдаёт выгрузку заметок порциями байтов.
+
+    Заметки читаются из базы порциями по chunk_size, а в памяти
+    одновременно держится не больше одной порции ответа, поэтому
+    расход памяти не зависит от числа заметок.
+    """
+    buffer = StreamBuffer()
+    started = time.perf_counter()
+    notes = 0
+    sent = 0
+    try:
+        for _ in WRITERS[fmt](iter_rows(queryset, chunk_size), buffer):
+            notes += 1
+            if buffer.size >= BUFFER_SIZE:
+                data = buffer.drain()
+                sent += len(data)
+                yield data
+        # ZIP дописывает оглавление уже после последней заметки.
+        data = buffer.drain()
+        if data:
+            sent += len(data)
+            yield data
+    finally:
+        elapsed = time.perf_counter() - started
+        logger.info(
+            'Выгрузка %s %s: %d заметок, %.1f КБ за %.2f с '
+            '(%.0f заметок/с, %.1f КБ/с)',
+            fmt, label, notes, sent / 1024, elapsed,
+            notes / elapsed if elapsed else 0,
+            sent / 1024 / elapsed if elapsed else 0,
+        )
@@ -1,7 +1,4 @@
-from pytils.translit import slugify
-
 from django import forms
-from django.core.exceptions import ValidationError
 
 from .models import Note
 
@@ -15,15 +12,28 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """Проверяет уникальность всех полей, кроме slug.
+
+        Занятость slug-а выясняется при сохранении по уникальному
+        индексу, без отдельного запроса: см. Note.save и NoteSlugMixin.
+        """
+        exclude = self._get_validation_exclusions()
+        exclude.add('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except forms.ValidationError as error:
+            self._update_errors(error)
+
+    def add_slug_conflict(self):
+        """Сообщает, что выбранный slug уже занят."""
+        self.add_error('slug', self.instance.slug + WARNING)
+
+
+class NoteImportForm(forms.Form):
+    """Форма загрузки файла с заметками."""
+
+    file = forms.FileField(
+        label='Файл',
+        help_text='JSONL или CSV с полями title, text и slug',
+    )
@@ -0,0 +1,211 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Q
+
+from . import slugs
+from .sharding import atomic_for
+from .cache import bump_version
+from .models import Note
+
+FORMATS = ('jsonl', 'csv')
+
+# Сколько ошибок хранить для отчёта: память не должна расти с файлом.
+MAX_REPORTED_ERRORS = 100
+
+# Сколько раз перевыбирать slug-и порции, если их заняли параллельно.
+MAX_CHUNK_ATTEMPTS = 3
+
+# Предел длины поля CSV. Длина текста заметки не ограничена, поэтому
+# предел — наибольшая строка SQLite по умолчанию (SQLITE_MAX_LENGTH):
+# стандартных 128 КиБ модуля csv не хватает даже для своего экспорта.
+CSV_FIELD_SIZE_LIMIT = 1_000_000_000
+
+
+@dataclass
+class ImportResult:
+    """Итог импорта: сколько создано и что не прошло проверку."""
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def detect_format(filename):
+    if filename.endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def iter_csv(text):
+    csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_jsonl(text):
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, ValueError(f'Некорректный JSON: {error}')
+            continue
+        yield line_number, row
+
+
+def iter_rows(stream, fmt):
+    """Читает файл построчно, отдавая (номер строки, словарь полей).
+
+    Вместо словаря строка может нести ошибку. Если файл дальше
+    не читается (не UTF-8, сломанный CSV), последней идёт ошибка
+    с номером следующей строки: прочитанное до неё импортируется.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    rows = iter_csv(text) if fmt == 'csv' else iter_jsonl(text)
+    line_number = 0
+    try:
+        for line_number, row in rows:
+            yield line_number, row
+    except UnicodeDecodeError:
+        yield line_number + 1, ValueError(
+            'Файл должен быть в кодировке UTF-8, дальше он не прочитан.'
+        )
+    except csv.Error as error:
+        yield line_number + 1, ValueError(
+            f'Некорректный CSV: {error}, дальше файл не прочитан.'
+        )
+
+
+def build_note(row, author):
+    """Создаёт несохранённую заметку из строки файла и проверяет поля."""
+    if not isinstance(row, dict):
+        raise ValidationError('Строка должна быть объектом JSON.')
+    note = Note(
+        title=row.get('title') or Note._meta.get_field('title').default,
+        text=row.get('text') or '',
+        slug=row.get('slug') or '',
+        author=author,
+    )
+    note.clean_fields(exclude=('author',))
+    return note
+
+
+def assign_slugs(notes, lines, result, author):
+    """Назначает slug-и порции, сверяясь с базой одним-двумя запросами.
+
+    Slug уникален среди заметок автора, поэтому и занятые slug-и
+    ищутся только среди них. Явно заданный slug, который уже занят, —
+    ошибка строки, как и в форме. Сгенерированный из заголовка slug
+    при конфликте получает суффикс -2, -3 и т. д. Возвращает заметки,
+    готовые к записи.
+    """
+    max_length = Note._meta.get_field('slug').max_length
+    generated = iter(slugs.make_slugs(
+        [note.title for note in notes if not note.slug], max_length
+    ))
+    bases = [None if note.slug else next(generated) for note in notes]
+    candidates = {note.slug for note in notes if note.slug}
+    candidates.update(base for base in bases if base is not None)
+    existing = Note.objects.for_author(author)
+    taken = set(
+        existing.filter(slug__in=candidates).values_list('slug', flat=True)
+    )
+    busy_bases = {base for base in bases if base in taken}
+    if busy_bases:
+        suffixed = Q()
+        for base in busy_bases:
+            suffixed |= Q(
+                slug__startswith=slugs.suffix_prefix(base, max_length)
+            )
+        taken.update(
+            existing.filter(suffixed).values_list('slug', flat=True)
+        )
+    valid = []
+    for note, line, base in zip(notes, lines, bases):
+        if base is not None:
+            slug = base
+            number = 1
+            while slug in taken:
+                number += 1
+                slug = slugs.with_suffix(base, number, max_length)
+            note.slug = slug
+        elif note.slug in taken:
+            result.add_error(line, f'slug {note.slug} уже существует.')
+            continue
+        taken.add(note.slug)
+        valid.append(note)
+    return valid
+
+
+def build_chunk(rows, author, result):
+    """Заметки порции и номера их строк; ошибки строк — в отчёт."""
+    notes = []
+    lines = []
+    for line, row in rows:
+        if isinstance(row, Exception):
+            result.add_error(line, str(row))
+            continue
+        try:
+            notes.append(build_note(row, author))
+        except ValidationError as error:
+            result.add_error(line, '; '.join(error.messages))
+            continue
+        lines.append(line)
+    return notes, lines
+
+
+def import_chunk(rows, author, result):
+    """Проверяет порцию строк и записывает её одной транзакцией."""
+    notes, lines = build_chunk(rows, author, result)
+    file_slugs = [note.slug for note in notes]
+    for attempt in range(1, MAX_CHUNK_ATTEMPTS + 1):
+        # Между проверкой и записью slug может занять другой запрос:
+        # тогда порция откатывается и slug-и выбираются заново.
+        for note, slug in zip(notes, file_slugs):
+            note.pk = None
+            note.slug = slug
+        chunk_result = ImportResult()
+        valid = assign_slugs(notes, lines, chunk_result, author)
+        try:
+            with atomic_for(author.pk) as alias:
+                Note.objects.using(alias).bulk_create(valid)
+        except IntegrityError:
+            if attempt == MAX_CHUNK_ATTEMPTS:
+                raise
+            continue
+        break
+    result.created += len(valid)
+    for line, message in chunk_result.errors:
+        result.add_error(line, message)
+
+
+def import_notes(stream, author, fmt='jsonl', batch_size=1000):
+    """Импортирует заметки автора из потока, порциями по batch_size.
+
+    Файл не читается целиком: в памяти одновременно находится только
+    одна порция, поэтому объём файла может быть любым.
+    """
+    result = ImportResult()
+    rows = iter_rows(stream, fmt)
+    try:
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            import_chunk(chunk, author, result)
+    finally:
+        if result.created:
+            bump_version(author.pk)
+    return result
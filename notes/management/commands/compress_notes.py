@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import (
+    BinaryField, CharField, Func, IntegerField, Q, Value,
+)
+
+from notes import search
+from notes.compression import FORMATS, compress, decompress
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересохраняет тексты заметок порциями по настройке '
+        'NOTES_TEXT_COMPRESSION: сжимает длинные или распаковывает все. '
+        'Заодно переводит полнотекстовый индекс на схему со сжатием '
+        'или без него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество заметок в одной транзакции.',
+        )
+        parser.add_argument(
+            '--database', choices=settings.NOTES_SHARDS,
+            help='Шард, заметки которого пересохранить; по умолчанию все.',
+        )
+
+    def handle(self, *args, **options):
+        shards = (
+            [options['database']] if options['database']
+            else settings.NOTES_SHARDS
+        )
+        for alias in shards:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError('Сжатие текстов доступно только в SQLite.')
+            # Схема с notes_text нужна, пока в базе есть сжатые строки:
+            # при включении она ставится до сжатия, при выключении
+            # снимается после распаковки.
+            compressed = settings.NOTES_TEXT_COMPRESSION != 'off'
+            if compressed:
+                self.set_index_schema(alias, True, options['batch_size'])
+            changed = 0
+            for changed in self.recompress(alias, options['batch_size']):
+                self.stdout.write(f'{alias}: пересохранено заметок: {changed}')
+            if not compressed:
+                self.set_index_schema(alias, False, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: готово, пересохранено заметок: {changed}'
+            ))
+
+    def set_index_schema(self, alias, compressed, batch_size):
+        indexed = None
+        for indexed in search.set_index_schema(compressed, batch_size, alias):
+            pass
+        if indexed is not None:
+            self.stdout.write(
+                f'{alias}: индекс переведён на схему '
+                f'{"со сжатием" if compressed else "без сжатия"}, '
+                f'проиндексировано заметок: {indexed}'
+            )
+
+    def recompress(self, alias, batch_size):
+        """Пересохраняет заметки шарда, отдавая число изменённых.
+
+        Выбираются только строки, хранение которых расходится
+        с настройкой. Порции идут по id; updated_at не меняется,
+        поэтому ETag страниц и кеш остаются верными.
+        """
+        method = settings.NOTES_TEXT_COMPRESSION
+        queryset = Note.objects.using(alias).alias(
+            storage=Func(
+                'text', function='TYPEOF', output_field=CharField()
+            ),
+        )
+        if method == 'off':
+            queryset = queryset.filter(storage='blob')
+        else:
+            queryset = queryset.alias(
+                size=Func(
+                    'text', template='LENGTH(CAST(%(expressions)s AS BLOB))',
+                    output_field=IntegerField(),
+                ),
+                marker=Func(
+                    'text', template='SUBSTR(%(expressions)s, 1, 1)',
+                    output_field=BinaryField(),
+                ),
+            ).filter(
+                Q(
+                    storage='text',
+                    size__gte=settings.NOTES_TEXT_COMPRESSION_THRESHOLD,
+                )
+                | Q(storage='blob') & ~Q(marker=FORMATS[method])
+            )
+        changed = 0
+        last_id = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', 'text')[:batch_size]
+            )
+            if not rows:
+                return
+            with transaction.atomic(using=alias):
+                for pk, stored in rows:
+                    # Несжимаемый текст может остаться строкой.
+                    value = compress(decompress(stored))
+                    if value == stored:
+                        continue
+                    Note.objects.using(alias).filter(pk=pk).update(
+                        text=Value(value)
+                    )
+                    changed += 1
+            last_id = rows[-1][0]
+            yield changed
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max
+
+from notes import search
+from notes.dataset import Dataset, generate_batch, parse_text_size
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт детерминированный синтетический набор пользователей '
+        'и заметок для нагрузочного тестирования. Поисковый индекс '
+        'перестраивается в конце, поэтому запускать стоит без трафика.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Количество пользователей.',
+        )
+        parser.add_argument(
+            '--notes', type=int, default=100000,
+            help='Количество заметок; делятся между пользователями поровну.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно: одно и то же зерно даёт один и тот же набор.',
+        )
+        parser.add_argument(
+            '--text-size', default='lognormal:300:1.0',
+            help=(
+                'Распределение длины текста в символах: lognormal:МЕДИАНА:'
+                'СИГМА, uniform:ОТ:ДО или fixed:ДЛИНА.'
+            ),
+        )
+        parser.add_argument(
+            '--latin-share', type=float, default=0.3,
+            help='Доля латинских заголовков и имён, остальные — кириллица.',
+        )
+        parser.add_argument(
+            '--password', default='loadtest-password',
+            help='Пароль всех созданных пользователей.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Примерное количество заметок в одной транзакции.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Количество параллельных процессов.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['notes'] < 0:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        try:
+            text_size = parse_text_size(options['text_size'])
+        except ValueError as error:
+            raise CommandError(error)
+        user_model = get_user_model()
+        last_user_id = user_model.objects.using(DEFAULT_DB_ALIAS).aggregate(
+            last=Max('pk')
+        )['last']
+        last_note_id = max(
+            Note.objects.using(alias).aggregate(last=Max('pk'))['last'] or 0
+            for alias in settings.NOTES_SHARDS
+        )
+        dataset = Dataset(
+            users=options['users'],
+            notes=options['notes'],
+            seed=options['seed'],
+            text_size=text_size,
+            latin_share=options['latin_share'],
+            batch_size=options['batch_size'],
+            # Хеш считается один раз: PBKDF2 намеренно медленный.
+            # Соль из зерна делает и его детерминированным.
+            password=make_password(
+                options['password'], salt=f'dataset{options["seed"]}'
+            ),
+            first_user_id=(last_user_id or 0) + 1,
+            first_note_id=last_note_id + 1,
+        )
+        with ExitStack() as stack:
+            for alias in settings.NOTES_SHARDS:
+                stack.enter_context(search.paused_index(alias))
+            created = 0
+            for count in self.generate(dataset, options['workers']):
+                created += count
+                self.stdout.write(
+                    f'Создано заметок: {created} из {dataset.notes}'
+                )
+            for alias in settings.NOTES_SHARDS:
+                if not search.is_available(alias):
+                    continue
+                indexed = 0
+                for indexed in search.rebuild_index(10000, alias):
+                    self.stdout.write(
+                        f'{alias}: проиндексировано заметок: {indexed}'
+                    )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: пользователей {dataset.users}, заметок {created}.'
+        ))
+
+    def generate(self, dataset, workers):
+        """Записывает порции набора, отдавая число заметок каждой."""
+        batches = range(dataset.batches)
+        task = partial(generate_batch, dataset)
+        if workers <= 1:
+            yield from map(task, batches)
+            return
+        # Дочерние процессы открывают свои соединения с базой.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('fork'),
+        ) as executor:
+            yield from executor.map(task, batches)
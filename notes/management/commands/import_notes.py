@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.importer import FORMATS, detect_format, import_notes
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла JSONL или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с заметками.')
+        parser.add_argument(
+            '--author', required=True, help='Имя пользователя-автора.',
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество заметок в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        try:
+            author = user_model.objects.get(username=options['author'])
+        except user_model.DoesNotExist:
+            raise CommandError(f'Пользователь {options["author"]} не найден.')
+        fmt = options['format'] or detect_format(options['path'])
+        with open(options['path'], 'rb') as stream:
+            result = import_notes(
+                stream, author, fmt, batch_size=options['batch_size']
+            )
+        for line, message in result.errors:
+            self.stderr.write(f'Строка {line}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано заметок: {result.created}, с ошибками: {result.failed}'
+        ))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes import revisions
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет старые версии заметок порциями: старше '
+        'NOTES_REVISION_MAX_AGE_DAYS, кроме NOTES_REVISION_KEEP последних.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество версий, просматриваемых за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--database', choices=settings.NOTES_SHARDS,
+            help='Шард, версии в котором обрезать; по умолчанию все.',
+        )
+
+    def handle(self, *args, **options):
+        shards = (
+            [options['database']] if options['database']
+            else settings.NOTES_SHARDS
+        )
+        for alias in shards:
+            deleted = 0
+            for deleted in revisions.prune(alias, options['batch_size']):
+                self.stdout.write(f'{alias}: удалено версий: {deleted}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: готово, удалено версий: {deleted}'
+            ))
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import rebalance
+from notes.sharding import shard_for
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит авторов на шарды, выбранные хешем, порциями '
+        'и без остановки записи (см. notes.rebalance).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pin', action='store_true',
+            help='Только закрепить авторов за их текущими шардами.',
+        )
+        parser.add_argument(
+            '--author', type=int,
+            help='id автора, которого перенести в шард --to.',
+        )
+        parser.add_argument(
+            '--to', help='Шард для --author; автор закрепляется за ним.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество заметок в одной транзакции.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Показать переносы, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        if options['pin']:
+            pinned = rebalance.pin_authors()
+            self.stdout.write(self.style.SUCCESS(
+                f'Закреплено авторов: {pinned}'
+            ))
+            return
+        if (options['author'] is None) != (options['to'] is None):
+            raise CommandError('--author и --to задаются вместе.')
+        if options['author'] is not None:
+            if options['to'] not in settings.DATABASES:
+                raise CommandError(f'Неизвестная база {options["to"]}.')
+            source = shard_for(options['author'])
+            moves = []
+            if source != options['to']:
+                moves = [(options['author'], source, options['to'])]
+        else:
+            moves, strays = rebalance.plan_moves()
+            for author_id, alias in strays:
+                self.stderr.write(
+                    f'Автор {author_id}: заметки в {alias} вне его шарда '
+                    f'{shard_for(author_id)}, не переносятся.'
+                )
+        for author_id, source, target in moves:
+            if options['dry_run']:
+                self.stdout.write(f'Автор {author_id}: {source} → {target}')
+                continue
+            copied = rebalance.move_author(
+                author_id, source, target, options['batch_size']
+            )
+            self.stdout.write(
+                f'Автор {author_id}: {source} → {target}, '
+                f'скопировано заметок: {copied}'
+            )
+        if options['dry_run']:
+            return
+        released = rebalance.release_pins()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено авторов: {len(moves)}, '
+            f'снято закреплений: {released}'
+        ))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс заметок порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Количество заметок в одной транзакции.',
+        )
+        parser.add_argument(
+            '--database', choices=settings.NOTES_SHARDS,
+            help='Шард, индекс которого перестроить; по умолчанию все.',
+        )
+
+    def handle(self, *args, **options):
+        shards = (
+            [options['database']] if options['database']
+            else settings.NOTES_SHARDS
+        )
+        for alias in shards:
+            if not search.is_available(alias):
+                raise CommandError(
+                    'Полнотекстовый индекс доступен только в SQLite.'
+                )
+            indexed = 0
+            batches = search.rebuild_index(options['batch_size'], alias)
+            for indexed in batches:
+                self.stdout.write(
+                    f'{alias}: проиндексировано заметок: {indexed}'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: индекс перестроен, всего заметок: {indexed}'
+            ))
@@ -0,0 +1,358 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+MetricsMiddleware считает запросы, ошибки, время ответа и число
+SQL-запросов по имени маршрута (notes:list, users:login, ...),
+а /metrics/ отдаёт их в текстовом формате Prometheus. Всё это
+работает при NOTES_METRICS=1.
+
+Каждый процесс пишет свои значения в собственный файл в каталоге
+NOTES_METRICS_DIR, отображённый в память: запись — это изменение
+восьми байт под блокировкой процесса, без системных вызовов.
+/metrics/ читает файлы всех процессов и суммирует одинаковые серии,
+поэтому любой воркер отдаёт общую картину. Файлы завершившихся
+процессов остаются, иначе счётчики уменьшались бы; каталог очищают
+перед запуском сервера. Без каталога метрики живут в памяти
+и /metrics/ показывает только свой процесс.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+# Начальный размер файла; при нехватке места он удваивается.
+INITIAL_SIZE = 64 * 1024
+
+HEADER = struct.Struct('q')
+KEY_SIZE = struct.Struct('i')
+VALUE = struct.Struct('d')
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Прочие методы считаются как other: метка не должна расти от чужого ввода.
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+
+def entries(data, used):
+    """Записи (ключ, смещение значения) из буфера файла значений."""
+    offset = HEADER.size
+    while offset < used:
+        size, = KEY_SIZE.unpack_from(data, offset)
+        offset += KEY_SIZE.size
+        key = bytes(data[offset:offset + size])
+        offset += size
+        offset += -offset % VALUE.size
+        yield key.decode(), offset
+        offset += VALUE.size
+
+
+class Values:
+    """Значения серий одного процесса в отображённом в память файле.
+
+    Файл: заголовок с числом занятых байт и записи «длина ключа, ключ
+    в UTF-8 с выравниванием до 8 байт, значение double». Пишет только
+    процесс-владелец. Новая запись дописывается целиком до того, как
+    сдвигается заголовок, поэтому другие процессы читают только
+    целые записи.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = {}
+        if path is None:
+            self.file = None
+            self.data = mmap.mmap(-1, INITIAL_SIZE)
+            self.used = HEADER.size
+            return
+        self.file = open(path, 'a+b')
+        size = max(os.fstat(self.file.fileno()).st_size, INITIAL_SIZE)
+        self.file.truncate(size)
+        self.data = mmap.mmap(self.file.fileno(), size)
+        # Файл мог остаться от прежнего процесса с тем же pid.
+        self.used, = HEADER.unpack_from(self.data, 0)
+        if not self.used:
+            self.used = HEADER.size
+        self.offsets = dict(entries(self.data, self.used))
+
+    def inc(self, *changes):
+        """Прибавляет к сериям значения из пар (ключ, слагаемое)."""
+        with self.lock:
+            for key, amount in changes:
+                offset = self.offsets.get(key)
+                if offset is None:
+                    offset = self.add(key)
+                value, = VALUE.unpack_from(self.data, offset)
+                VALUE.pack_into(self.data, offset, value + amount)
+
+    def add(self, key):
+        encoded = key.encode()
+        start = self.used + KEY_SIZE.size + len(encoded)
+        offset = start + -start % VALUE.size
+        end = offset + VALUE.size
+        if end > len(self.data):
+            self.grow(end)
+        KEY_SIZE.pack_into(self.data, self.used, len(encoded))
+        self.data[self.used + KEY_SIZE.size:start] = encoded
+        VALUE.pack_into(self.data, offset, 0.0)
+        self.used = end
+        HEADER.pack_into(self.data, 0, end)
+        self.offsets[key] = offset
+        return offset
+
+    def grow(self, needed):
+        size = len(self.data)
+        while size < needed:
+            size *= 2
+        if self.file is None:
+            data = mmap.mmap(-1, size)
+            data[:len(self.data)] = self.data
+        else:
+            self.file.truncate(size)
+            data = mmap.mmap(self.file.fileno(), size)
+        self.data.close()
+        self.data = data
+
+    def items(self):
+        with self.lock:
+            return [
+                (key, VALUE.unpack_from(self.data, offset)[0])
+                for key, offset in self.offsets.items()
+            ]
+
+
+def read(path):
+    """Серии файла значений другого процесса."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        return []
+    used, = HEADER.unpack_from(data, 0)
+    return [
+        (key, VALUE.unpack_from(data, offset)[0])
+        for key, offset in entries(data, min(used, len(data)))
+    ]
+
+
+class Registry:
+    """Описания метрик и значения текущего процесса."""
+
+    def __init__(self):
+        self.metrics = []
+        self.owner = None
+        self.values = None
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def process_values(self):
+        """Файл значений процесса; после fork у потомка — свой."""
+        owner = (os.getpid(), settings.NOTES_METRICS_DIR)
+        if self.owner != owner:
+            with self.lock:
+                if self.owner != owner:
+                    pid, directory = owner
+                    path = None
+                    if directory:
+                        Path(directory).mkdir(parents=True, exist_ok=True)
+                        path = Path(directory) / f'{pid}.db'
+                    self.values = Values(path)
+                    self.owner = owner
+        return self.values
+
+    def inc(self, *changes):
+        self.process_values().inc(*changes)
+
+    def collect(self):
+        """Серии всех процессов: (имя, метки) → сумма значений."""
+        directory = settings.NOTES_METRICS_DIR
+        if directory and Path(directory).is_dir():
+            own = self.process_values().path
+            series = []
+            for path in Path(directory).glob('*.db'):
+                series.extend(
+                    self.process_values().items() if path == own
+                    else read(path)
+                )
+        else:
+            series = self.process_values().items()
+        totals = {}
+        for key, value in series:
+            name, labels = json.loads(key)
+            key = (name, tuple(map(tuple, labels)))
+            totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4."""
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            samples = [
+                (labels, name, value)
+                for (name, labels), value in totals.items()
+                if name in metric.sample_names
+            ]
+            for name, labels, value in metric.samples(samples):
+                lines.append(f'{name}{format_labels(labels)} {value:.17g}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in labels
+    ) + '}'
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def series_key(name, labels):
+    """Ключ серии в файле значений."""
+    return json.dumps([name, labels], ensure_ascii=False)
+
+
+class Metric:
+    """Метрика с метками; ключи серий строятся раз на набор меток."""
+
+    def __init__(self, registry, name, help):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.keys = {}
+        registry.register(self)
+
+    def series(self, labels):
+        labels = tuple(sorted(labels.items()))
+        keys = self.keys.get(labels)
+        if keys is None:
+            keys = self.keys[labels] = self.make_keys(labels)
+        return keys
+
+    def samples(self, samples):
+        """Строки выдачи из (метки, имя, сумма по процессам)."""
+        for labels, name, value in sorted(samples):
+            yield name, labels, value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    @property
+    def sample_names(self):
+        return (self.name,)
+
+    def make_keys(self, labels):
+        return series_key(self.name, labels)
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc((self.series(labels), amount))
+
+
+class Histogram(Metric):
+    """Гистограмма Prometheus.
+
+    В файле корзины хранятся раздельно: наблюдение — это три
+    прибавления, а не по одному на каждую корзину. Накопительные
+    значения le считаются при выдаче.
+    """
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, buckets):
+        self.buckets = buckets
+        super().__init__(registry, name, help)
+
+    @property
+    def sample_names(self):
+        return (f'{self.name}_bucket', f'{self.name}_sum',
+                f'{self.name}_count')
+
+    def make_keys(self, labels):
+        bucket, total, count = self.sample_names
+        return [
+            series_key(bucket, [*labels, ('le', bound)])
+            for bound in (*self.buckets, '+Inf')
+        ] + [series_key(total, labels), series_key(count, labels)]
+
+    def observe(self, value, **labels):
+        keys = self.series(labels)
+        self.registry.inc(
+            (keys[bisect_left(self.buckets, value)], 1),
+            (keys[-2], value),
+            (keys[-1], 1),
+        )
+
+    def samples(self, samples):
+        bucket_name = self.sample_names[0]
+        groups = {}
+        for labels, name, value in samples:
+            if name == bucket_name:
+                *labels, (_, bound) = labels
+                buckets = groups.setdefault(tuple(labels), {})
+                buckets[bound] = value
+            else:
+                groups.setdefault(labels, {})[name] = value
+        for labels, values in sorted(groups.items()):
+            cumulative = 0.0
+            for bound in (*self.buckets, '+Inf'):
+                cumulative += values.get(bound, 0.0)
+                le = bound if isinstance(bound, str) else f'{bound:g}'
+                yield bucket_name, (*labels, ('le', le)), cumulative
+            for name in self.sample_names[1:]:
+                yield name, labels, values.get(name, 0.0)
+
+
+REGISTRY = Registry()
+
+requests_total = Counter(
+    REGISTRY, 'notes_requests_total',
+    'Запросы по маршруту, методу и классу статуса ответа.',
+)
+exceptions_total = Counter(
+    REGISTRY, 'notes_request_exceptions_total',
+    'Необработанные исключения представлений по маршруту и типу.',
+)
+request_duration = Histogram(
+    REGISTRY, 'notes_request_duration_seconds',
+    'Время ответа по маршруту, до начала отдачи тела.',
+    LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    REGISTRY, 'notes_request_db_queries',
+    'Число SQL-запросов за запрос по маршруту.',
+    QUERY_BUCKETS,
+)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+def observe(request, response, duration, queries):
+    """Записывает метрики завершённого запроса."""
+    view = view_name(request)
+    requests_total.inc(
+        view=view,
+        method=request.method if request.method in METHODS else 'other',
+        status=f'{response.status_code // 100}xx',
+    )
+    request_duration.observe(duration, view=view)
+    request_queries.observe(queries, view=view)
@@ -0,0 +1,213 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics, profiling
+from .routers import PIN_COOKIE, SAFE_METHODS
+from .sharding import ShardMoved
+from .timing import (
+    QueryRecorder, RequestTimings, current, log, server_timing,
+)
+
+
+class PrimaryPinMiddleware:
+    """После записи пользователь какое-то время читает с основной базы.
+
+    Реплика может отставать, поэтому ответ на любой изменяющий запрос
+    ставит короткоживущую cookie: пока она есть, страницы не читают
+    с реплик и пользователь видит свою только что сделанную запись.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and settings.NOTES_READ_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.NOTES_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Метрики Prometheus по маршрутам (см. notes.metrics).
+
+    Стоит первым в MIDDLEWARE: время ответа включает все остальные
+    middleware. Ошибки видны по классу статуса 5xx, а необработанные
+    исключения представлений ещё и считаются по типу.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.NOTES_METRICS:
+            return self.get_response(request)
+        queries = QueryRecorder()
+        started = time.perf_counter()
+        with queries.record():
+            response = self.get_response(request)
+        metrics.observe(
+            request, response, time.perf_counter() - started, queries.count
+        )
+        return response
+
+    async def __acall__(self, request):
+        if not settings.NOTES_METRICS:
+            return await self.get_response(request)
+        queries = QueryRecorder()
+        started = time.perf_counter()
+        with queries.record():
+            response = await self.get_response(request)
+        metrics.observe(
+            request, response, time.perf_counter() - started, queries.count
+        )
+        return response
+
+    def process_exception(self, request, exception):
+        if settings.NOTES_METRICS:
+            metrics.exceptions_total.inc(
+                view=metrics.view_name(request),
+                exception=type(exception).__name__,
+            )
+
+
+class ServerTimingMiddleware:
+    """Замеряет SQL, представление и шаблон части запросов.
+
+    Для доли NOTES_TIMING_SAMPLE_RATE запросов ответ получает
+    заголовок Server-Timing, а журнал notes.timing — строку с замерами
+    (см. notes.timing). Остальным запросам это стоит одного вызова
+    random(), поэтому middleware можно держать включённым всегда.
+    Стоит первым в MIDDLEWARE, чтобы total и db учитывали и сессии.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = current.set(timings)
+        try:
+            with timings.queries.record():
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = current.set(timings)
+        try:
+            with timings.queries.record():
+                response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, timings)
+
+    def sampled(self):
+        rate = settings.NOTES_TIMING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current.get()
+        if timings is not None:
+            timings.start_view()
+
+    def finish(self, request, response, timings):
+        timings.finish_view()
+        metrics = timings.metrics()
+        response['Server-Timing'] = server_timing(metrics)
+        log(request, response, timings, metrics)
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует часть запросов в продакшене (см. notes.profiling).
+
+    Профилируются только синхронные запросы: в цикле событий
+    асинхронного стека вперемешку выполняются чужие запросы, и профиль
+    одного из них не отделить. Ошибка записи профиля запрос не ломает.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget = profiling.Budget()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        if not profiling.is_wanted(request) or not self.budget.acquire():
+            return self.get_response(request)
+        try:
+            factory, extension = profiling.PROFILERS[settings.NOTES_PROFILER]
+            profiler = factory()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+            try:
+                profiling.save(profiler, extension, request, elapsed)
+            except OSError:
+                profiling.logger.exception('Профиль запроса не записан')
+        finally:
+            self.budget.release()
+        return response
+
+
+class ShardMovedMiddleware(MiddlewareMixin):
+    """Запись, попавшая на переезд автора в другой шард, повторяется.
+
+    Клиент получает 503 с Retry-After: через секунду запрос уйдёт
+    уже в новый шард (см. notes.sharding.atomic_for).
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, ShardMoved):
+            return None
+        response = HttpResponse(
+            'Заметки переносятся, повторите запрос.', status=503
+        )
+        response['Retry-After'] = '1'
+        return response
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(
+                fields=['author', 'id'], name='note_author_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(
+                fields=['author', 'slug'], name='note_author_slug_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def updated_at_field():
+    field = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+    field.set_attributes_from_name('updated_at')
+    return field
+
+
+def add_updated_at(apps, schema_editor):
+    """Добавляет колонку без пересоздания таблицы в SQLite.
+
+    Обычный AddField с default в SQLite пересоздаёт таблицу notes_note,
+    а вместе со старой таблицей пропадают триггеры полнотекстового
+    индекса. ALTER TABLE ADD COLUMN их сохраняет.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        schema_editor.add_field(
+            apps.get_model('notes', 'Note'), updated_at_field()
+        )
+        return
+    schema_editor.execute(
+        'ALTER TABLE notes_note ADD COLUMN updated_at datetime NOT NULL '
+        "DEFAULT '1970-01-01 00:00:00'"
+    )
+    schema_editor.execute(
+        'UPDATE notes_note SET updated_at = %s',
+        [schema_editor.connection.ops.adapt_datetimefield_value(
+            timezone.now()
+        )],
+    )
+
+
+def remove_updated_at(apps, schema_editor):
+    schema_editor.remove_field(
+        apps.get_model('notes', 'Note'), updated_at_field()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_author_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_updated_at, remove_updated_at),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='note',
+                    name='updated_at',
+                    field=updated_at_field(),
+                ),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_author_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_author_slug_idx',
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(
+                fields=['author', 'id', 'updated_at'],
+                name='note_author_id_upd_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(
+                fields=['author', 'slug', 'updated_at'],
+                name='note_author_slug_upd_idx',
+            ),
+        ),
+    ]
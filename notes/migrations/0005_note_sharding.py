@@ -0,0 +1,75 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+search_index = import_module('notes.migrations.0002_note_search_index')
+
+# Триггеры полнотекстового индекса. AlterField и AddConstraint в SQLite
+# пересоздают таблицу notes_note, и триггеры пропадают вместе со старой
+# таблицей; id строк при этом сохраняются, так что сам индекс остаётся
+# верным. Операции отката идут в обратном порядке, поэтому при откате
+# триггеры возвращает шаг перед AlterField.
+TRIGGERS_SQL = search_index.CREATE_SQL[1:4]
+DROP_TRIGGERS_SQL = search_index.DROP_SQL[:3]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_note_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardPlacement',
+            fields=[
+                ('author', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True, related_name='shard_placement',
+                    serialize=False, to=settings.AUTH_USER_MODEL,
+                )),
+                ('alias', models.CharField(
+                    max_length=100, verbose_name='Шард'
+                )),
+            ],
+        ),
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            search_index.run_sql(DROP_TRIGGERS_SQL + TRIGGERS_SQL),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='author',
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='slug',
+            field=models.SlugField(
+                blank=True,
+                help_text=(
+                    'Укажите адрес для страницы заметки. Используйте '
+                    'только латиницу, цифры, дефисы и знаки подчёркивания'
+                ),
+                max_length=100,
+                verbose_name='Адрес для страницы с заметкой',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='note',
+            constraint=models.UniqueConstraint(
+                fields=('author', 'slug'), name='note_author_slug_uniq'
+            ),
+        ),
+        migrations.RunPython(
+            search_index.run_sql(DROP_TRIGGERS_SQL + TRIGGERS_SQL),
+            migrations.RunPython.noop,
+        ),
+    ]
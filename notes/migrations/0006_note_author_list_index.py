@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_note_sharding'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(
+                fields=['author', 'id', 'updated_at', 'title', 'slug'],
+                name='note_author_list_idx',
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_author_id_upd_idx',
+        ),
+    ]
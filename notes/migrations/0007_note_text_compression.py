@@ -0,0 +1,57 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations
+
+import notes.compression
+from notes import search
+
+search_index = import_module('notes.migrations.0002_note_search_index')
+
+# AlterField пересоздаёт таблицу notes_note вместе с триггерами
+# (см. 0005); при откате их нужно вернуть уже после него.
+OLD_TRIGGERS_SQL = search_index.DROP_SQL[:3] + search_index.CREATE_SQL[1:4]
+
+
+def create_index(apps, schema_editor):
+    """Индекс в схеме по NOTES_TEXT_COMPRESSION (см. notes.search).
+
+    Схема с notes_text ставится, только если сжатие уже включено:
+    иначе notes_note нельзя было бы менять в обход Django.
+    Позже схему переключает команда compress_notes.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    compressed = settings.NOTES_TEXT_COMPRESSION != 'off'
+    for statement in search.index_schema_sql(compressed):
+        schema_editor.execute(statement)
+    schema_editor.execute(search.REBUILD_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_note_author_list_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            search_index.run_sql(OLD_TRIGGERS_SQL),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='text',
+            field=notes.compression.CompressedTextField(
+                help_text='Добавьте подробностей', verbose_name='Текст'
+            ),
+        ),
+        # Перед откатом сжатые строки нужно распаковать: compress_notes
+        # при NOTES_TEXT_COMPRESSION=off.
+        migrations.RunPython(
+            create_index,
+            search_index.run_sql(
+                search.DROP_INDEX_SQL + search_index.CREATE_SQL
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import notes.compression
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_note_text_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            # Колонка data — последняя, как и в модели.
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID',
+                )),
+                ('note', models.ForeignKey(
+                    db_index=False,
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='revisions', to='notes.note',
+                )),
+                ('number', models.PositiveIntegerField(
+                    verbose_name='Номер версии'
+                )),
+                ('title', models.CharField(
+                    max_length=100, verbose_name='Заголовок'
+                )),
+                ('slug', models.SlugField(
+                    db_index=False, max_length=100, verbose_name='Адрес'
+                )),
+                ('updated_at', models.DateTimeField(
+                    verbose_name='Дата изменения'
+                )),
+                ('is_snapshot', models.BooleanField(
+                    default=False, verbose_name='Полный текст'
+                )),
+                ('data', notes.compression.CompressedTextField(
+                    verbose_name='Текст или дельта'
+                )),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('note', 'number'),
+                        name='note_revision_number_uniq',
+                    ),
+                ],
+            },
+        ),
+    ]
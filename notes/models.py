@@ -1,7 +1,29 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models
 
-from pytils.translit import slugify
+from . import sharding, slugs
+from .compression import CompressedTextField
+
+# Поля заметки, которые нужны списку. Текст может весить мегабайты,
+# а на странице списка не показывается.
+SUMMARY_FIELDS = ('id', 'title', 'slug')
+
+# Поля версии для страницы истории: без текста или дельты.
+REVISION_SUMMARY_FIELDS = ('id', 'note_id', 'number', 'title', 'updated_at')
+
+
+class NoteQuerySet(models.QuerySet):
+
+    def summaries(self):
+        """Заметки без текста: для списков и других кратких страниц."""
+        return self.only(*SUMMARY_FIELDS)
+
+    def for_author(self, author, using=None):
+        """Заметки автора; при шардировании — из его шарда."""
+        queryset = self.filter(author=author)
+        if using is None and sharding.is_sharded():
+            using = sharding.shard_for(author.pk)
+        return queryset.using(using) if using else queryset
 
 
 class Note(models.Model):
@@ -11,14 +33,13 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
     slug = models.SlugField(
         'Адрес для страницы с заметкой',
         max_length=100,
-        unique=True,
         blank=True,
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
@@ -26,13 +47,149 @@ class Note(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Заметки шарда ссылаются на пользователей из default.
+        db_constraint=False,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
     )
 
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        # Slug уникален в пределах автора: заметки разных авторов
+        # могут лежать в разных шардах (см. notes.sharding).
+        constraints = (
+            models.UniqueConstraint(
+                fields=('author', 'slug'), name='note_author_slug_uniq',
+            ),
+        )
+        # updated_at в конце индексов делает их покрывающими для
+        # проверки ETag и Last-Modified: таблица при этом не читается.
+        indexes = (
+            # Список заметок автора в порядке id (курсорная пагинация).
+            # Заголовок и slug в индексе: страница списка отрисовывается
+            # из индекса, не проходя по строкам с длинным текстом.
+            models.Index(
+                fields=('author', 'id', 'updated_at', 'title', 'slug'),
+                name='note_author_list_idx',
+            ),
+            # Поиск заметки автора по slug на страницах заметки.
+            models.Index(
+                fields=('author', 'slug', 'updated_at'),
+                name='note_author_slug_upd_idx',
+            ),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """Сохраняет заметку; пустой slug формируется из заголовка.
+
+        Свободен ли slug, заранее не проверяется: это решает уникальный
+        индекс. При конфликте сгенерированный slug получает суффикс
+        -2, -3 и т. д., а заданный вручную — возвращает IntegrityError.
+        Запись идёт в шард автора.
+        """
+        using = kwargs.pop('using', None)
+        if self.slug:
+            with sharding.atomic_for(self.author_id, using) as alias:
+                super().save(*args, using=alias, **kwargs)
+            return
+        max_slug_length = self._meta.get_field('slug').max_length
+        base = slugs.make_slug(self.title, max_slug_length)
+        for slug in slugs.candidates(base, max_slug_length):
+            self.slug = slug
+            try:
+                with sharding.atomic_for(self.author_id, using) as alias:
+                    super().save(*args, using=alias, **kwargs)
+                return
+            except IntegrityError as error:
+                if not slugs.is_slug_conflict(error):
+                    self.slug = ''
+                    raise
+        self.slug = base
+        raise IntegrityError(
+            f'UNIQUE constraint failed: no free slug for {base}'
+        )
+
+    def delete(self, using=None, keep_parents=False):
+        """Удаляет заметку в шарде автора, как и save.
+
+        Заметка, прочитанная из шарда, откуда автор уже переехал,
+        тоже даёт ShardMoved: в новом шарде у заметок другие id.
+        """
+        with sharding.atomic_for(self.author_id, using) as alias:
+            if (
+                using is None and sharding.is_sharded()
+                and self._state.db not in (None, alias)
+            ):
+                raise sharding.ShardMoved(
+                    f'Заметки автора {self.author_id} переехали.'
+                )
+            return super().delete(using=alias, keep_parents=keep_parents)
+
+
+class NoteRevisionQuerySet(models.QuerySet):
+
+    def for_note(self, note):
+        """Версии заметки из той же базы, откуда прочитана заметка."""
+        return self.filter(note=note).using(note._state.db)
+
+    def summaries(self):
+        """Версии без текста: для страницы истории."""
+        return self.only(*REVISION_SUMMARY_FIELDS)
+
+
+class NoteRevision(models.Model):
+    """Прежняя версия заметки: полный текст или дельта к следующей.
+
+    Хранится в шарде заметки. Как восстанавливается текст,
+    см. notes.revisions.
+    """
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        # Поиск по заметке обслуживает индекс уникальности.
+        db_index=False,
+    )
+    number = models.PositiveIntegerField('Номер версии')
+    title = models.CharField('Заголовок', max_length=100)
+    slug = models.SlugField('Адрес', max_length=100, db_index=False)
+    updated_at = models.DateTimeField('Дата изменения')
+    is_snapshot = models.BooleanField('Полный текст', default=False)
+    # Текст или дельта — последняя колонка: поля истории читаются,
+    # не проходя по страницам переполнения длинного значения.
+    data = CompressedTextField('Текст или дельта')
+
+    objects = NoteRevisionQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='note_revision_number_uniq',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.title} (версия {self.number})'
+
+
+class ShardPlacement(models.Model):
+    """Явный шард автора, важнее хеша (см. notes.sharding).
+
+    Хранится только в default.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard_placement',
+    )
+    alias = models.CharField('Шард', max_length=100)
+
+    def __str__(self):
+        return f'{self.author_id} → {self.alias}'
@@ -0,0 +1,111 @@
+from django.http import Http404
+
+
+def parse_cursor(value):
+    """Курсор страницы: id заметки или None для первой страницы."""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise Http404('Некорректный курсор страницы.')
+
+
+class KeysetPage:
+    """Страница курсорной пагинации."""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        """Ключ последней записи: с него начинается следующая страница."""
+        if self._has_next and self.object_list:
+            return self.object_list[-1].pk
+        return None
+
+    @property
+    def previous_cursor(self):
+        """Ключ первой записи: им заканчивается предыдущая страница."""
+        if self._has_previous and self.object_list:
+            return self.object_list[0].pk
+        return None
+
+
+class KeysetPaginator:
+    """Пагинация по первичному ключу без OFFSET.
+
+    Страница выбирается условием ``pk > курсор`` (или ``pk < курсор``
+    для движения назад), поэтому стоимость запроса не зависит от того,
+    насколько далеко пользователь пролистал список.
+
+    Курсор, за которым записей не осталось (их удалили, ссылка
+    устарела), даёт не пустую страницу, а крайнюю: первую для before
+    и последнюю для after.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        """Возвращает страницу после курсора after или перед before."""
+        after, before = parse_cursor(after), parse_cursor(before)
+        rows = list(self._page_query(after, before))
+        if not rows and (after is not None or before is not None):
+            last = before is None
+            after, before = None, None
+            rows = list(self._page_query(after, before, last))
+            return self._make_page(rows, after, before, last)
+        return self._make_page(rows, after, before)
+
+    async def aget_page(self, after=None, before=None):
+        """Асинхронная версия get_page."""
+        after, before = parse_cursor(after), parse_cursor(before)
+        rows = [row async for row in self._page_query(after, before)]
+        if not rows and (after is not None or before is not None):
+            last = before is None
+            after, before = None, None
+            rows = [
+                row async for row in self._page_query(after, before, last)
+            ]
+            return self._make_page(rows, after, before, last)
+        return self._make_page(rows, after, before)
+
+    def _page_query(self, after, before, last=False):
+        """Запрос на per_page + 1 записей: лишняя говорит о продолжении."""
+        limit = self.per_page + 1
+        if before is not None or last:
+            queryset = self.queryset
+            if before is not None:
+                queryset = queryset.filter(pk__lt=before)
+            return queryset.order_by('-pk')[:limit]
+        queryset = self.queryset
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        return queryset.order_by('pk')[:limit]
+
+    def _make_page(self, rows, after, before, last=False):
+        if before is not None or last:
+            has_previous = len(rows) > self.per_page
+            object_list = rows[:self.per_page][::-1]
+            return KeysetPage(object_list, not last, has_previous)
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], has_next, after is not None)
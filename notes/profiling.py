@@ -0,0 +1,171 @@
+"""Профилирование отдельных запросов в продакшене.
+
+ProfilingMiddleware профилирует долю NOTES_PROFILE_SAMPLE_RATE
+запросов к маршрутам NOTES_PROFILE_URL_NAMES (пусто — ко всем),
+а также запросы с заголовком X-Notes-Profile, равным
+NOTES_PROFILE_TOKEN. Профилировщик — NOTES_PROFILER:
+
+* cprofile — точные счётчики вызовов, файл .pstats для pstats,
+  snakeviz или flameprof; замедляет запрос в разы;
+* sampler — поток, который раз в NOTES_PROFILE_SAMPLER_INTERVAL
+  секунд снимает стек запроса; файл .folded в формате свёрнутых
+  стеков для flamegraph.pl и speedscope; почти не замедляет запрос.
+
+Затраты ограничены жёстко: в процессе одновременно профилируется
+не больше одного запроса и не больше NOTES_PROFILE_MAX_PER_MINUTE
+запросов в минуту, заголовок эти пределы не обходит. В каталоге
+NOTES_PROFILE_DIR остаются только новейшие файлы — не больше
+NOTES_PROFILE_MAX_FILES штук и NOTES_PROFILE_MAX_BYTES байт.
+"""
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Notes-Profile'
+
+
+class Sampler:
+    """Снимает стек одного потока через равные промежутки времени.
+
+    Одинаковые стеки считаются вместе, поэтому память зависит
+    от числа разных стеков, а не от длительности запроса.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f'{code.co_name} ({os.path.basename(code.co_filename)}'
+                    f':{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def enable(self):
+        self.thread.start()
+
+    def disable(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def dump_stats(self, path):
+        """Свёрнутые стеки: строка «кадр;кадр;кадр число снимков»."""
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.items():
+                file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    'cprofile': (cProfile.Profile, 'pstats'),
+    'sampler': (
+        lambda: Sampler(
+            threading.get_ident(), settings.NOTES_PROFILE_SAMPLER_INTERVAL
+        ),
+        'folded',
+    ),
+}
+
+
+class Budget:
+    """Пределы профилирования в процессе: один запрос и N в минуту."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = False
+        self.started = deque()
+
+    def acquire(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.started and now - self.started[0] > 60:
+                self.started.popleft()
+            if (
+                self.running
+                or len(self.started) >= settings.NOTES_PROFILE_MAX_PER_MINUTE
+            ):
+                return False
+            self.running = True
+            self.started.append(now)
+            return True
+
+    def release(self):
+        with self.lock:
+            self.running = False
+
+
+def is_wanted(request):
+    """Нужно ли профилировать запрос: заголовок, доля и маршрут."""
+    token = settings.NOTES_PROFILE_TOKEN
+    if token and constant_time_compare(request.headers.get(HEADER, ''), token):
+        return True
+    rate = settings.NOTES_PROFILE_SAMPLE_RATE
+    if not (rate > 0 and random.random() < rate):
+        return False
+    if not settings.NOTES_PROFILE_URL_NAMES:
+        return True
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    return match.view_name in settings.NOTES_PROFILE_URL_NAMES
+
+
+def rotate(directory):
+    """Удаляет старые профили сверх пределов числа файлов и объёма."""
+    files = []
+    for path in directory.iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # Файл удалил другой процесс.
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort(reverse=True)
+    total = 0
+    for number, (_, size, path) in enumerate(files, start=1):
+        total += size
+        if (
+            number > settings.NOTES_PROFILE_MAX_FILES
+            or total > settings.NOTES_PROFILE_MAX_BYTES
+        ):
+            path.unlink(missing_ok=True)
+
+
+def save(profiler, extension, request, elapsed):
+    """Пишет профиль в NOTES_PROFILE_DIR и отдаёт путь к файлу."""
+    directory = Path(settings.NOTES_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    match = request.resolver_match
+    route = match.view_name.replace(':', '-') if match else 'unknown'
+    name = (
+        f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-'
+        f'{threading.get_ident()}-{route}-{elapsed * 1000:.0f}ms.{extension}'
+    )
+    path = directory / name
+    profiler.dump_stats(path)
+    rotate(directory)
+    return path
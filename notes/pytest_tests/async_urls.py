@@ -0,0 +1,12 @@
+# Маршруты проекта с асинхронными представлениями заметок
+from django.urls import include, path
+
+from notes.urls import app_name, build_urlpatterns
+from yanote.urls import urlpatterns as project_urlpatterns
+
+urlpatterns = [
+    path('', include((build_urlpatterns(use_async=True), app_name))),
+] + [
+    pattern for pattern in project_urlpatterns
+    if getattr(pattern, 'namespace', None) != app_name
+]
@@ -13,9 +13,11 @@ import pytest
 
 # Импортируем класс клиента.
 from django.test.client import Client
+from django.core.cache import caches
 
 # Импортируем модель заметки, чтобы создать экземпляр.
 from notes.models import Note
+from notes.cache import stats
 
 
 @pytest.fixture
@@ -79,3 +81,37 @@ def form_data():
     } 
 
 # <----------
+
+
+# Тестовая база — файл, а не общая база в памяти: в памяти SQLite
+# блокирует таблицы целиком и не ждёт, поэтому параллельные
+# запросы из потоков сразу падают с ошибкой.
+# Вторая база в отдельном файле изображает реплику для чтения;
+# тесты, которым она нужна, включают её в NOTES_READ_REPLICAS.
+# Третья так же изображает второй шард заметок (NOTES_SHARDS).
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(tmp_path_factory):
+    from django.conf import settings
+
+    path = tmp_path_factory.mktemp('db')
+    databases = settings.DATABASES
+    databases['default'].setdefault('TEST', {})['NAME'] = str(
+        path / 'test.sqlite3'
+    )
+    for alias in ('replica', 'shard'):
+        databases[alias] = {
+            **databases['default'],
+            'TEST': {
+                **databases['default']['TEST'],
+                'NAME': str(path / f'{alias}.sqlite3'),
+            },
+        }
+
+
+# Кеш не откатывается вместе с транзакцией теста,
+# поэтому очищаем его перед каждым тестом.
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    stats.reset()
@@ -0,0 +1,112 @@
+# Тестирование асинхронных представлений заметок
+# ---------->
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import resolve, reverse
+from pytest_django.asserts import assertRedirects
+from pytils.translit import slugify
+
+from notes import async_views
+from notes.forms import WARNING
+from notes.models import Note
+
+pytestmark = pytest.mark.urls('notes.pytest_tests.async_urls')
+
+
+@pytest.mark.parametrize(
+    'name, args',
+    (
+        ('notes:list', ()),
+        ('notes:add', ()),
+        ('notes:detail', ('slug',)),
+        ('notes:edit', ('slug',)),
+        ('notes:delete', ('slug',)),
+    ),
+)
+def test_routes_use_async_views(name, args):
+    view_class = resolve(reverse(name, args=args)).func.view_class
+    assert view_class.__module__ == async_views.__name__
+    assert view_class.view_is_async
+
+
+@pytest.mark.parametrize('name', ('notes:list', 'notes:add'))
+def test_anonymous_redirected(client, name):
+    url = reverse(name)
+    response = client.get(url)
+    assertRedirects(response, f'{reverse("users:login")}?next={url}')
+
+
+@pytest.mark.parametrize(
+    'name', ('notes:detail', 'notes:edit', 'notes:delete')
+)
+def test_other_author_gets_404(not_author_client, note, name):
+    response = not_author_client.get(reverse(name, args=(note.slug,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_list_pages(author_client, author, settings):
+    settings.NOTES_PAGE_SIZE = 2
+    notes = [
+        Note.objects.create(title=f'Заметка {i}', text='Текст', author=author)
+        for i in range(3)
+    ]
+    response = author_client.get(reverse('notes:list'))
+    page = response.context['page_obj']
+    assert list(page) == notes[:2]
+    assert page.has_next()
+    response = author_client.get(
+        reverse('notes:list'), {'after': page.next_cursor}
+    )
+    assert list(response.context['object_list']) == notes[2:]
+
+
+def test_create_generates_slug(author_client, author, form_data):
+    form_data.pop('slug')
+    response = author_client.post(reverse('notes:add'), data=form_data)
+    assertRedirects(response, reverse('notes:success'))
+    note = Note.objects.get()
+    assert (note.slug, note.author) == (slugify(form_data['title']), author)
+
+
+def test_create_taken_slug_shows_error(author_client, note, form_data):
+    form_data['slug'] = note.slug
+    response = author_client.post(reverse('notes:add'), data=form_data)
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['form'].errors['slug'] == [note.slug + WARNING]
+    assert Note.objects.count() == 1
+
+
+def test_edit_and_delete(author_client, note, form_data):
+    response = author_client.post(
+        reverse('notes:edit', args=(note.slug,)), data=form_data
+    )
+    assertRedirects(response, reverse('notes:success'))
+    note.refresh_from_db()
+    assert (note.title, note.slug) == (form_data['title'], form_data['slug'])
+    response = author_client.post(reverse('notes:delete', args=(note.slug,)))
+    assertRedirects(response, reverse('notes:success'))
+    assert not Note.objects.exists()
+
+
+@pytest.mark.parametrize('name, args', (
+    ('notes:list', ()), ('notes:detail', ('note-slug',)),
+))
+def test_not_modified(author_client, note, name, args):
+    url = reverse(name, args=args)
+    response = author_client.get(url)
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_async_client(author, note):
+    client = AsyncClient()
+    client.force_login(author)
+    response = async_to_sync(client.get)(
+        reverse('notes:detail', args=(note.slug,))
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert note.text in response.content.decode()
+# <----------
@@ -0,0 +1,134 @@
+# Тестирование пакетного JSON API
+# ---------->
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pytils.translit import slugify
+
+from notes.models import Note
+
+
+@pytest.fixture
+def batch_url():
+    return reverse('notes:batch')
+
+
+def post_batch(client, url, operations):
+    return client.post(
+        url, json.dumps({'operations': operations}),
+        content_type='application/json',
+    )
+
+
+def test_mixed_batch(author_client, author, note, batch_url):
+    other = Note.objects.create(title='Вторая', text='Текст', author=author)
+    updated_at = note.updated_at
+    response = post_batch(author_client, batch_url, [
+        {'op': 'create', 'data': {'title': 'Новая', 'text': 'Текст'}},
+        {'op': 'update', 'slug': note.slug, 'data': {'text': 'Другой'}},
+        {'op': 'delete', 'slug': other.slug},
+    ])
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+    assert (body['create'], body['update'], body['delete'], body['failed']) \
+        == (1, 1, 1, 0)
+    assert [item['status'] for item in body['results']] == ['ok'] * 3
+    created = Note.objects.get(pk=body['results'][0]['id'])
+    assert (created.slug, created.author) == (slugify('Новая'), author)
+    note.refresh_from_db()
+    assert note.text == 'Другой'
+    assert note.updated_at > updated_at
+    assert not Note.objects.filter(pk=other.pk).exists()
+
+
+def test_item_errors_do_not_block_batch(
+    author_client, not_author, note, batch_url
+):
+    foreign = Note.objects.create(
+        title='Чужая', text='Текст', author=not_author
+    )
+    own = Note.objects.create(title='Своя', text='Текст', author=note.author)
+    response = post_batch(author_client, batch_url, [
+        {'op': 'rename', 'slug': note.slug},
+        {'op': 'delete', 'slug': foreign.slug},
+        {'op': 'update', 'slug': note.slug, 'data': {'slug': own.slug}},
+        {'op': 'create', 'data': {'title': 'x' * 101, 'text': 'Текст'}},
+        {'op': 'create', 'data': {'title': 'Годная', 'text': 'Текст'}},
+    ])
+    results = response.json()['results']
+    assert [item['status'] for item in results] == ['error'] * 4 + ['ok']
+    assert Note.objects.filter(pk=foreign.pk).exists()
+    note.refresh_from_db()
+    assert note.slug == 'note-slug'
+
+
+def test_generated_slugs_get_suffixes(author_client, batch_url):
+    response = post_batch(author_client, batch_url, [
+        {'op': 'create', 'data': {'title': 'Повтор', 'text': 'Текст'}},
+    ] * 3)
+    base = slugify('Повтор')
+    assert [item['slug'] for item in response.json()['results']] == [
+        base, f'{base}-2', f'{base}-3'
+    ]
+
+
+def test_same_note_twice_is_error(author_client, note, batch_url):
+    response = post_batch(author_client, batch_url, [
+        {'op': 'update', 'slug': note.slug, 'data': {'text': 'Раз'}},
+        {'op': 'delete', 'slug': note.slug},
+    ])
+    assert [item['status'] for item in response.json()['results']] == [
+        'ok', 'error'
+    ]
+    assert Note.objects.filter(pk=note.pk).exists()
+
+
+def test_query_count_does_not_grow(author_client, author, batch_url):
+    def count_queries(size):
+        notes = Note.objects.bulk_create(
+            Note(title=f'{size}-{i}', text='Текст', slug=f'n-{size}-{i}',
+                 author=author)
+            for i in range(size * 2)
+        )
+        operations = [
+            {'op': 'create', 'data': {'title': f'Новая {size}', 'text': 'Т'}}
+            for _ in range(size)
+        ] + [
+            {'op': 'update', 'slug': note.slug, 'data': {'text': 'Т'}}
+            for note in notes[:size]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            post_batch(author_client, batch_url, operations)
+        return len(queries)
+
+    assert count_queries(5) == count_queries(50)
+
+
+def test_list_sees_batch_changes(author_client, note, batch_url):
+    author_client.get(reverse('notes:list'))
+    post_batch(author_client, batch_url, [
+        {'op': 'create', 'data': {'title': 'Из пакета', 'text': 'Текст'}},
+    ])
+    response = author_client.get(reverse('notes:list'))
+    assert 'Из пакета' in response.content.decode()
+
+
+@pytest.mark.parametrize('body', (
+    'не json', '[]', '{"operations": {}}',
+    json.dumps({'operations': [{}] * 1001}),
+))
+def test_bad_request(author_client, batch_url, body):
+    response = author_client.post(
+        batch_url, body, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_anonymous_forbidden(client, batch_url):
+    response = post_batch(client, batch_url, [])
+    assert response.status_code == HTTPStatus.FORBIDDEN
+# <----------
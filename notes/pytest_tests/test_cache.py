@@ -0,0 +1,64 @@
+# Тестирование кеша заметок
+# ---------->
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.cache import stats
+
+
+def note_queries(client, url):
+    """Запросы за данными заметок, без проверки ETag по индексу."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    count = sum('"notes_note"."title"' in query['sql'] for query in queries)
+    return response, count
+
+
+@pytest.mark.parametrize(
+    'name, args',
+    (
+        ('notes:list', None),
+        ('notes:detail', ('note-slug',)),
+    ),
+)
+def test_repeated_request_skips_database(author_client, note, name, args):
+    url = reverse(name, args=args)
+    # Первый запрос выставляет CSRF-cookie, без него HTML не кешируется.
+    first, first_count = note_queries(author_client, url)
+    second, second_count = note_queries(author_client, url)
+    third, third_count = note_queries(author_client, url)
+    assert first_count == 1
+    assert second_count == third_count == 0
+    assert second.content == third.content
+    assert (stats.hits, stats.misses) == (2, 2)
+
+
+def test_edit_invalidates_cache(author_client, note):
+    url = reverse('notes:list')
+    author_client.get(url)
+    author_client.get(url)
+    note.title = 'Новое название'
+    note.save()
+    response, count = note_queries(author_client, url)
+    assert count == 1
+    assert 'Новое название' in response.content.decode()
+
+
+def test_delete_invalidates_cache(author_client, note):
+    url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(url)
+    note.delete()
+    assert author_client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_cache_is_per_user(author_client, not_author_client, note):
+    url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(url)
+    author_client.get(url)
+    response = not_author_client.get(url)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+# <----------
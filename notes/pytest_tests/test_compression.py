@@ -0,0 +1,97 @@
+# Тестирование сжатия длинных текстов заметок
+# ---------->
+import json
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+
+from notes import compression, search
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db
+
+LONG_TEXT = 'Строка журнала: запрос обработан успешно.\n' * 50
+
+
+@pytest.fixture
+def zlib(settings):
+    settings.NOTES_TEXT_COMPRESSION = 'zlib'
+    settings.NOTES_TEXT_COMPRESSION_THRESHOLD = 256
+    call_command('compress_notes', stdout=StringIO())
+
+
+def stored(note):
+    """Значение колонки text в том виде, в каком оно лежит в базе."""
+    return Note.objects.values_list('text', flat=True).get(pk=note.pk)
+
+
+def test_long_text_is_stored_compressed(zlib, author):
+    note = Note.objects.create(title='Журнал', text=LONG_TEXT, author=author)
+    value = stored(note)
+    assert value.startswith(compression.FORMATS['zlib'])
+    assert len(value) < len(LONG_TEXT.encode()) / 10
+    # Распаковка — только при обращении к тексту.
+    loaded = Note.objects.get(pk=note.pk)
+    assert loaded.__dict__['text'] == value
+    assert loaded.text == LONG_TEXT
+    assert loaded.__dict__['text'] == LONG_TEXT
+
+
+def test_short_text_stays_plain(zlib, author):
+    note = Note.objects.create(
+        title='Заметка', text='Короткий текст', author=author
+    )
+    assert stored(note) == 'Короткий текст'
+
+
+def test_compressed_notes_are_found_and_exported(zlib, author_client, author):
+    Note.objects.create(
+        title='Журнал', text=LONG_TEXT, slug='log', author=author
+    )
+    response = author_client.get(reverse('notes:search'), {'q': 'обработан'})
+    [found] = response.context['object_list']
+    assert '<mark>обработан</mark>' in found.snippet
+    response = author_client.get(reverse('notes:export', args=('jsonl',)))
+    exported = json.loads(b''.join(response.streaming_content))
+    assert exported['text'] == LONG_TEXT
+
+
+def test_command_recompresses_existing_notes(settings, author_client, note):
+    note.text = LONG_TEXT
+    note.save()
+    updated_at = note.updated_at
+    settings.NOTES_TEXT_COMPRESSION_THRESHOLD = 256
+    # Без сжатия схема индекса не зависит от notes_text.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE sql LIKE '%notes_text(%'"
+        )
+        assert cursor.fetchall() == []
+    for method, kind in (('zlib', bytes), ('off', str)):
+        settings.NOTES_TEXT_COMPRESSION = method
+        call_command('compress_notes', batch_size=1, stdout=StringIO())
+        assert isinstance(stored(note), kind)
+        assert search.has_compressed_index() == (kind is bytes)
+        assert note.title in author_client.get(
+            reverse('notes:search'), {'q': 'журнала'}
+        ).content.decode()
+        note.refresh_from_db()
+        assert note.text == LONG_TEXT
+        assert note.updated_at == updated_at
+    # Индекс по-прежнему сходится с таблицей.
+    note.delete()
+    response = author_client.get(reverse('notes:search'), {'q': 'журнала'})
+    assert list(response.context['object_list']) == []
+
+
+@pytest.mark.skipif(
+    compression.zstandard is not None, reason='пакет zstandard установлен'
+)
+def test_zstd_requires_package(zlib, settings, author):
+    settings.NOTES_TEXT_COMPRESSION = 'zstd'
+    with pytest.raises(ImproperlyConfigured):
+        Note.objects.create(title='Журнал', text=LONG_TEXT, author=author)
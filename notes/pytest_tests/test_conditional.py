@@ -0,0 +1,79 @@
+# Тестирование условных запросов (ETag и Last-Modified)
+# ---------->
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+
+
+@pytest.fixture
+def detail_url(note):
+    return reverse('notes:detail', args=(note.slug,))
+
+
+@pytest.fixture
+def list_url():
+    return reverse('notes:list')
+
+
+def revalidate(client, url, response):
+    with CaptureQueriesContext(connection) as queries:
+        result = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    return result, [query['sql'] for query in queries]
+
+
+def test_updated_at_changes_on_save(note):
+    first = note.updated_at
+    note.text = 'Новый текст'
+    note.save()
+    assert note.updated_at > first
+
+
+@pytest.mark.parametrize('url', ('detail_url', 'list_url'))
+def test_not_modified_is_cheap(author_client, url, request):
+    url = request.getfixturevalue(url)
+    response = author_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    response, queries = revalidate(author_client, url, response)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert not response.templates
+    note_queries = [sql for sql in queries if 'notes_note' in sql]
+    assert len(note_queries) == 1
+    assert '"notes_note"."text"' not in note_queries[0]
+
+
+def test_detail_if_modified_since(author_client, detail_url):
+    response = author_client.get(detail_url)
+    response = author_client.get(
+        detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_detail_changes_after_edit(author_client, note, detail_url):
+    response = author_client.get(detail_url)
+    note.text = 'Новый текст'
+    note.save()
+    response, _ = revalidate(author_client, detail_url, response)
+    assert response.status_code == HTTPStatus.OK
+    assert 'Новый текст' in response.content.decode()
+
+
+def test_list_changes_after_delete(author_client, author, note, list_url):
+    Note.objects.create(title='Вторая', text='Текст', author=author)
+    response = author_client.get(list_url)
+    note.delete()
+    response, _ = revalidate(author_client, list_url, response)
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_etag_is_per_user(author_client, not_author_client, list_url, note):
+    response = author_client.get(list_url)
+    response, _ = revalidate(not_author_client, list_url, response)
+    assert response.status_code == HTTPStatus.OK
+# <----------
@@ -0,0 +1,75 @@
+# Тестирование генератора синтетического набора данных
+# ---------->
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from notes import dataset, search, slugs
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db
+
+OPTIONS = {
+    'users': 7, 'notes': 300, 'seed': 5, 'batch_size': 100, 'workers': 1,
+    'stdout': StringIO(),
+}
+
+
+@pytest.fixture(autouse=True)
+def small_corpus(monkeypatch):
+    """Корпус поменьше: полный строится секунды."""
+    monkeypatch.setattr(dataset, 'CORPUS_SIZE', 2 ** 16)
+    dataset.corpus.cache_clear()
+    yield
+    dataset.corpus.cache_clear()
+
+
+def generate(**options):
+    call_command('generate_dataset', **{**OPTIONS, **options})
+    return list(
+        Note.objects.order_by('pk')
+        .values_list('pk', 'title', 'slug', 'text', 'author__username')
+    )
+
+
+def test_same_seed_gives_same_dataset():
+    first = generate()
+    Note.objects.all().delete()
+    get_user_model().objects.all().delete()
+    assert generate() == first
+    assert len(first) == 300
+    assert get_user_model().objects.count() == 7
+    Note.objects.all().delete()
+    get_user_model().objects.all().delete()
+    assert generate(seed=6) != first
+
+
+def test_slugs_follow_note_save_rules():
+    rows = generate(text_size='fixed:50')
+    seen = set()
+    for _, title, slug, text, author in rows:
+        base = slugs.make_slug(title, 100)
+        assert slug in slugs.candidates(base, 100, attempts=len(rows))
+        assert (author, slug) not in seen
+        seen.add((author, slug))
+        assert len(text) <= 50
+    assert any(slug.endswith('-2') for _, _, slug, _, _ in rows)
+
+
+def test_search_index_is_rebuilt(author):
+    generate()
+    note = Note.objects.order_by('pk').first()
+    word = note.title.split()[0]
+    assert note in search.search_notes(note.author, word, 500)
+    # Триггеры индекса вернулись: новая заметка сразу ищется.
+    created = Note.objects.create(
+        title='Уникальный', text='Текст', author=author
+    )
+    assert search.search_notes(author, 'Уникальный', 10) == [created]
+
+
+def test_invalid_text_size():
+    with pytest.raises(CommandError):
+        generate(text_size='normal:10')
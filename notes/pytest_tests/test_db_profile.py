@@ -0,0 +1,51 @@
+# Тестирование профиля базы данных для production
+# ---------->
+import runpy
+
+import pytest
+from django.db.utils import ConnectionHandler
+
+from yanote import settings
+
+
+def load_database():
+    """Настройки базы из settings.py с текущим окружением."""
+    return runpy.run_path(settings.__file__)['DATABASES']['default']
+
+
+@pytest.fixture
+def production(monkeypatch, tmp_path):
+    monkeypatch.setenv('NOTES_DB_PROFILE', 'production')
+    database = load_database()
+    handler = ConnectionHandler(
+        {'default': dict(database, NAME=str(tmp_path / 'db.sqlite3'))}
+    )
+    yield database, handler['default']
+    handler.close_all()
+
+
+def test_persistent_connections(production):
+    database, _ = production
+    assert database['CONN_MAX_AGE'] > 0
+    assert database['CONN_HEALTH_CHECKS']
+
+
+@pytest.mark.django_db
+def test_pragmas_applied_on_connect(production):
+    _, connection = production
+    with connection.cursor() as cursor:
+        values = {
+            pragma: cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout')
+        }
+    assert values == {
+        'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000,
+    }
+
+
+def test_default_profile_unchanged(monkeypatch):
+    monkeypatch.delenv('NOTES_DB_PROFILE', raising=False)
+    database = load_database()
+    assert 'init_command' not in database['OPTIONS']
+    assert database.get('CONN_MAX_AGE', 0) == 0
+# <----------
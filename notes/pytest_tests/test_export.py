@@ -0,0 +1,69 @@
+# Тестирование выгрузки заметок
+# ---------->
+import csv
+import io
+import json
+import zipfile
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+
+from notes.models import Note
+
+
+@pytest.fixture
+def notes(author, note, not_author, settings):
+    settings.NOTES_EXPORT_CHUNK_SIZE = 2
+    Note.objects.create(
+        title='Чужая', text='Текст', slug='foreign', author=not_author
+    )
+    return [note] + Note.objects.bulk_create(
+        Note(title=f'Заметка {i}', text=f'Текст "{i}",\nвторая строка',
+             slug=f'note-{i}', author=author)
+        for i in range(4)
+    )
+
+
+def export(client, fmt):
+    response = client.get(reverse('notes:export', args=(fmt,)))
+    assert response.status_code == HTTPStatus.OK
+    assert response.streaming
+    return b''.join(response.streaming_content)
+
+
+def test_jsonl(author_client, notes):
+    rows = [
+        json.loads(line)
+        for line in export(author_client, 'jsonl').decode().splitlines()
+    ]
+    assert rows == [
+        {'id': n.id, 'title': n.title, 'slug': n.slug, 'text': n.text}
+        for n in notes
+    ]
+
+
+def test_csv(author_client, notes):
+    content = export(author_client, 'csv').decode()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [row['text'] for row in rows] == [n.text for n in notes]
+
+
+def test_zip(author_client, notes):
+    archive = zipfile.ZipFile(io.BytesIO(export(author_client, 'zip')))
+    assert archive.namelist() == [f'{n.slug}.txt' for n in notes]
+    assert archive.read(f'{notes[1].slug}.txt').decode() == (
+        f'{notes[1].title}\n\n{notes[1].text}'
+    )
+
+
+def test_export_is_logged(author_client, notes, caplog):
+    with caplog.at_level('INFO', logger='notes.exporter'):
+        export(author_client, 'jsonl')
+    assert f'{len(notes)} заметок' in caplog.text
+
+
+def test_unknown_format(author_client):
+    url = reverse('notes:export', args=('xml',))
+    assert author_client.get(url).status_code == HTTPStatus.NOT_FOUND
+# <----------
@@ -0,0 +1,101 @@
+# Тестирование импорта заметок
+# ---------->
+import io
+import json
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from pytils.translit import slugify
+
+from notes.exporter import stream_export
+from notes import importer
+from notes.importer import import_notes
+from notes.models import Note
+
+
+def jsonl(*rows):
+    return '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows)
+
+
+def test_import_jsonl(author, note):
+    data = jsonl(
+        {'title': 'Первая', 'text': 'Текст'},
+        {'title': 'Вторая', 'text': 'Текст', 'slug': 'second'},
+    )
+    result = import_notes(io.BytesIO(data.encode()), author, batch_size=1)
+    assert (result.created, result.failed) == (2, 0)
+    assert set(
+        Note.objects.filter(author=author).values_list('slug', flat=True)
+    ) == {note.slug, slugify('Первая'), 'second'}
+
+
+def test_generated_slug_collisions_get_suffix(author):
+    Note.objects.create(
+        title='Дубль', text='Текст', slug=slugify('Дубль'), author=author
+    )
+    data = jsonl(*({'title': 'Дубль', 'text': 'Текст'} for _ in range(3)))
+    result = import_notes(io.BytesIO(data.encode()), author, batch_size=2)
+    assert result.created == 3
+    base = slugify('Дубль')
+    assert set(Note.objects.values_list('slug', flat=True)) == {
+        base, f'{base}-2', f'{base}-3', f'{base}-4'
+    }
+
+
+def test_invalid_rows_are_reported(author, note):
+    data = '\n'.join((
+        '{"title": "Без текста"}',
+        'не json',
+        json.dumps({'title': 'Занятый', 'text': 'Текст', 'slug': note.slug}),
+        json.dumps({'title': 'Хорошая', 'text': 'Текст'}),
+    ))
+    result = import_notes(io.BytesIO(data.encode()), author)
+    assert (result.created, result.failed) == (1, 3)
+    assert [line for line, _ in result.errors] == [1, 2, 3]
+
+
+def test_own_csv_export_with_long_text(author):
+    Note.objects.create(
+        title='Длинная', text='а' * 200_000, slug='long', author=author
+    )
+    data = b''.join(stream_export(Note.objects.all(), 'csv', 100))
+    Note.objects.all().delete()
+    result = import_notes(io.BytesIO(data), author, fmt='csv')
+    assert (result.created, result.failed) == (1, 0)
+    assert len(Note.objects.get(slug='long').text) == 200_000
+
+
+def test_unreadable_files_are_reported(author, monkeypatch):
+    data = jsonl({'title': 'Первая', 'text': 'Текст'})
+    result = import_notes(io.BytesIO(data.encode('cp1251')), author)
+    assert (result.created, result.failed) == (0, 1)
+    assert 'UTF-8' in result.errors[0][1]
+    monkeypatch.setattr(importer, 'CSV_FIELD_SIZE_LIMIT', 10)
+    data = 'title,text\nПервая,Текст\nВторая,Очень длинный текст\n'
+    result = import_notes(io.BytesIO(data.encode()), author, fmt='csv')
+    assert result.created == 1
+    (line, message), = result.errors
+    assert line == 3 and 'CSV' in message
+
+
+def test_import_csv_command(author, tmp_path):
+    path = tmp_path / 'notes.csv'
+    path.write_text('title,text,slug\nИз CSV,"Текст, с запятой",from-csv\n')
+    call_command(
+        'import_notes', str(path), author=author.username, stdout=StringIO()
+    )
+    assert Note.objects.get(slug='from-csv').text == 'Текст, с запятой'
+
+
+def test_upload_endpoint(author_client, author, settings):
+    # Файл пишется на диск, как это происходит с большими загрузками.
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 0
+    upload = SimpleUploadedFile(
+        'notes.jsonl', jsonl({'title': 'Загружено', 'text': 'Текст'}).encode()
+    )
+    response = author_client.post(reverse('notes:import'), {'file': upload})
+    assert response.context['result'].created == 1
+    assert Note.objects.get().author == author
+# <----------
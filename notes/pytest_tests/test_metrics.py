@@ -0,0 +1,96 @@
+# Тестирование метрик Prometheus
+# ---------->
+import multiprocessing
+
+import pytest
+from django.urls import reverse
+
+from notes import metrics
+from notes.middleware import MetricsMiddleware
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.NOTES_METRICS = True
+    settings.NOTES_METRICS_DIR = str(tmp_path)
+    return tmp_path
+
+
+def scrape(client):
+    response = client.get(reverse('metrics'))
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    return response.content.decode().splitlines()
+
+
+def test_disabled_metrics_are_hidden(client, settings):
+    settings.NOTES_METRICS = False
+    assert client.get(reverse('metrics')).status_code == 404
+
+
+def test_requests_are_counted(author_client, metrics_dir):
+    for _ in range(2):
+        author_client.get(reverse('notes:list'))
+    author_client.get('/missing/')
+    lines = scrape(author_client)
+    assert (
+        'notes_requests_total{method="GET",status="2xx",view="notes:list"} 2'
+        in lines
+    )
+    assert (
+        'notes_requests_total{method="GET",status="4xx",view="unmatched"} 1'
+        in lines
+    )
+    buckets = [
+        line for line in lines
+        if line.startswith('notes_request_duration_seconds_bucket'
+                           '{view="notes:list"')
+    ]
+    assert len(buckets) == len(metrics.LATENCY_BUCKETS) + 1
+    assert buckets[-1] == (
+        'notes_request_duration_seconds_bucket'
+        '{view="notes:list",le="+Inf"} 2'
+    )
+    assert (
+        'notes_request_db_queries_count{view="notes:list"} 2' in lines
+    )
+    assert '# TYPE notes_request_duration_seconds histogram' in lines
+
+
+def test_exceptions_are_counted(rf, metrics_dir, client):
+    request = rf.get('/')
+    MetricsMiddleware(lambda request: None).process_exception(
+        request, ValueError()
+    )
+    assert (
+        'notes_request_exceptions_total'
+        '{exception="ValueError",view="unmatched"} 1'
+    ) in scrape(client)
+
+
+def observe_in_child():
+    metrics.request_queries.observe(4, view='notes:list')
+
+
+def test_processes_are_summed(metrics_dir, client):
+    metrics.request_queries.observe(0, view='notes:list')
+    child = multiprocessing.get_context('fork').Process(
+        target=observe_in_child
+    )
+    child.start()
+    child.join()
+    assert len(list(metrics_dir.glob('*.db'))) == 2
+    lines = scrape(client)
+    assert 'notes_request_db_queries_bucket{view="notes:list",le="0"} 1' in (
+        lines
+    )
+    assert 'notes_request_db_queries_bucket{view="notes:list",le="5"} 2' in (
+        lines
+    )
+    assert 'notes_request_db_queries_sum{view="notes:list"} 4' in lines
+    # Файл процесса с тем же pid продолжает прежние значения.
+    path = metrics.REGISTRY.process_values().path
+    values = metrics.Values(path)
+    key = metrics.series_key('notes_test', [])
+    values.inc((key, 1.5))
+    assert dict(metrics.Values(path).items())[key] == 1.5
@@ -0,0 +1,102 @@
+# Тестирование курсорной пагинации списка заметок
+# ---------->
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+from notes.pagination import KeysetPage, KeysetPaginator
+
+
+@pytest.fixture
+def many_notes(author, settings):
+    settings.NOTES_PAGE_SIZE = 3
+    return Note.objects.bulk_create(
+        Note(title=f'Заметка {i}', text='Текст', slug=f'note-{i}',
+             author=author)
+        for i in range(7)
+    )
+
+
+@pytest.fixture
+def list_url():
+    return reverse('notes:list')
+
+
+def test_first_page(author_client, many_notes, list_url):
+    response = author_client.get(list_url)
+    page = response.context['page_obj']
+    ids = [note.id for note in response.context['object_list']]
+    assert ids == sorted(note.id for note in many_notes)[:3]
+    assert page.has_next()
+    assert not page.has_previous()
+
+
+def test_walk_forward_and_back(author_client, many_notes, list_url):
+    all_ids = sorted(note.id for note in many_notes)
+    seen = []
+    response = author_client.get(list_url)
+    while True:
+        page = response.context['page_obj']
+        seen.extend(note.id for note in page)
+        if not page.has_next():
+            break
+        response = author_client.get(
+            list_url, {'after': page.next_cursor}
+        )
+    assert seen == all_ids
+    # С последней страницы возвращаемся назад.
+    response = author_client.get(
+        list_url, {'before': page.previous_cursor}
+    )
+    ids = [note.id for note in response.context['object_list']]
+    assert ids == all_ids[3:6]
+    assert response.context['page_obj'].has_previous()
+
+
+def test_pagination_does_not_use_offset(author_client, many_notes, list_url):
+    with CaptureQueriesContext(connection) as queries:
+        author_client.get(list_url, {'after': many_notes[3].id})
+    note_queries = [
+        query['sql'] for query in queries
+        if 'notes_note' in query['sql']
+    ]
+    assert note_queries
+    assert all('OFFSET' not in sql for sql in note_queries)
+
+
+@pytest.mark.parametrize('edge', ('before', 'after'))
+def test_stale_cursor_falls_back_to_edge_page(
+    author_client, many_notes, list_url, edge
+):
+    all_ids = sorted(note.id for note in many_notes)
+    cursor = all_ids[0] if edge == 'before' else all_ids[-1] + 10
+    response = author_client.get(list_url, {edge: cursor})
+    assert response.status_code == HTTPStatus.OK
+    page = response.context['page_obj']
+    ids = [note.id for note in page]
+    if edge == 'before':
+        assert ids == all_ids[:3]
+        assert page.has_next() and not page.has_previous()
+    else:
+        assert ids == all_ids[-3:]
+        assert page.has_previous() and not page.has_next()
+
+
+def test_empty_page_has_no_cursors(author):
+    paginator = KeysetPaginator(Note.objects.filter(author=author), 3)
+    page = async_to_sync(paginator.aget_page)(after=100)
+    assert list(page) == []
+    assert not page.has_other_pages()
+    page = KeysetPage([], True, True)
+    assert page.next_cursor is None and page.previous_cursor is None
+
+
+def test_invalid_cursor(author_client, list_url):
+    response = author_client.get(list_url, {'after': 'abc'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+# <----------
@@ -0,0 +1,75 @@
+# Тестирование профилирования запросов
+# ---------->
+import os
+import pstats
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+
+from notes import profiling
+
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    settings.NOTES_PROFILE_DIR = str(tmp_path)
+    settings.NOTES_PROFILE_SAMPLE_RATE = 1
+    return tmp_path
+
+
+def test_sampled_request_is_profiled(author_client, profile_dir):
+    author_client.get(reverse('notes:list'))
+    path, = profile_dir.iterdir()
+    assert '-notes-list-' in path.name
+    assert path.suffix == '.pstats'
+    stats = pstats.Stats(str(path))
+    assert any(
+        function == 'get' for _, _, function in stats.stats
+    )
+
+
+def test_url_names_and_header(author_client, profile_dir, settings):
+    settings.NOTES_PROFILE_URL_NAMES = ['notes:add']
+    settings.NOTES_PROFILE_TOKEN = 'secret'
+    settings.NOTES_PROFILER = 'sampler'
+    author_client.get(reverse('notes:list'))
+    author_client.get(reverse('notes:list'), HTTP_X_NOTES_PROFILE='wrong')
+    assert not list(profile_dir.iterdir())
+    author_client.get(reverse('notes:add'))
+    settings.NOTES_PROFILE_SAMPLE_RATE = 0
+    author_client.get(reverse('notes:home'), HTTP_X_NOTES_PROFILE='secret')
+    names = sorted(path.name for path in profile_dir.iterdir())
+    assert len(names) == 2
+    assert '-notes-add-' in names[0] and '-notes-home-' in names[1]
+    assert all(name.endswith('.folded') for name in names)
+
+
+def test_budget_and_rotation(author_client, profile_dir, settings):
+    settings.NOTES_PROFILE_MAX_PER_MINUTE = 2
+    settings.NOTES_PROFILE_MAX_FILES = 1
+    for _ in range(3):
+        author_client.get(reverse('notes:list'))
+    assert len(list(profile_dir.iterdir())) == 1
+    older = profile_dir / 'old.pstats'
+    older.write_bytes(b'x' * 10)
+    os.utime(older, (0, 0))
+    settings.NOTES_PROFILE_MAX_FILES = 10
+    settings.NOTES_PROFILE_MAX_BYTES = 1
+    profiling.rotate(profile_dir)
+    assert not older.exists()
+
+
+def test_sampler_folds_stacks():
+    def busy():
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            pass
+
+    sampler = profiling.Sampler(threading.get_ident(), 0.001)
+    sampler.enable()
+    busy()
+    sampler.disable()
+    stack, count = max(sampler.stacks.items(), key=lambda item: item[1])
+    assert stack.split(';')[-1].startswith('busy (test_profiling.py:')
+    assert count > 10
@@ -0,0 +1,125 @@
+# Проверка планов запросов: ни одна страница заметок
+# не должна читать таблицу целиком
+# ---------->
+import json
+import re
+from functools import partial
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+
+# Полный проход по таблице или по всему индексу без условия поиска.
+FULL_SCAN_RE = re.compile(
+    r'^SCAN (?P<table>\w+)'
+    r'(?: USING (?:COVERING )?INDEX|$)'
+)
+
+
+@pytest.fixture
+def notes(author, not_author):
+    return Note.objects.bulk_create(
+        Note(title=f'Заметка {i}', text='Текст', slug=f'note-{i}',
+             author=author if i % 2 else not_author)
+        for i in range(20)
+    )
+
+
+def full_scans(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        plan = [row[-1] for row in cursor.fetchall()]
+    tables = set(connection.introspection.table_names())
+    return [
+        detail for detail in plan
+        if (match := FULL_SCAN_RE.match(detail))
+        and match.group('table') in tables
+    ]
+
+
+def assert_no_full_scans(method, url, data=None):
+    with CaptureQueriesContext(connection) as queries:
+        method(url, data)
+    selects = [
+        query['sql'] for query in queries
+        if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+    ]
+    assert selects
+    for sql in selects:
+        assert full_scans(sql) == [], sql
+
+
+@pytest.mark.parametrize(
+    'name, params',
+    (
+        ('notes:list', {}),
+        ('notes:list', {'after': 5}),
+        ('notes:list', {'before': 15}),
+        ('notes:search', {'q': 'Текст'}),
+    ),
+)
+def test_list_pages(author_client, notes, name, params):
+    assert_no_full_scans(author_client.get, reverse(name), params)
+
+
+@pytest.mark.parametrize(
+    'name',
+    ('notes:detail', 'notes:edit', 'notes:delete'),
+)
+def test_note_pages(author_client, notes, note, name):
+    url = reverse(name, args=(note.slug,))
+    assert_no_full_scans(author_client.get, url)
+
+
+def test_create(author_client, notes, form_data):
+    assert_no_full_scans(author_client.post, reverse('notes:add'), form_data)
+
+
+def test_edit(author_client, notes, note, form_data):
+    url = reverse('notes:edit', args=(note.slug,))
+    assert_no_full_scans(author_client.post, url, form_data)
+
+
+def test_delete(author_client, notes, note):
+    url = reverse('notes:delete', args=(note.slug,))
+    assert_no_full_scans(author_client.post, url)
+
+
+def test_batch(author_client, notes, note):
+    operations = [
+        {'op': 'create', 'data': {'title': 'Заметка 1', 'text': 'Текст'}},
+        {'op': 'update', 'slug': note.slug, 'data': {'slug': 'note-new'}},
+        {'op': 'delete', 'slug': 'note-1'},
+    ]
+    post = partial(author_client.post, content_type='application/json')
+    assert_no_full_scans(
+        post, reverse('notes:batch'), json.dumps({'operations': operations})
+    )
+
+
+def test_detector_catches_full_scan(notes):
+    assert full_scans("SELECT * FROM notes_note WHERE text = 'Текст'")
+
+
+# Текст заметки может весить мегабайты: список его не читает
+# ни при проверке ETag, ни при отрисовке страницы.
+@pytest.mark.parametrize('params', ({}, {'after': 5}, {'before': 15}))
+@pytest.mark.parametrize('urls', (
+    'yanote.urls', 'notes.pytest_tests.async_urls',
+))
+def test_list_never_selects_text(author_client, notes, urls, params):
+    with override_settings(ROOT_URLCONF=urls):
+        with CaptureQueriesContext(connection) as queries:
+            response = author_client.get(reverse('notes:list'), params)
+    assert response.status_code == 200
+    note_queries = [
+        query['sql'] for query in queries if 'notes_note' in query['sql']
+    ]
+    assert len(note_queries) == 2
+    for sql in note_queries:
+        assert '"notes_note"."text"' not in sql, sql
+# <----------
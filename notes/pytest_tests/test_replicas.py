@@ -0,0 +1,109 @@
+# Тестирование чтения с реплики базы
+# ---------->
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+from notes.routers import PIN_COOKIE, ReplicaRouter, replica_reads
+
+pytestmark = pytest.mark.django_db(databases=('default', 'replica'))
+
+
+@pytest.fixture(autouse=True)
+def replica(settings):
+    settings.NOTES_READ_REPLICAS = ['replica']
+
+
+@pytest.fixture
+def replicate():
+    """Копирует основную базу в реплику — как это сделала бы репликация."""
+    def copy():
+        for model in (get_user_model(), Session, Note):
+            model.objects.using('replica').all().delete()
+            model.objects.using('replica').bulk_create(model.objects.all())
+    return copy
+
+
+def replica_queries(client, url):
+    with CaptureQueriesContext(connections['replica']) as queries:
+        response = client.get(url)
+    return response, len(queries)
+
+
+@pytest.mark.parametrize('name, args', (
+    ('notes:home', ()),
+    ('notes:list', ()),
+    ('notes:detail', ('note-slug',)),
+))
+def test_pages_read_from_replica(author_client, note, replicate, name, args):
+    replicate()
+    with CaptureQueriesContext(connections['default']) as primary:
+        response, count = replica_queries(
+            author_client, reverse(name, args=args)
+        )
+    assert response.status_code == HTTPStatus.OK
+    assert count > 0
+    assert len(primary) == 0
+
+
+@pytest.mark.urls('notes.pytest_tests.async_urls')
+def test_async_list_reads_from_replica(author_client, note, replicate):
+    replicate()
+    response, count = replica_queries(author_client, reverse('notes:list'))
+    assert list(response.context['object_list']) == [note]
+    assert count > 0
+
+
+def test_lagging_replica_is_visible(author_client, author, note, replicate):
+    replicate()
+    fresh = Note.objects.create(title='Свежая', text='Текст', author=author)
+    response = author_client.get(reverse('notes:list'))
+    assert list(response.context['object_list']) == [note]
+    response = author_client.get(reverse('notes:detail', args=(fresh.slug,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_read_your_writes(author_client, replicate, form_data):
+    replicate()
+    response = author_client.post(reverse('notes:add'), data=form_data)
+    assert response.cookies[PIN_COOKIE]['max-age'] > 0
+    assert Note.objects.filter(slug=form_data['slug']).exists()
+    assert not Note.objects.using('replica').exists()
+    response, count = replica_queries(
+        author_client, reverse('notes:detail', args=(form_data['slug'],))
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert count == 0
+
+
+def test_other_pages_use_primary(author_client, note, replicate):
+    replicate()
+    response, count = replica_queries(
+        author_client, reverse('notes:edit', args=(note.slug,))
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert count == 0
+
+
+def test_round_robin(settings):
+    settings.NOTES_READ_REPLICAS = ['replica', 'default']
+    settings.NOTES_REPLICA_SELECTION = 'round_robin'
+    router = ReplicaRouter()
+    assert router.db_for_read(Note) is None
+    with replica_reads():
+        chosen = [router.db_for_read(Note) for _ in range(4)]
+    assert chosen == ['replica', 'default'] * 2
+    assert router.db_for_write(Note) == 'default'
+
+
+def test_no_pin_without_replicas(author_client, settings, form_data):
+    settings.NOTES_READ_REPLICAS = []
+    response = author_client.post(reverse('notes:add'), data=form_data)
+    assert PIN_COOKIE not in response.cookies
+# <----------
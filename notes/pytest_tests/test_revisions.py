@@ -0,0 +1,104 @@
+# Тестирование истории версий заметок
+# ---------->
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import revisions
+from notes.models import NoteRevision
+
+pytestmark = pytest.mark.django_db
+
+BASE_TEXT = ''.join(f'Строка {i}\n' for i in range(50))
+
+
+def versions(count):
+    """Тексты, которые отличаются от базового одной строкой."""
+    return [BASE_TEXT.replace(f'Строка {i}\n', f'Правка {i}\n')
+            for i in range(count)]
+
+
+@pytest.fixture
+def edited(settings, note):
+    """Заметка, текст которой менялся семь раз."""
+    settings.NOTES_REVISION_SNAPSHOT_INTERVAL = 3
+    texts = [note.text] + versions(7)
+    for text in texts[1:]:
+        note.text = text
+        note.save()
+    return note, texts
+
+
+@pytest.mark.parametrize('source, target', (
+    ('', 'Текст'),
+    ('Один\nдва\nтри', 'Один\nтри\nчетыре\n'),
+    (BASE_TEXT, BASE_TEXT.replace('Строка 7', 'Правка')),
+))
+def test_delta_round_trip(source, target):
+    assert revisions.apply_delta(
+        source, revisions.make_delta(source, target)
+    ) == target
+
+
+def test_every_revision_is_reconstructed(edited):
+    note, texts = edited
+    stored = list(note.revisions.order_by('number'))
+    assert [revision.number for revision in stored] == list(range(1, 8))
+    # Снимок — каждая третья версия и первая: дельта к короткому
+    # тексту длиннее самого текста.
+    assert [revision.number for revision in stored if revision.is_snapshot] \
+        == [1, 3, 6]
+    delta = stored[3].data
+    assert len(delta) < len(BASE_TEXT) / 5
+    for revision in stored:
+        assert revisions.revision_text(revision) == texts[revision.number - 1]
+
+
+def test_unchanged_save_keeps_history(note):
+    note.save()
+    assert not note.revisions.exists()
+
+
+def test_history_pages(author_client, edited):
+    note, texts = edited
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.get(reverse('notes:history', args=(
+            note.slug,
+        )))
+    page = response.context['object_list']
+    assert [revision.number for revision in page] == list(range(1, 8))
+    assert not any('"data"' in query['sql'] for query in queries)
+    response = author_client.get(
+        reverse('notes:revision', args=(note.slug, 2))
+    )
+    assert response.context['revision'].text == texts[1]
+
+
+def test_batch_update_records_revision(author_client, note):
+    response = author_client.post(
+        reverse('notes:batch'),
+        json.dumps({'operations': [
+            {'op': 'update', 'slug': note.slug, 'data': {'text': 'Новый'}},
+        ]}),
+        content_type='application/json',
+    )
+    assert response.json()['update'] == 1
+    revision = note.revisions.get()
+    assert revisions.revision_text(revision) == note.text
+
+
+def test_prune_keeps_recent_revisions(settings, edited):
+    note, texts = edited
+    settings.NOTES_REVISION_MAX_AGE_DAYS = 0
+    settings.NOTES_REVISION_KEEP = 2
+    call_command('prune_revisions', batch_size=2, stdout=StringIO())
+    kept = list(note.revisions.order_by('number'))
+    assert [revision.number for revision in kept] == [6, 7]
+    for revision in kept:
+        assert revisions.revision_text(revision) == texts[revision.number - 1]
+    assert NoteRevision.objects.count() == 2
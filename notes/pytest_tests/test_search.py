@@ -0,0 +1,68 @@
+# Тестирование полнотекстового поиска
+# ---------->
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from notes.models import Note
+
+
+def search(client, query):
+    response = client.get(reverse('notes:search'), {'q': query})
+    return list(response.context['object_list'])
+
+
+def test_author_finds_own_note(author_client, note):
+    results = search(author_client, 'Текст')
+    assert [found.id for found in results] == [note.id]
+    assert '<mark>Текст</mark>' in results[0].snippet
+
+
+def test_other_user_cant_find_note(not_author_client, note):
+    assert search(not_author_client, 'Текст') == []
+
+
+def test_index_follows_updates_and_deletes(author_client, note):
+    note.text = 'Совсем другое содержание'
+    note.save()
+    assert search(author_client, 'Текст') == []
+    assert len(search(author_client, 'содержание')) == 1
+    note.delete()
+    assert search(author_client, 'содержание') == []
+
+
+def test_title_ranks_above_text(author_client, author, note):
+    in_title = Note.objects.create(
+        title='Покупки', text='Молоко', slug='shopping', author=author
+    )
+    Note.objects.create(
+        title='Разное', text='Список: покупки', slug='misc', author=author
+    )
+    assert search(author_client, 'покупки')[0].id == in_title.id
+
+
+def test_query_syntax_is_escaped(author_client, note):
+    assert search(author_client, 'AND "OR (Текст*') == []
+    assert search(author_client, '"Текст') != []
+
+
+def test_snippet_is_escaped(author_client, author):
+    Note.objects.create(
+        title='Html', text='<script>alert(1)</script>', slug='html',
+        author=author,
+    )
+    snippet = search(author_client, 'script')[0].snippet
+    assert '<script>' not in snippet
+    assert '&lt;<mark>script</mark>&gt;' in snippet
+
+
+def test_rebuild_index(author_client, note):
+    Note.objects.bulk_create(
+        Note(title=f'Задача {i}', text='Важное', slug=f'task-{i}',
+             author=note.author)
+        for i in range(5)
+    )
+    call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+    assert len(search(author_client, 'Важное')) == 5
+# <----------
@@ -0,0 +1,86 @@
+# Тестирование профиля сессий в кеше
+# ---------->
+import runpy
+
+import pytest
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.auth import user_key
+from notes.cache import get_cache
+from yanote import settings as project_settings
+
+pytestmark = pytest.mark.django_db
+
+PROFILE_SETTINGS = (
+    'SESSION_ENGINE', 'SESSION_CACHE_ALIAS', 'SESSION_SAVE_EVERY_REQUEST',
+    'AUTHENTICATION_BACKENDS',
+)
+
+
+def use_profile(name, settings, monkeypatch):
+    """Включает настройки сессий из settings.py для профиля."""
+    monkeypatch.setenv('NOTES_SESSION_PROFILE', name)
+    loaded = runpy.run_path(project_settings.__file__)
+    for setting in PROFILE_SETTINGS:
+        if setting in loaded:
+            setattr(settings, setting, loaded[setting])
+
+
+# Фикстуры профиля идут в тестах первыми: клиент логинится
+# уже с настройками профиля.
+@pytest.fixture(params=('db', 'cached'))
+def profile(request, settings, monkeypatch):
+    use_profile(request.param, settings, monkeypatch)
+    return request.param
+
+
+@pytest.fixture
+def cached(settings, monkeypatch):
+    use_profile('cached', settings, monkeypatch)
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_list_queries(profile, author_client, note):
+    url = reverse('notes:list')
+    count_queries(author_client, url)
+    # Повторный запрос: страница уже в кеше, остаётся проверка ETag.
+    # В профиле db к ней добавляются чтения сессии и пользователя.
+    expected = {'db': 3, 'cached': 1}[profile]
+    assert count_queries(author_client, url) == expected
+
+
+def test_touch_is_written_behind(cached, settings, author_client):
+    url = reverse('notes:home')
+    author_client.get(url)
+    session = Session.objects.get()
+    author_client.get(url)
+    assert Session.objects.get().expire_date == session.expire_date
+    settings.NOTES_SESSION_TOUCH_INTERVAL = 0
+    author_client.get(url)
+    assert Session.objects.get().expire_date > session.expire_date
+
+
+def test_password_change_ends_sessions(cached, author, author_client):
+    url = reverse('notes:list')
+    author_client.get(url)
+    assert get_cache().get(user_key(author.pk)) is not None
+    author.set_password('новый-пароль')
+    author.save()
+    assert get_cache().get(user_key(author.pk)) is None
+    response = author_client.get(url)
+    assert response.status_code == 302
+
+
+def test_logout_drops_cached_user(cached, author, author_client):
+    author_client.get(reverse('notes:list'))
+    author_client.post(reverse('users:logout'))
+    assert get_cache().get(user_key(author.pk)) is None
@@ -0,0 +1,223 @@
+# Тестирование шардирования заметок по авторам
+# ---------->
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.urls import reverse
+
+from notes import sharding
+from notes.models import Note, ShardPlacement
+
+pytestmark = pytest.mark.django_db(databases=('default', 'shard'))
+
+SHARDS = ['default', 'shard']
+
+
+@pytest.fixture
+def shards(settings):
+    settings.NOTES_SHARDS = SHARDS
+
+
+@pytest.fixture
+def make_author(django_user_model):
+    """Создаёт пользователя, которого хеш отправляет в нужный шард."""
+    def make(alias):
+        number = 0
+        while True:
+            number += 1
+            user = django_user_model.objects.create(
+                username=f'{alias}-{number}'
+            )
+            if sharding.hash_shard(user.pk, SHARDS) == alias:
+                return user
+    return make
+
+
+def test_hash_is_stable_and_moves_few_authors():
+    def place(shards):
+        return [sharding.hash_shard(pk, shards) for pk in range(1000)]
+
+    two, three = place(['a', 'b']), place(['a', 'b', 'c'])
+    assert two == place(['a', 'b'])
+    assert 400 < two.count('a') < 600
+    # С новым шардом авторы переезжают только на него.
+    moved = [(old, new) for old, new in zip(two, three) if old != new]
+    assert all(new == 'c' for _, new in moved)
+    assert 250 < len(moved) < 420
+
+
+def test_notes_are_written_to_author_shard(shards, make_author, client):
+    author = make_author('shard')
+    client.force_login(author)
+    response = client.post(
+        reverse('notes:add'), {'title': 'Заметка', 'text': 'Шардирование'}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert not Note.objects.using('default').exists()
+    note = Note.objects.using('shard').get()
+    assert note.author == author
+    for url in (
+        reverse('notes:list'),
+        reverse('notes:detail', args=(note.slug,)),
+        reverse('notes:search') + '?q=шардирование',
+    ):
+        assert note.title in client.get(url).content.decode()
+
+
+def test_slug_is_unique_per_author(author, not_author):
+    Note.objects.create(title='Заметка', text='Текст', author=author)
+    other = Note.objects.create(
+        title='Заметка', text='Текст', author=not_author
+    )
+    assert other.slug == 'zametka'
+    with pytest.raises(IntegrityError):
+        Note.objects.create(
+            title='Другая', text='Текст', slug='zametka', author=author
+        )
+
+
+def test_rebalance_moves_pinned_authors(settings, make_author):
+    author = make_author('shard')
+    stay = make_author('default')
+    settings.NOTES_SHARDS = ['default']
+    for user in (author, stay):
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {i}', text='Текст', slug=f'note-{i}',
+                 author=user)
+            for i in range(5)
+        )
+    before = list(
+        Note.objects.filter(author=author).order_by('pk')
+        .values_list('slug', 'updated_at')
+    )
+    call_command('rebalance_shards', pin=True, stdout=StringIO())
+    settings.NOTES_SHARDS = SHARDS
+    # Закреплённый автор до переноса читается из старого шарда.
+    assert sharding.shard_for(author.pk) == 'default'
+
+    call_command('rebalance_shards', batch_size=2, stdout=StringIO())
+    assert sharding.shard_for(author.pk) == 'shard'
+    assert not ShardPlacement.objects.exists()
+    assert list(
+        Note.objects.for_author(author).order_by('pk')
+        .values_list('slug', 'updated_at')
+    ) == before
+    assert not Note.objects.using('default').filter(author=author).exists()
+    assert Note.objects.for_author(stay).count() == 5
+
+
+def test_sync_catches_up_changes(shards, make_author):
+    from notes.rebalance import sync_notes
+    author = make_author('shard')
+    primary = Note.objects.using('default')
+    kept, changed, gone = (
+        primary.create(title=title, text='Текст', author=author)
+        for title in ('Первая', 'Вторая', 'Третья')
+    )
+    sync_notes(author.pk, 'default', 'shard', batch_size=2)
+    changed.text = 'Изменена'
+    changed.save(using='default')
+    gone.delete(using='default')
+    primary.create(title='Новая', text='Текст', author=author)
+    assert sync_notes(author.pk, 'default', 'shard', batch_size=2) == 2
+    copied = Note.objects.using('shard').order_by('pk')
+    assert [note.title for note in copied] == ['Первая', 'Вторая', 'Новая']
+    assert copied[1].text == 'Изменена'
+
+
+def test_write_during_move_is_rejected(
+    shards, make_author, client, monkeypatch
+):
+    author = make_author('shard')
+    client.force_login(author)
+    # Автор переезжает между выбором шарда и началом транзакции.
+    answers = iter(['default', 'shard'])
+    monkeypatch.setattr(sharding, 'shard_for', lambda _: next(answers))
+    response = client.post(
+        reverse('notes:add'), {'title': 'Заметка', 'text': 'Текст'}
+    )
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response['Retry-After'] == '1'
+    assert not Note.objects.using('default').exists()
+
+
+def test_delete_during_move_is_rejected(
+    shards, make_author, client, monkeypatch
+):
+    author = make_author('shard')
+    client.force_login(author)
+    note = Note.objects.using('default').create(
+        title='Заметка', text='Текст', slug='note', author=author
+    )
+    # Заметка прочитана из старого шарда, и автор переезжает,
+    # пока удаление ждёт блокировку записи.
+    answers = iter(['default', 'default', 'shard'])
+    monkeypatch.setattr(sharding, 'shard_for', lambda _: next(answers))
+    response = client.post(reverse('notes:delete', args=(note.slug,)))
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    monkeypatch.undo()
+    # Прочитанная до переезда заметка не удаляется по id в новом шарде.
+    with pytest.raises(sharding.ShardMoved):
+        note.delete()
+    assert Note.objects.using('default').filter(pk=note.pk).exists()
+
+
+def test_deleting_user_deletes_sharded_notes(shards, make_author):
+    author = make_author('shard')
+    Note.objects.create(title='Заметка', text='Текст', author=author)
+    author.delete()
+    assert not Note.objects.using('shard').exists()
+
+
+def test_rebalance_survives_writes_between_passes(
+    settings, make_author, monkeypatch
+):
+    from notes import rebalance
+    author = make_author('shard')
+    settings.NOTES_SHARDS = ['default']
+    Note.objects.create(title='Ранняя', text='Текст', author=author)
+    call_command('rebalance_shards', pin=True, stdout=StringIO())
+    settings.NOTES_SHARDS = SHARDS
+    sync_notes = rebalance.sync_notes
+    passes = []
+
+    def sync_then_write(*args):
+        copied = sync_notes(*args)
+        if not passes:
+            # Запись в source между первым проходом и блокировкой.
+            late = Note.objects.create(
+                title='Поздняя', text='Первая', slug='late', author=author
+            )
+            late.text = 'Вторая'
+            late.save()
+        passes.append(args)
+        return copied
+
+    monkeypatch.setattr(rebalance, 'sync_notes', sync_then_write)
+    call_command('rebalance_shards', stdout=StringIO())
+    assert len(passes) == 2
+    assert sharding.shard_for(author.pk) == 'shard'
+    late = Note.objects.for_author(author).get(slug='late')
+    assert late.text == 'Вторая'
+    assert late.revisions.count() == 1
+
+
+def test_rebalance_moves_revisions(settings, make_author):
+    from notes.revisions import revision_text
+    author = make_author('shard')
+    settings.NOTES_SHARDS = ['default']
+    note = Note.objects.create(title='Заметка', text='Первая', author=author)
+    for text in ('Вторая', 'Третья'):
+        note.text = text
+        note.save()
+    call_command('rebalance_shards', pin=True, stdout=StringIO())
+    settings.NOTES_SHARDS = SHARDS
+    call_command('rebalance_shards', stdout=StringIO())
+    moved = Note.objects.for_author(author).get()
+    assert [
+        revision_text(revision)
+        for revision in moved.revisions.order_by('number')
+    ] == ['Первая', 'Вторая']
@@ -0,0 +1,84 @@
+# Тестирование выбора slug-а без предварительных запросов
+# ---------->
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pytest
+from django.db import connection, connections
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pytils.translit import slugify
+
+from notes import slugs
+from notes.models import Note
+
+
+def test_create_runs_no_slug_select(author_client, form_data):
+    form_data.pop('slug')
+    with CaptureQueriesContext(connection) as queries:
+        author_client.post(reverse('notes:add'), data=form_data)
+    note_selects = [
+        query['sql'] for query in queries
+        if query['sql'].startswith('SELECT') and 'notes_note' in query['sql']
+    ]
+    assert note_selects == []
+    assert Note.objects.get().slug == slugify(form_data['title'])
+
+
+def test_generated_slug_gets_suffix(author):
+    notes = [
+        Note.objects.create(title='Одинаковый', text='Текст', author=author)
+        for _ in range(3)
+    ]
+    base = slugify('Одинаковый')
+    assert [note.slug for note in notes] == [base, f'{base}-2', f'{base}-3']
+
+
+def test_edit_to_taken_slug_shows_error(author_client, author, note):
+    other = Note.objects.create(title='Другая', text='Текст', author=author)
+    url = reverse('notes:edit', args=(other.slug,))
+    response = author_client.post(
+        url, {'title': 'Другая', 'text': 'Текст', 'slug': note.slug}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['form'].errors['slug']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_creates_with_same_title(author):
+    threads = 16
+
+    def create(_):
+        client = Client()
+        client.force_login(author)
+        try:
+            response = client.post(
+                reverse('notes:add'), {'title': 'Гонка', 'text': 'Текст'}
+            )
+            return response.status_code
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(threads) as executor:
+        statuses = list(executor.map(create, range(threads)))
+    assert statuses == [HTTPStatus.FOUND] * threads
+    assert Note.objects.filter(
+        slug__startswith=slugify('Гонка')
+    ).count() == threads
+
+
+def test_cached_slugify_matches_pytils():
+    titles = ['Заметка', 'Note & Notes', 'Ёжик  в тумане', 'Заметка']
+    assert slugs.make_slugs(titles, 100) == [
+        slugify(title) for title in titles
+    ]
+
+
+def test_slugify_cache_counts_hits():
+    slugs.slugify.cache_clear()
+    for _ in range(3):
+        slugs.make_slug('Повтор', 100)
+    info = slugs.cache_info()
+    assert (info['hits'], info['misses'], info['size']) == (2, 1, 1)
+# <----------
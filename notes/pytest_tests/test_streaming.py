@@ -0,0 +1,69 @@
+# Тестирование потоковой отдачи длинных заметок
+# ---------->
+import re
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db
+
+# Многобайтовые символы и разметка попадают на границы порций.
+LONG_TEXT = ''.join(
+    f'{i * 7919 % 10007} Журнал <b>&amp; ёлка</b>\n' for i in range(400)
+)
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
+@pytest.fixture
+def streaming(settings):
+    settings.NOTES_DETAIL_STREAMING = True
+    settings.NOTES_DETAIL_STREAM_THRESHOLD = 1024
+    settings.NOTES_DETAIL_STREAM_CHUNK_SIZE = 100
+
+
+def get_page(client, note):
+    caches['notes'].clear()
+    response = client.get(reverse('notes:detail', args=(note.slug,)))
+    assert response.status_code == 200
+    content = (
+        b''.join(response.streaming_content) if response.streaming
+        else response.content
+    )
+    return response, CSRF_RE.sub('', content.decode())
+
+
+@pytest.mark.parametrize('compression', ('off', 'zlib'))
+def test_long_note_is_streamed(
+    streaming, settings, author, author_client, compression
+):
+    settings.NOTES_TEXT_COMPRESSION = compression
+    settings.NOTES_TEXT_COMPRESSION_THRESHOLD = 256
+    note = Note.objects.create(title='Журнал', text=LONG_TEXT, author=author)
+    response, streamed = get_page(author_client, note)
+    assert response.streaming
+    assert response['ETag']
+    settings.NOTES_DETAIL_STREAMING = False
+    response, rendered = get_page(author_client, note)
+    assert not response.streaming
+    assert streamed == rendered
+
+
+def test_short_note_is_rendered_at_once(streaming, author_client, note):
+    with CaptureQueriesContext(connection) as queries:
+        response, content = get_page(author_client, note)
+    assert not response.streaming
+    assert note.text in content
+    # Текст дочитывается одним запросом, без отдельного TYPEOF.
+    text_queries = [
+        query['sql'] for query in queries
+        if re.search(r'SELECT\s.*\btext\b.*\bFROM "?notes_note"?\s',
+                     query['sql'], re.IGNORECASE)
+    ]
+    assert len(text_queries) == 1
+    assert not any('TYPEOF' in query['sql'] for query in queries)
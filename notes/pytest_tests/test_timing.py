@@ -0,0 +1,53 @@
+# Тестирование замеров запроса и заголовка Server-Timing
+# ---------->
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from notes.models import Note
+from notes.timing import RequestTimings
+
+
+def test_not_sampled_request_has_no_header(author_client, settings):
+    settings.NOTES_TIMING_SAMPLE_RATE = 0
+    response = author_client.get(reverse('notes:list'))
+    assert 'Server-Timing' not in response
+
+
+def test_sampled_request_is_timed(author_client, note, settings, caplog):
+    settings.NOTES_TIMING_SAMPLE_RATE = 1
+    with caplog.at_level('INFO', logger='notes.timing'):
+        response = author_client.get(
+            reverse('notes:detail', args=(note.slug,))
+        )
+    entries = {
+        entry.split(';')[0]: entry
+        for entry in response['Server-Timing'].split(', ')
+    }
+    assert set(entries) == {'db', 'view', 'tpl', 'total'}
+    assert 'queries"' in entries['db']
+    record, = caplog.records
+    assert f'path=/note/{note.slug}/ status=200' in record.message
+    assert record.timings['tpl'] > 0
+    assert record.timings['total'] >= record.timings['db']
+
+
+def test_async_request_is_timed(author, settings):
+    settings.NOTES_TIMING_SAMPLE_RATE = 1
+    client = AsyncClient()
+    client.force_login(author)
+    response = async_to_sync(client.get)(reverse('notes:list'))
+    assert 'queries"' in response['Server-Timing']
+
+
+def test_repeated_queries_are_flagged(note, settings, caplog):
+    settings.NOTES_TIMING_REPEAT_THRESHOLD = 3
+    timings = RequestTimings()
+    with timings.queries.record():
+        for _ in range(3):
+            Note.objects.get(pk=note.pk)
+        Note.objects.count()
+    (sql, count), = timings.queries.repeated()
+    assert count == 3
+    assert timings.queries.count == 4
+    assert timings.metrics()['repeated'][1] == '1 x3'
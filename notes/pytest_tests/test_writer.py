@@ -0,0 +1,104 @@
+# Тестирование очереди записи с групповым коммитом
+# ---------->
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pytest
+from django.db import IntegrityError, connections
+from django.test.client import Client
+from django.urls import reverse
+
+from notes import writer
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def queue():
+    write_queue = writer.WriteQueue(batch_size=100)
+    yield write_queue
+    write_queue.stop()
+
+
+@pytest.fixture
+def shared_queue(settings):
+    settings.NOTES_WRITE_QUEUE = True
+    yield writer.get_writer()
+    writer.stop_writer()
+
+
+def create(author, title, slug=''):
+    return Note.objects.create(
+        title=title, text='Текст', slug=slug, author=author
+    )
+
+
+def test_waiting_jobs_share_one_transaction(queue, author):
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait()
+
+    queue.submit(blocker)
+    started.wait()
+    futures = [
+        queue.submit(create, author, f'Заметка {i}', f'note-{i}')
+        for i in range(5)
+    ]
+    failing = queue.submit(create, author, 'Дубль', 'note-0')
+    release.set()
+    notes = [future.result() for future in futures]
+    with pytest.raises(IntegrityError):
+        failing.result()
+    assert (queue.batches, queue.committed) == (2, 7)
+    assert Note.objects.filter(
+        pk__in=[note.pk for note in notes]
+    ).count() == 5
+
+
+def test_nested_write_runs_inline(queue, author):
+    future = queue.submit(
+        lambda: queue.submit(create, author, 'Внутри').result()
+    )
+    assert future.result().pk is not None
+
+
+def test_concurrent_form_writes(shared_queue, author):
+    threads = 32
+
+    def post(number):
+        client = Client()
+        client.force_login(author)
+        try:
+            return client.post(
+                reverse('notes:add'),
+                {'title': f'Поток {number % 4}', 'text': 'Текст'},
+            ).status_code
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(threads) as executor:
+        statuses = list(executor.map(post, range(threads)))
+    assert statuses == [HTTPStatus.FOUND] * threads
+    assert Note.objects.count() == threads
+    assert shared_queue.committed == threads
+
+
+def test_slug_conflict_through_queue(shared_queue, author_client, note):
+    response = author_client.post(
+        reverse('notes:add'),
+        {'title': 'Другая', 'text': 'Текст', 'slug': note.slug},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.context['form'].errors['slug']
+
+
+def test_delete_through_queue(shared_queue, author_client, note):
+    author_client.post(reverse('notes:delete', args=(note.slug,)))
+    assert not Note.objects.exists()
+    assert shared_queue.committed == 1
+# <----------
@@ -0,0 +1,224 @@
+"""Перенос авторов между шардами (команда rebalance_shards).
+
+Порядок добавления шарда:
+
+1. rebalance_shards --pin закрепляет каждого автора за шардом, где
+   сейчас лежат его заметки. Запускается перед сменой NOTES_SHARDS,
+   чтобы после перезапуска заметки не «пропали» до переноса.
+2. Новый шард добавляется в настройки, приложение перезапускается.
+3. rebalance_shards переносит закреплённых авторов туда, куда их
+   отправляет хеш, и снимает закрепление.
+
+Перенос автора идёт без остановки записи: заметки копируются
+порциями, затем старый шард блокируется на запись, догоняются
+изменения, сделанные за время копирования, и автор переключается
+на новый шард. Блокировку даёт транзакция IMMEDIATE в SQLite
+(см. DATABASES); запись, начатая до переключения, получает
+ShardMoved. Заметки в новом шарде получают новые id в прежнем
+порядке, курсоры пагинации, выданные до переноса, устаревают.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .cache import invalidate_user
+from .models import Note, NoteRevision
+from .sharding import hash_shard, placements, shard_for
+
+# Поля, которые догоняются у уже скопированной заметки.
+SYNC_FIELDS = ('title', 'text', 'updated_at')
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def note_versions(author_id, using):
+    """slug → (id, дата изменения) всех заметок автора в базе."""
+    rows = (
+        Note.objects.using(using).filter(author_id=author_id)
+        .order_by('pk').values_list('slug', 'pk', 'updated_at')
+    )
+    return {slug: (pk, updated_at) for slug, pk, updated_at in rows}
+
+
+def sync_notes(author_id, source, target, batch_size):
+    """Приводит заметки автора в target к состоянию в source.
+
+    Заметки сверяются по slug и дате изменения: удалённые в source
+    удаляются, изменённые обновляются на месте, новые копируются
+    по порядку id. Возвращает число записанных заметок.
+    """
+    current = note_versions(author_id, source)
+    copied = note_versions(author_id, target)
+    gone = [pk for slug, (pk, _) in copied.items() if slug not in current]
+    changed = {}
+    new = []
+    for slug, (pk, updated_at) in current.items():
+        if slug not in copied:
+            new.append(pk)
+        elif copied[slug][1] != updated_at:
+            changed[pk] = copied[slug][0]
+    source_notes = Note.objects.using(source)
+    target_notes = Note.objects.using(target)
+    for ids in chunks(gone, batch_size):
+        with transaction.atomic(using=target):
+            target_notes.filter(pk__in=ids).delete()
+    for ids in chunks(list(changed), batch_size):
+        notes = list(source_notes.filter(pk__in=ids))
+        for note in notes:
+            note.pk = changed[note.pk]
+        with transaction.atomic(using=target):
+            target_notes.bulk_update(notes, SYNC_FIELDS)
+    for ids in chunks(new, batch_size):
+        with transaction.atomic(using=target):
+            for note in source_notes.filter(pk__in=ids).order_by('pk'):
+                note.pk = None
+                # raw: дата изменения переносится как есть.
+                note.save_base(raw=True, using=target)
+    return len(changed) + len(new)
+
+
+def sync_revisions(author_id, source, target, batch_size):
+    """Приводит историю заметок автора в target к состоянию в source.
+
+    Версии не меняются после записи, поэтому сверяются по номеру:
+    недостающие копируются, обрезанные в source удаляются. Заметки
+    в target к этому времени уже скопированы (sync_notes). Без
+    блокировки source заметку могут создать или переименовать уже
+    после sync_notes: её версии пропускаются, их перенесёт второй
+    проход под блокировкой.
+    """
+    target_notes = note_versions(author_id, target)
+    target_ids = {
+        pk: target_notes[slug][0]
+        for slug, (pk, _) in note_versions(author_id, source).items()
+        if slug in target_notes
+    }
+
+    def numbers(using):
+        return set(
+            NoteRevision.objects.using(using)
+            .filter(note__author_id=author_id)
+            .values_list('note_id', 'number')
+        )
+
+    copied = numbers(target)
+    current = {
+        (target_ids[note_id], number): pk
+        for pk, note_id, number in (
+            NoteRevision.objects.using(source)
+            .filter(note__author_id=author_id)
+            .values_list('pk', 'note_id', 'number')
+        )
+        if note_id in target_ids
+    }
+    gone = copied - set(current)
+    target_revisions = NoteRevision.objects.using(target)
+    for keys in chunks(sorted(gone), batch_size):
+        with transaction.atomic(using=target):
+            for note_id, number in keys:
+                target_revisions.filter(
+                    note_id=note_id, number=number
+                ).delete()
+    new = sorted(pk for key, pk in current.items() if key not in copied)
+    for ids in chunks(new, batch_size):
+        revisions = list(NoteRevision.objects.using(source).filter(pk__in=ids))
+        for revision in revisions:
+            revision.pk = None
+            revision.note_id = target_ids[revision.note_id]
+        with transaction.atomic(using=target):
+            target_revisions.bulk_create(revisions)
+
+
+def delete_notes(author_id, using, batch_size):
+    """Удаляет заметки автора из шарда короткими транзакциями."""
+    notes = Note.objects.using(using)
+    while True:
+        ids = list(
+            notes.filter(author_id=author_id)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        with transaction.atomic(using=using):
+            notes.filter(pk__in=ids).delete()
+
+
+def move_author(author_id, source, target, batch_size):
+    """Переносит заметки автора из его текущего шарда source в target.
+
+    Если target не совпадает с выбором хеша, автор остаётся
+    закреплённым за target. Возвращает число скопированных заметок.
+    """
+    copied = sync_notes(author_id, source, target, batch_size)
+    sync_revisions(author_id, source, target, batch_size)
+    with transaction.atomic(using=source):
+        # Пока транзакция открыта, в source никто не пишет.
+        copied += sync_notes(author_id, source, target, batch_size)
+        sync_revisions(author_id, source, target, batch_size)
+        if target == hash_shard(author_id):
+            placements().filter(author_id=author_id).delete()
+        else:
+            placements().update_or_create(
+                author_id=author_id, defaults={'alias': target}
+            )
+    delete_notes(author_id, source, batch_size)
+    invalidate_user(author_id)
+    return copied
+
+
+def shards_in_use():
+    """Шарды из настроек и шарды, за которыми ещё закреплены авторы."""
+    shards = settings.NOTES_SHARDS
+    pinned = set(placements().values_list('alias', flat=True))
+    return shards + sorted(pinned - set(shards))
+
+
+def authors_in(alias):
+    return (
+        Note.objects.using(alias).order_by('author_id')
+        .values_list('author_id', flat=True).distinct()
+    )
+
+
+def pin_authors():
+    """Закрепляет авторов за шардами, где лежат их заметки."""
+    pinned = 0
+    for alias in shards_in_use():
+        for author_id in authors_in(alias):
+            placements().update_or_create(
+                author_id=author_id, defaults={'alias': alias}
+            )
+            pinned += 1
+    return pinned
+
+
+def plan_moves():
+    """Переносы к шардам, выбранным хешем, и заметки вне своего шарда.
+
+    Возвращает список (автор, откуда, куда) и список (автор, шард)
+    заметок, лежащих не там, куда направлен автор: их никто не видит,
+    например после прерванного переноса. Такие заметки не трогаются.
+    """
+    moves = []
+    strays = []
+    for alias in shards_in_use():
+        for author_id in authors_in(alias):
+            if shard_for(author_id) != alias:
+                strays.append((author_id, alias))
+            elif hash_shard(author_id) != alias:
+                moves.append((author_id, alias, hash_shard(author_id)))
+    return moves, strays
+
+
+def release_pins():
+    """Снимает закрепления, совпадающие с выбором хеша."""
+    rows = placements().values_list('author_id', 'alias')
+    stale = [
+        author_id for author_id, alias in rows
+        if hash_shard(author_id) == alias
+    ]
+    for ids in chunks(stale, 500):
+        placements().filter(author_id__in=ids).delete()
+    return len(stale)
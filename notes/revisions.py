@@ -0,0 +1,181 @@
+"""История версий заметок.
+
+Перед каждым изменением заметки её прежняя версия сохраняется
+в NoteRevision. Текст версии хранится обратной дельтой: как получить
+его из следующей, более новой версии (для последней версии —
+из текущего текста заметки). Каждая NOTES_REVISION_SNAPSHOT_INTERVAL-я
+версия, а также версия, дельта которой не короче текста, хранится
+полным снимком. Поэтому текст любой версии восстанавливается не больше
+чем за NOTES_REVISION_SNAPSHOT_INTERVAL - 1 дельт от ближайшего
+снимка или текущего текста.
+
+Версии не меняются после записи, а каждая зависит только от более
+новых. Поэтому обрезка истории (prune_revisions) удаляет самые старые
+версии заметки и не ломает восстановление оставшихся.
+"""
+import json
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .compression import decompress
+from .models import Note, NoteRevision
+
+
+def make_delta(source, target):
+    """Дельта, которая превращает текст source в target.
+
+    JSON-список построчных операций: пара [начало, конец] копирует
+    строки source, строка вставляется как есть.
+    """
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    operations = []
+    matcher = SequenceMatcher(None, source_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif j2 > j1:
+            operations.append(''.join(target_lines[j1:j2]))
+    return json.dumps(operations, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(source, delta):
+    lines = source.splitlines(keepends=True)
+    return ''.join(
+        ''.join(lines[slice(*operation)])
+        if isinstance(operation, list) else operation
+        for operation in json.loads(delta)
+    )
+
+
+def build_revision(note_id, number, old, text):
+    """Версия номер number со значениями old перед записью text."""
+    title, slug, old_text, updated_at = old
+    revision = NoteRevision(
+        note_id=note_id, number=number, title=title, slug=slug,
+        updated_at=updated_at, is_snapshot=True, data=old_text,
+    )
+    if number % settings.NOTES_REVISION_SNAPSHOT_INTERVAL:
+        delta = make_delta(text, old_text)
+        if len(delta) < len(old_text):
+            revision.is_snapshot = False
+            revision.data = delta
+    return revision
+
+
+def record(notes, using):
+    """Сохраняет прежние версии заметок перед их обновлением.
+
+    Вызывается в транзакции записи: прежние значения читаются
+    из базы, а не из объектов. Заметки, у которых не меняются
+    ни заголовок, ни slug, ни текст, версий не получают.
+    """
+    ids = [note.pk for note in notes]
+    old = {
+        pk: (title, slug, decompress(text), updated_at)
+        for pk, title, slug, text, updated_at in (
+            Note.objects.using(using).filter(pk__in=ids)
+            .values_list('pk', 'title', 'slug', 'text', 'updated_at')
+        )
+    }
+    last = dict(
+        NoteRevision.objects.using(using).filter(note_id__in=ids)
+        .values('note_id').annotate(last=Max('number'))
+        .values_list('note_id', 'last')
+    )
+    revisions = [
+        build_revision(
+            note.pk, last.get(note.pk, 0) + 1, old[note.pk], note.text
+        )
+        for note in notes
+        if note.pk in old
+        and old[note.pk][:3] != (note.title, note.slug, note.text)
+    ]
+    NoteRevision.objects.using(using).bulk_create(revisions)
+
+
+def record_revision(sender, instance, raw, using, **kwargs):
+    """pre_save: версия заметки перед её изменением через save()."""
+    if raw or instance._state.adding:
+        return
+    record([instance], using)
+
+
+def revision_text(revision):
+    """Восстанавливает текст версии.
+
+    Дельты применяются от ближайшего более нового снимка, а если его
+    нет — от текущего текста заметки. Текст заметки читается одним
+    запросом вместе с номером последней версии, поэтому правка,
+    сделанная во время восстановления, его не портит.
+    """
+    revisions = NoteRevision.objects.using(revision._state.db).filter(
+        note_id=revision.note_id, number__gte=revision.number,
+    )
+    snapshot = (
+        revisions.filter(is_snapshot=True).order_by('number')
+        .values_list('number', flat=True).first()
+    )
+    if snapshot is None:
+        text, last = (
+            Note.objects.using(revision._state.db)
+            .filter(pk=revision.note_id)
+            .annotate(last=Subquery(
+                NoteRevision.objects.filter(note_id=OuterRef('pk'))
+                .order_by('-number').values('number')[:1]
+            ))
+            .values_list('text', 'last').get()
+        )
+        text = decompress(text)
+        chain = revisions.filter(number__lte=last)
+    else:
+        text = None
+        chain = revisions.filter(number__lte=snapshot)
+    for is_snapshot, data in (
+        chain.order_by('-number').values_list('is_snapshot', 'data')
+    ):
+        data = decompress(data)
+        text = data if is_snapshot else apply_delta(text, data)
+    return text
+
+
+def prune(using, batch_size):
+    """Удаляет старые версии порциями, отдавая число удалённых.
+
+    Удаляются версии старше NOTES_REVISION_MAX_AGE_DAYS, кроме
+    NOTES_REVISION_KEEP последних версий каждой заметки. Порции
+    идут по id, каждая — в своей короткой транзакции.
+    """
+    cutoff = timezone.now() - timedelta(
+        days=settings.NOTES_REVISION_MAX_AGE_DAYS
+    )
+    latest = (
+        NoteRevision.objects.filter(note_id=OuterRef('note_id'))
+        .order_by('-number').values('number')[:1]
+    )
+    revisions = NoteRevision.objects.using(using)
+    old = revisions.filter(updated_at__lt=cutoff).annotate(
+        latest=Subquery(latest)
+    )
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            old.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'number', 'latest')[:batch_size]
+        )
+        if not ids:
+            return
+        last_id = ids[-1][0]
+        stale = [
+            pk for pk, number, latest in ids
+            if number <= latest - settings.NOTES_REVISION_KEEP
+        ]
+        with transaction.atomic(using=using):
+            deleted += revisions.filter(pk__in=stale).delete()[0]
+        yield deleted
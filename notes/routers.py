@@ -0,0 +1,126 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Note, NoteRevision
+from .sharding import is_sharded, shard_for
+
+# Cookie, пока она жива, запросы пользователя читают с основной базы.
+PIN_COOKIE = 'notes_primary'
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_replica_reads = ContextVar('notes_replica_reads', default=False)
+
+
+def can_read_replica(request):
+    """Может ли запрос читать с реплики: не пишет и не ждёт свою запись."""
+    return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Чтения внутри блока идут на реплики, если enabled."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ShardRouter:
+    """Отправляет заметки в шард их автора.
+
+    Подсказка instance — заметка или, для связанных запросов вроде
+    user.note_set, сам автор. Версии заметки лежат в её шарде.
+    Остальные модели живут в default.
+    """
+
+    def note_shard(self, model, instance):
+        if model not in (Note, NoteRevision) or instance is None:
+            return None
+        if isinstance(instance, NoteRevision):
+            return instance._state.db
+        return shard_for(getattr(instance, 'author_id', instance.pk))
+
+    def db_for_read(self, model, instance=None, **hints):
+        if not is_sharded():
+            return None
+        if model not in (Note, NoteRevision) and isinstance(instance, Note):
+            # Автор заметки из шарда лежит в default.
+            return DEFAULT_DB_ALIAS
+        return self.note_shard(model, instance)
+
+    def db_for_write(self, model, instance=None, **hints):
+        if not is_sharded():
+            return None
+        return self.note_shard(model, instance)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Заметка из любого шарда связана с пользователем из default."""
+        if is_sharded() and Note in (type(obj1), type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'notes' and model_name == 'shardplacement':
+            return db == DEFAULT_DB_ALIAS
+        return None
+
+
+class ReplicaRouter:
+    """Отправляет чтения на реплики, а запись — в основную базу.
+
+    Реплика выбирается только внутри replica_reads: остальные страницы
+    и любые записи работают с default, как без маршрутизатора.
+    """
+
+    def __init__(self):
+        self._counter = count()
+
+    def choose_replica(self, replicas):
+        if settings.NOTES_REPLICA_SELECTION == 'round_robin':
+            return replicas[next(self._counter) % len(replicas)]
+        return random.choice(replicas)
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.NOTES_READ_REPLICAS
+        if replicas and _replica_reads.get():
+            return self.choose_replica(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики хранят те же строки, что и основная база."""
+        pool = {DEFAULT_DB_ALIAS, *settings.NOTES_READ_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """Страница читает с реплики, если запрос это допускает."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(can_read_replica(request)):
+            response = super().dispatch(request, *args, **kwargs)
+            # Шаблон обычно отрисовывается уже после dispatch; ленивые
+            # запросы страницы, например пользователь в шапке, тоже
+            # должны идти на реплику.
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+
+
+class AsyncReplicaReadMixin:
+    """То же для асинхронных представлений."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        with replica_reads(can_read_replica(request)):
+            return await super().dispatch(request, *args, **kwargs)
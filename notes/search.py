@@ -0,0 +1,319 @@
+import re
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Note
+from .sharding import shard_for
+
+FTS_TABLE = 'notes_note_fts'
+
+# Служебные символы, которыми FTS5 обрамляет совпадения в сниппете.
+# Они не встречаются в обычном тексте и переживают HTML-экранирование.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+SNIPPET_TOKENS = 16
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Сначала идут заметки с совпадением в заголовке, затем более новые.
+# bm25 здесь не подходит: для IDF он проходит весь список документов
+# по каждому слову во всей таблице, и на популярных словах время
+# запроса растёт вместе с базой, а не с числом заметок автора.
+# Сниппет дорогой (текст читается и токенизируется заново), поэтому
+# он строится только для отобранной страницы результатов.
+SEARCH_SQL = f"""
+    WITH ranked AS (
+        SELECT rowid AS id, rowid IN (
+            SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+        ) AS in_title
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY in_title DESC, rowid DESC
+        LIMIT %s
+    )
+    SELECT note.id, note.title, note.slug, note.author_id,
+           snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_TOKENS})
+               AS snippet
+    FROM ranked
+    CROSS JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = ranked.id
+    JOIN notes_note AS note ON note.id = ranked.id
+    WHERE {FTS_TABLE} MATCH %s AND note.author_id = %s
+    ORDER BY ranked.in_title DESC, ranked.id DESC
+"""
+
+
+def is_available(using=DEFAULT_DB_ALIAS):
+    """Полнотекстовый индекс есть только в SQLite."""
+    return connections[using].vendor == 'sqlite'
+
+
+def build_match_query(query, columns='title text'):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, чтобы операторы и спецсимволы
+    FTS5 не ломали запрос. Поиск по префиксу не используется:
+    без префиксного индекса он перебирает словарь и в разы медленнее.
+    """
+    words = WORD_RE.findall(query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    return f'{{{columns}}}: (' + ' '.join(terms) + ')'
+
+
+def build_author_query(author, match):
+    """Сужает запрос до заметок автора прямо внутри индекса.
+
+    Пересечение со списком документов автора делает FTS5, поэтому
+    сортируются только заметки автора, а не все совпадения в базе.
+    """
+    return f'author_id: "{author.pk}" AND {match}'
+
+
+def highlight(snippet):
+    """Экранирует сниппет и подсвечивает совпадения тегом <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MATCH_START, '<mark>')
+        .replace(MATCH_END, '</mark>')
+    )
+
+
+def search_notes(author, query, limit):
+    """Ищет заметки автора, отсортированные по релевантности.
+
+    Индекс у каждого шарда свой, запрос идёт в шард автора.
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+    alias = shard_for(author.pk)
+    if not is_available(alias):
+        notes = list(Note.objects.for_author(author, alias).filter(
+            Q(title__icontains=query) | Q(text__icontains=query),
+        ).only('id', 'title', 'slug', 'author_id')[:limit])
+        for note in notes:
+            note.snippet = ''
+        return notes
+    author_match = build_author_query(author, match)
+    title_match = build_author_query(
+        author, build_match_query(query, 'title')
+    )
+    notes = list(Note.objects.using(alias).raw(
+        SEARCH_SQL,
+        [
+            title_match, author_match, limit,
+            MATCH_START, MATCH_END, author_match, author.pk,
+        ],
+    ))
+    for note in notes:
+        note.snippet = highlight(note.snippet)
+    return notes
+
+
+@contextmanager
+def paused_index(using=DEFAULT_DB_ALIAS):
+    """Снимает триггеры индекса на время массовой загрузки заметок.
+
+    Триггер индексирует каждую строку отдельно, и загрузка с ним идёт
+    в разы дольше, чем запись и перестройка индекса после неё. На выходе
+    триггеры создаются заново из их же SQL, а индекс нужно перестроить
+    (rebuild_index) ещё внутри блока. Записи других соединений в это
+    время в индекс не попадают, поэтому загружать стоит без трафика.
+    """
+    if not is_available(using):
+        yield
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'trigger' AND tbl_name = 'notes_note'
+                AND name LIKE %s
+            """,
+            [f'{FTS_TABLE}_%'],
+        )
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        with connections[using].cursor() as cursor:
+            for _, sql in triggers:
+                cursor.execute(sql)
+
+
+def rebuild_index(batch_size, using=DEFAULT_DB_ALIAS):
+    """Перестраивает индекс базы порциями, отдавая число заметок.
+
+    Граница порции выбирается по id, поэтому время одной порции
+    не растёт к концу таблицы, а транзакции остаются короткими.
+    Сжатые тексты распаковывает SQL-функция notes_text.
+    """
+    indexed = 0
+    last_id = 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+        )
+        while True:
+            cursor.execute(
+                """
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT id FROM notes_note
+                    WHERE id > %s ORDER BY id LIMIT %s
+                )
+                """,
+                [last_id, batch_size],
+            )
+            upper_id, count = cursor.fetchone()
+            if not count:
+                break
+            with transaction.atomic(using=using):
+                cursor.execute(
+                    f"""
+                    INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+                    SELECT id, title, notes_text(text), author_id
+                    FROM notes_note
+                    WHERE id > %s AND id <= %s
+                    """,
+                    [last_id, upper_id],
+                )
+            last_id = upper_id
+            indexed += count
+            yield indexed
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+# Триггеры индекса без сжатия (миграция 0002): текст берётся из строки
+# как есть. Схема не зависит от функций Django, и notes_note можно
+# менять из любого клиента SQLite.
+PLAIN_TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, new.text, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES ('delete', old.id, old.title, old.text, old.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, text, author_id
+    ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES ('delete', old.id, old.title, old.text, old.author_id);
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, new.text, new.author_id);
+    END
+    """,
+)
+
+PLAIN_INDEX_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, text, author_id,
+        content='notes_note', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    *PLAIN_TRIGGERS_SQL,
+)
+
+# Индекс для сжатых текстов (см. notes.compression): текст читается
+# через SQL-функцию notes_text, а внешнее содержимое FTS5 — это
+# представление с распакованным текстом, из него же snippet() строит
+# сниппеты. notes_text есть только в соединениях Django, поэтому схема
+# ставится, лишь когда сжатие включено (compress_notes).
+COMPRESSED_INDEX_SQL = (
+    """
+    CREATE VIEW notes_note_text AS
+    SELECT id, title, notes_text(text) AS text, author_id FROM notes_note
+    """,
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, text, author_id,
+        content='notes_note_text', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, notes_text(new.text), new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES (
+            'delete', old.id, old.title, notes_text(old.text), old.author_id
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, text, author_id
+    ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES (
+            'delete', old.id, old.title, notes_text(old.text), old.author_id
+        );
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, notes_text(new.text), new.author_id);
+    END
+    """,
+)
+
+DROP_INDEX_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    'DROP VIEW IF EXISTS notes_note_text',
+)
+
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def index_schema_sql(compressed):
+    """SQL, который заново создаёт индекс в нужной схеме (без данных)."""
+    return DROP_INDEX_SQL + (
+        COMPRESSED_INDEX_SQL if compressed else PLAIN_INDEX_SQL
+    )
+
+
+def has_compressed_index(using=DEFAULT_DB_ALIAS):
+    """Стоит ли в базе схема индекса для сжатых текстов."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = %s",
+            ['notes_note_text'],
+        )
+        return cursor.fetchone() is not None
+
+
+def set_index_schema(compressed, batch_size, using=DEFAULT_DB_ALIAS):
+    """Переводит индекс базы на схему со сжатием или без и перестраивает.
+
+    Ничего не делает, если схема уже нужная. Отдаёт число
+    проиндексированных заметок, как rebuild_index.
+    """
+    if has_compressed_index(using) == compressed:
+        return
+    with transaction.atomic(using=using), connections[using].cursor() as (
+        cursor
+    ):
+        for statement in index_schema_sql(compressed):
+            cursor.execute(statement)
+    yield from rebuild_index(batch_size, using)
@@ -0,0 +1,46 @@
+"""Сессии в кеше с записью в базу (профиль NOTES_SESSION_PROFILE=cached).
+
+Сессия читается из кеша, а в базу пишется только при изменении
+данных. При SESSION_SAVE_EVERY_REQUEST сессия сохраняется на каждом
+запросе, чтобы продлить срок жизни; такое «касание» обновляет кеш
+сразу, а строку в базе — не чаще раза в NOTES_SESSION_TOUCH_INTERVAL
+секунд. Если кеш потерян, сессия читается из базы с чуть более
+ранним сроком истечения.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = 'notes.sessions'
+
+    def written_key(self, session_key=None):
+        """Ключ кеша со временем последней записи сессии в базу."""
+        session_key = session_key or self.session_key
+        return f'{self.cache_key_prefix}{session_key}:written'
+
+    def is_written_recently(self):
+        written = self._cache.get(self.written_key())
+        return (
+            written is not None
+            and time.time() - written < settings.NOTES_SESSION_TOUCH_INTERVAL
+        )
+
+    def save(self, must_create=False):
+        if (
+            must_create or self.modified or self.session_key is None
+            or not self.is_written_recently()
+        ):
+            super().save(must_create)
+            self._cache.set(
+                self.written_key(), time.time(), self.get_expiry_age()
+            )
+            return
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key or self.session_key:
+            self._cache.delete(self.written_key(session_key))
@@ -0,0 +1,99 @@
+"""Шардирование заметок по авторам.
+
+Все заметки автора лежат в одной базе из NOTES_SHARDS, поэтому любая
+страница автора обращается к одному шарду. Шард выбирается
+rendezvous-хешированием id автора: при добавлении шарда на него
+переезжает лишь часть авторов, остальные остаются на месте.
+Явное размещение из таблицы ShardPlacement (она живёт в default)
+важнее хеша: так авторы удерживаются на старом шарде, пока их
+не перенесёт команда rebalance_shards.
+
+Slug уникален в пределах автора, а не всей таблицы: глобальную
+уникальность нельзя проверить одним индексом, когда строки лежат
+в разных базах. Адреса страниц всё равно содержат только свои
+заметки пользователя.
+
+Ограничения: запросы без автора (админка, Note.objects.all()) видят
+только default, реплики для чтения работают лишь без шардов.
+"""
+import hashlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class ShardMoved(Exception):
+    """Автора перенесли на другой шард, пока начиналась запись."""
+
+
+def is_sharded():
+    return len(settings.NOTES_SHARDS) > 1
+
+
+def hash_shard(author_id, shards=None):
+    """Шард автора по rendezvous-хешу: у кого больше вес пары."""
+    def weight(alias):
+        digest = hashlib.blake2b(
+            f'{author_id}:{alias}'.encode(), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, 'big')
+    return max(shards or settings.NOTES_SHARDS, key=weight)
+
+
+def placements():
+    from .models import ShardPlacement
+    return ShardPlacement.objects.using(DEFAULT_DB_ALIAS)
+
+
+def shard_for(author_id):
+    """Алиас базы с заметками автора."""
+    if not is_sharded():
+        return settings.NOTES_SHARDS[0]
+    alias = (
+        placements().filter(author_id=author_id)
+        .values_list('alias', flat=True).first()
+    )
+    return alias or hash_shard(author_id)
+
+
+async def ashard_for(author_id):
+    """Асинхронная версия shard_for."""
+    if not is_sharded():
+        return settings.NOTES_SHARDS[0]
+    alias = await (
+        placements().filter(author_id=author_id)
+        .values_list('alias', flat=True).afirst()
+    )
+    return alias or hash_shard(author_id)
+
+
+@contextmanager
+def atomic_for(author_id, using=None):
+    """Транзакция в шарде автора; отдаёт алиас шарда.
+
+    rebalance_shards переключает автора на новый шард, удерживая
+    блокировку записи в старом. Поэтому размещение проверяется ещё раз
+    уже внутри транзакции: если автор успел переехать, запись
+    не остаётся в старом шарде, а падает с ShardMoved.
+    Явно заданный using не проверяется.
+    """
+    alias = using or shard_for(author_id)
+    with transaction.atomic(using=alias):
+        if using is None and is_sharded() and shard_for(author_id) != alias:
+            raise ShardMoved(f'Заметки автора {author_id} переехали.')
+        yield alias
+
+
+def delete_author_notes(sender, instance, using, **kwargs):
+    """Удаляет заметки пользователя из его шарда.
+
+    Каскадное удаление Django видит только базу, из которой удаляется
+    пользователь, а заметки могут лежать в другом шарде.
+    """
+    from .models import Note
+    if not is_sharded():
+        return
+    alias = shard_for(instance.pk)
+    if alias != using:
+        Note.objects.using(alias).filter(author_id=instance.pk).delete()
@@ -0,0 +1,71 @@
+from functools import lru_cache
+
+from django.conf import settings
+from pytils import translit
+
+# Сколько вариантов slug-а перебирать, прежде чем сдаться.
+MAX_ATTEMPTS = 20
+
+# Сколько символов оставлено под суффикс -2, -3 и т. д.
+SUFFIX_RESERVE = 10
+
+
+@lru_cache(maxsize=settings.NOTES_SLUG_CACHE_SIZE)
+def slugify(title):
+    """pytils.translit.slugify с LRU-кешем результатов.
+
+    Транслитерация — десяток проходов replace и регулярных выражений
+    по строке, а заголовки при импорте часто повторяются.
+    """
+    return translit.slugify(title)
+
+
+def cache_info():
+    """Статистика кеша транслитерации для подбора его размера."""
+    info = slugify.cache_info()
+    total = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_ratio': info.hits / total if total else 0.0,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+    }
+
+
+def make_slug(title, max_length):
+    """Slug из заголовка, как его формирует Note.save."""
+    return slugify(title)[:max_length]
+
+
+def make_slugs(titles, max_length):
+    """Slug-и для многих заголовков: каждый заголовок считается один раз."""
+    unique = {title: make_slug(title, max_length) for title in set(titles)}
+    return [unique[title] for title in titles]
+
+
+def with_suffix(base, number, max_length):
+    """Вариант slug-а с номером; номер 1 — сам slug без суффикса."""
+    if number == 1:
+        return base
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)] + suffix
+
+
+def candidates(base, max_length, attempts=MAX_ATTEMPTS):
+    """Варианты slug-а по порядку: base, base-2, base-3..."""
+    for number in range(1, attempts + 1):
+        yield with_suffix(base, number, max_length)
+
+
+def suffix_prefix(base, max_length):
+    """Общее начало всех вариантов base с суффиксом."""
+    limit = max_length - SUFFIX_RESERVE
+    if len(base) <= limit:
+        return f'{base}-'
+    return base[:limit]
+
+
+def is_slug_conflict(error):
+    """Нарушено ли ограничение уникальности slug-а."""
+    return 'slug' in str(error)
@@ -0,0 +1,115 @@
+"""Потоковая отдача длинных заметок (NOTES_DETAIL_STREAMING).
+
+Обычно страница заметки строится в памяти целиком: текст в 20 МБ —
+это строка в 20 МБ и столько же в буфере ответа. В потоковом режиме
+страница отрисовывается без текста, начало страницы уходит клиенту
+сразу, а текст читается из базы порциями через BLOB-интерфейс SQLite,
+распаковывается, если хранится сжатым (см. notes.compression),
+экранируется и отправляется следом.
+
+Пока текст не отдан до конца, соединение держит транзакцию
+на чтение. В профиле production (WAL) это не мешает записи;
+без WAL запись в базу ждёт окончания отдачи.
+"""
+import codecs
+import uuid
+from functools import partial
+from itertools import chain
+
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+from .compression import decompress, stream_decompress
+
+
+class NoteText:
+    """Текст заметки, открытый для чтения прямо из строки таблицы.
+
+    Размер известен из BLOB без запросов. Вид хранения (строка или
+    сжатые байты) по содержимому не определить, поэтому короткий текст
+    дочитывается обычным запросом, где значение приходит вместе
+    с типом, а TYPEOF запрашивается, только если текст идёт потоком.
+    """
+
+    def __init__(self, blob, connection, pk):
+        self.blob = blob
+        self.connection = connection
+        self.pk = pk
+
+    @property
+    def size(self):
+        """Размер хранимого значения в байтах."""
+        return len(self.blob)
+
+    def storage(self):
+        """TYPEOF значения: text или blob (сжатый текст)."""
+        # Пока BLOB открыт, запросы соединения видят ту же версию строки.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TYPEOF(text) FROM notes_note WHERE id = %s', [self.pk]
+            )
+            (storage,) = cursor.fetchone()
+        return storage
+
+    def read(self):
+        """Закрывает BLOB и читает текст целиком одним запросом."""
+        self.close()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT text FROM notes_note WHERE id = %s', [self.pk]
+            )
+            row = cursor.fetchone()
+        # Заметку могли удалить после загрузки страницы.
+        return decompress(row[0]) if row else ''
+
+    def chunks(self, chunk_size):
+        """Отдаёт текст порциями, экранированными для HTML."""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            if self.storage() == 'blob':
+                parts = stream_decompress(self.blob, chunk_size)
+            else:
+                parts = iter(partial(self.blob.read, chunk_size), b'')
+            for part in parts:
+                text = decoder.decode(part)
+                if text:
+                    yield escape(text)
+            text = decoder.decode(b'', final=True)
+            if text:
+                yield escape(text)
+        finally:
+            self.close()
+
+    def close(self):
+        self.blob.close()
+
+
+def open_text(note):
+    """Открывает текст заметки; None — если база не SQLite."""
+    connection = connections[note._state.db]
+    if connection.vendor != 'sqlite':
+        return None
+    connection.ensure_connection()
+    blob = connection.connection.blobopen(
+        'notes_note', 'text', note.pk, readonly=True
+    )
+    return NoteText(blob, connection, note.pk)
+
+
+def stream_page(request, template_names, context, text, chunk_size):
+    """Ответ со страницей, в которую текст заметки дописывается потоком.
+
+    Шаблон получает вместо текста метку text_placeholder; по ней
+    отрисованная страница делится на начало и конец.
+    """
+    placeholder = f'notes-text-{uuid.uuid4().hex}'
+    page = render_to_string(
+        template_names, {**context, 'text_placeholder': placeholder},
+        request,
+    )
+    head, tail = page.split(placeholder, 1)
+    return StreamingHttpResponse(
+        chain([head], text.chunks(chunk_size), [tail])
+    )
@@ -0,0 +1,183 @@
+"""Замеры времени запроса: SQL, представление и шаблон.
+
+Замеры включает ServerTimingMiddleware для доли запросов
+NOTES_TIMING_SAMPLE_RATE. Итог уходит в заголовок Server-Timing
+и строкой key=value в журнал notes.timing, а одинаковые SQL-запросы,
+повторённые за запрос NOTES_TIMING_REPEAT_THRESHOLD раз и больше
+(типичный N+1), — предупреждением туда же.
+
+Шаблоны замеряет бэкенд TimedDjangoTemplates: страницы отрисовываются
+и в представлении (ReplicaReadMixin, потоковая отдача), и после него,
+а бэкенд видит любую отрисовку.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# Замеры текущего запроса; None, если запрос не попал в выборку.
+current = ContextVar('notes_timings', default=None)
+
+
+class QueryRecorder:
+    """Обёртка выполнения SQL: число запросов, их время и повторы.
+
+    Ставится на все соединения, включая шарды и реплики. Текст SQL
+    с параметрами-заполнителями одинаков у запросов N+1, поэтому
+    повторы считаются по нему.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def repeated(self):
+        """Запросы, повторённые не меньше порога, и число повторов."""
+        return [
+            (sql, count) for sql, count in self.statements.most_common()
+            if count >= settings.NOTES_TIMING_REPEAT_THRESHOLD
+        ]
+
+
+class RequestTimings:
+    """Замеры одного запроса; времена — в секундах.
+
+    view — от вызова представления до возврата ответа в middleware,
+    вместе с отрисовкой. template — отрисовка шаблонов без SQL,
+    выполненного по ходу неё: ленивые запросы шаблона попадают в db.
+    Потоковый ответ замеряется до начала отдачи.
+    """
+
+    def __init__(self):
+        self.queries = QueryRecorder()
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view = 0.0
+        self.template = 0.0
+        self.rendering = False
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+
+    def finish_view(self):
+        if self.view_started is not None:
+            self.view = time.perf_counter() - self.view_started
+
+    @contextmanager
+    def render(self):
+        """Замер отрисовки; вложенные отрисовки не считаются дважды."""
+        if self.rendering:
+            yield
+            return
+        self.rendering = True
+        started = time.perf_counter()
+        sql = self.queries.duration
+        try:
+            yield
+        finally:
+            self.rendering = False
+            self.template += (
+                time.perf_counter() - started
+                - (self.queries.duration - sql)
+            )
+
+    def metrics(self):
+        """Имя метрики → (мс, описание) для заголовка и журнала."""
+        repeated = self.queries.repeated()
+        metrics = {
+            'db': (
+                self.queries.duration * 1000,
+                f'{self.queries.count} queries',
+            ),
+            'view': (self.view * 1000, ''),
+            'tpl': (self.template * 1000, ''),
+            'total': ((time.perf_counter() - self.started) * 1000, ''),
+        }
+        if repeated:
+            metrics['repeated'] = (
+                0.0, f'{len(repeated)} x{repeated[0][1]}'
+            )
+        return metrics
+
+
+class TimedTemplate:
+    """Шаблон, отрисовка которого попадает в замеры запроса."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = current.get()
+        if timings is None:
+            return self.template.render(context, request)
+        with timings.render():
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates, который замеряет отрисовку."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def server_timing(metrics):
+    """Значение заголовка Server-Timing."""
+    entries = []
+    for name, (duration, description) in metrics.items():
+        entry = f'{name};dur={duration:.1f}'
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+def log(request, response, timings, metrics):
+    """Строка key=value в журнал и предупреждения о повторах SQL."""
+    logger.info(
+        'method=%s path=%s status=%s queries=%d db_ms=%.1f view_ms=%.1f '
+        'tpl_ms=%.1f total_ms=%.1f repeated=%d',
+        request.method, request.path, response.status_code,
+        timings.queries.count, metrics['db'][0], metrics['view'][0],
+        metrics['tpl'][0], metrics['total'][0],
+        len(timings.queries.repeated()),
+        extra={'timings': {
+            name: round(duration, 3)
+            for name, (duration, _) in metrics.items()
+        }},
+    )
+    for sql, count in timings.queries.repeated():
+        logger.warning(
+            'Возможен N+1: %s %s выполнил %d раз запрос: %s',
+            request.method, request.path, count, sql,
+        )
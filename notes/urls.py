@@ -1,15 +1,41 @@
+from django.conf import settings
 from django.urls import path
 
-from notes import views
+from notes import async_views, views
 
 app_name = 'notes'
 
-urlpatterns = [
-    path('', views.Home.as_view(), name='home'),
-    path('add/', views.NoteCreate.as_view(), name='add'),
-    path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
-    path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
-    path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
-    path('notes/', views.NotesList.as_view(), name='list'),
-    path('done/', views.NoteSuccess.as_view(), name='success'),
-]
+
+def build_urlpatterns(use_async):
+    """Маршруты приложения; use_async включает асинхронные CRUD-страницы."""
+    pages = async_views if use_async else views
+    return [
+        path('', views.Home.as_view(), name='home'),
+        path('add/', pages.NoteCreate.as_view(), name='add'),
+        path('import/', views.NoteImport.as_view(), name='import'),
+        path(
+            'export/<str:fmt>/', views.NoteExport.as_view(), name='export'
+        ),
+        path('edit/<slug:slug>/', pages.NoteUpdate.as_view(), name='edit'),
+        path(
+            'note/<slug:slug>/', pages.NoteDetail.as_view(), name='detail'
+        ),
+        path(
+            'delete/<slug:slug>/', pages.NoteDelete.as_view(), name='delete'
+        ),
+        path(
+            'history/<slug:slug>/', views.NoteHistory.as_view(),
+            name='history',
+        ),
+        path(
+            'history/<slug:slug>/<int:number>/',
+            views.NoteRevisionDetail.as_view(), name='revision',
+        ),
+        path('notes/', pages.NotesList.as_view(), name='list'),
+        path('search/', views.NoteSearch.as_view(), name='search'),
+        path('api/notes/batch/', views.NoteBatch.as_view(), name='batch'),
+        path('done/', views.NoteSuccess.as_view(), name='success'),
+    ]
+
+
+urlpatterns = build_urlpatterns(settings.NOTES_ASYNC_VIEWS)
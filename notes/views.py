@@ -1,12 +1,36 @@
+import json
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError
+from django.http import (
+    Http404, HttpResponse, HttpResponseRedirect, JsonResponse,
+    StreamingHttpResponse,
+)
 from django.urls import reverse_lazy
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django.views import generic
 
-from .forms import NoteForm
-from .models import Note
+from . import metrics
+from .batch import run_batch
+from .cache import UserCache, page_key
+from .conditional import ConditionalGetMixin, page_parts
+from .exporter import CONTENT_TYPES, stream_export
+from .forms import NoteForm, NoteImportForm
+from .importer import detect_format, import_notes
+from .models import Note, NoteRevision
+from .pagination import KeysetPaginator, parse_cursor
+from .revisions import revision_text
+from .routers import ReplicaReadMixin
+from .search import search_notes
+from .slugs import is_slug_conflict
+from .streaming import open_text, stream_page
+from .writer import write
 
 
-class Home(generic.TemplateView):
+class Home(ReplicaReadMixin, generic.TemplateView):
     """Домашняя страница."""
     template_name = 'notes/home.html'
 
@@ -23,22 +47,122 @@ class NoteBase(LoginRequiredMixin):
 
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.for_author(self.request.user)
+
+
+class CachedPageMixin:
+    """Кеширует готовый HTML страницы в кеше пользователя."""
+
+    @cached_property
+    def user_cache(self):
+        return UserCache(self.request.user.pk)
+
+    def get(self, request, *args, **kwargs):
+        key = page_key(request)
+        if key is None:
+            return super().get(request, *args, **kwargs)
+        content = self.user_cache.get(*key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+        # Потоковые ответы слишком велики для кеша.
+        if not response.streaming:
+            response.add_post_render_callback(
+                lambda response: self.user_cache.set(response.content, *key)
+            )
+        return response
+
+
+class NoteSlugMixin:
+    """Сохраняет форму заметки, превращая конфликт slug-а в ошибку поля."""
+
+    def form_valid(self, form):
+        try:
+            self.object = write(form.save)
+        except IntegrityError as error:
+            if not is_slug_conflict(error):
+                raise
+            form.add_slug_conflict()
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
 
-class NoteCreate(NoteBase, generic.CreateView):
+class NoteCreate(NoteBase, NoteSlugMixin, generic.CreateView):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteImport(NoteBase, generic.FormView):
+    """Импорт заметок из файла."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        result = import_notes(
+            upload,
+            self.request.user,
+            detect_format(upload.name),
+            batch_size=settings.NOTES_IMPORT_BATCH_SIZE,
+        )
+        return self.render_to_response(
+            self.get_context_data(form=form, result=result)
+        )
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя в файл."""
+
+    def get(self, request, fmt):
+        if fmt not in CONTENT_TYPES:
+            raise Http404('Неизвестный формат выгрузки.')
+        response = StreamingHttpResponse(
+            stream_export(
+                self.get_queryset(),
+                fmt,
+                settings.NOTES_EXPORT_CHUNK_SIZE,
+                label=request.user.username,
+            ),
+            content_type=CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{fmt}"'
+        )
+        return response
+
+
+class NoteBatch(NoteBase, generic.View):
+    """JSON API: пакет операций create/update/delete одним запросом.
+
+    Тело запроса — {"operations": [...]}, см. notes.batch. CSRF
+    проверяется как у форм: токен из cookie передаётся в заголовке
+    X-CSRFToken, получать его достаточно один раз за сессию.
+    """
+    raise_exception = True
+
+    def post(self, request):
+        try:
+            operations = json.loads(request.body)['operations']
+        except (ValueError, TypeError, KeyError):
+            return self.error('Ожидается JSON вида {"operations": [...]}.')
+        if not isinstance(operations, list):
+            return self.error('Поле operations должно быть списком.')
+        limit = settings.NOTES_BATCH_MAX_OPERATIONS
+        if len(operations) > limit:
+            return self.error(f'Не больше {limit} операций в одном запросе.')
+        result = write(run_batch, operations, request.user)
+        return JsonResponse(result.as_dict())
+
+    def error(self, message):
+        return JsonResponse({'error': message}, status=400)
+
+
+class NoteUpdate(NoteBase, NoteSlugMixin, generic.UpdateView):
     """Редактирование заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
@@ -48,12 +172,175 @@ class NoteDelete(NoteBase, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
 
+    def form_valid(self, form):
+        write(self.object.delete)
+        return HttpResponseRedirect(self.get_success_url())
+
 
-class NotesList(NoteBase, generic.ListView):
+class NotesList(
+    ReplicaReadMixin, NoteBase, ConditionalGetMixin, CachedPageMixin,
+    generic.ListView,
+):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        """Списку нужны только id, заголовок и slug, не текст."""
+        return super().get_queryset().summaries()
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_PAGE_SIZE
+
+    def get_validators(self):
+        """ETag страницы — id и даты изменения её заметок.
+
+        Last-Modified не отдаётся: после удаления заметки самая свежая
+        дата изменения на странице может стать только старше.
+        """
+        page_size = settings.NOTES_PAGE_SIZE
+        paginator = KeysetPaginator(
+            self.get_queryset().values_list('pk', 'updated_at'), page_size
+        )
+        page = paginator.get_page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return page_parts(page, page_size), None
+
+    def paginate_queryset(self, queryset, page_size):
+        """Курсорная пагинация: страница задаётся параметром after/before."""
+        paginator = KeysetPaginator(queryset, page_size)
+        after = parse_cursor(self.request.GET.get('after'))
+        before = parse_cursor(self.request.GET.get('before'))
+        page = self.user_cache.get_or_set(
+            partial(paginator.get_page, after=after, before=before),
+            'list', page_size, after, before,
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
 
-class NoteDetail(NoteBase, generic.DetailView):
-    """Заметка подробно."""
+
+class NoteDetail(
+    ReplicaReadMixin, NoteBase, ConditionalGetMixin, CachedPageMixin,
+    generic.DetailView,
+):
+    """Заметка подробно.
+
+    В режиме NOTES_DETAIL_STREAMING текст не загружается вместе
+    с заметкой: короткий дочитывается одним запросом, а длинный
+    отдаётся потоком порциями (см. notes.streaming).
+    """
     template_name = 'notes/detail.html'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if settings.NOTES_DETAIL_STREAMING:
+            queryset = queryset.defer('text')
+        return queryset
+
+    def get_validators(self):
+        found = list(
+            self.get_queryset().filter(slug=self.kwargs['slug'])
+            .values_list('updated_at', flat=True)[:1]
+        )
+        if not found:
+            return None
+        updated_at = found[0]
+        return ['detail', self.kwargs['slug'], updated_at.isoformat()], (
+            updated_at
+        )
+
+    def get_object(self, queryset=None):
+        return self.user_cache.get_or_set(
+            partial(super().get_object, queryset), 'note', self.kwargs['slug']
+        )
+
+    def render_to_response(self, context, **response_kwargs):
+        if not settings.NOTES_DETAIL_STREAMING:
+            return super().render_to_response(context, **response_kwargs)
+        text = open_text(self.object)
+        if text is None:
+            return super().render_to_response(context, **response_kwargs)
+        if text.size < settings.NOTES_DETAIL_STREAM_THRESHOLD:
+            self.object.text = text.read()
+            return super().render_to_response(context, **response_kwargs)
+        return stream_page(
+            self.request, self.get_template_names(), context, text,
+            settings.NOTES_DETAIL_STREAM_CHUNK_SIZE,
+        )
+
+
+class NoteHistoryMixin(NoteBase):
+    """Страницы истории: заметка из URL загружается без текста."""
+
+    @cached_property
+    def note(self):
+        return get_object_or_404(
+            super().get_queryset().summaries(), slug=self.kwargs['slug']
+        )
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(note=self.note, **kwargs)
+
+
+class NoteHistory(ReplicaReadMixin, NoteHistoryMixin, generic.ListView):
+    """Список версий заметки; тексты версий не загружаются."""
+    template_name = 'notes/history.html'
+
+    def get_queryset(self):
+        return NoteRevision.objects.for_note(self.note).summaries()
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class NoteRevisionDetail(
+    ReplicaReadMixin, NoteHistoryMixin, generic.DetailView,
+):
+    """Версия заметки с восстановленным текстом."""
+    template_name = 'notes/revision.html'
+    context_object_name = 'revision'
+
+    def get_object(self, queryset=None):
+        revision = get_object_or_404(
+            NoteRevision.objects.for_note(self.note).summaries(),
+            number=self.kwargs['number'],
+        )
+        revision.text = revision_text(revision)
+        return revision
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        """Ищет только среди заметок текущего пользователя."""
+        self.query = self.request.GET.get('q', '').strip()
+        return search_notes(
+            self.request.user, self.query, settings.NOTES_SEARCH_LIMIT
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
+
+
+class Metrics(generic.View):
+    """Метрики в текстовом формате Prometheus (NOTES_METRICS=1)."""
+
+    def get(self, request, *args, **kwargs):
+        if not settings.NOTES_METRICS:
+            raise Http404
+        return HttpResponse(
+            metrics.REGISTRY.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
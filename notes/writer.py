@@ -0,0 +1,162 @@
+"""Очередь записи заметок с групповым коммитом.
+
+SQLite пропускает только одного писателя, поэтому при всплеске записей
+запросы стоят в очереди за блокировкой базы. Очередь отдаёт все записи
+процесса одному потоку: он забирает накопившиеся задания и выполняет
+их одной транзакцией, каждое в своей точке сохранения, так что ошибка
+одного задания не откатывает остальные. Результат или исключение
+возвращается ожидающему запросу после коммита.
+
+Включается настройкой NOTES_WRITE_QUEUE. Очередь своя у каждого
+процесса: между процессами записи по-прежнему разделяет SQLite.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Сигнал потоку записи завершиться.
+STOP = object()
+
+
+class WriteQueue:
+    """Единственный поток записи, объединяющий задания в транзакции."""
+
+    def __init__(self, batch_size, batch_delay=0):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.jobs = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.batches = 0
+        self.committed = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='notes-writer', daemon=True
+                )
+                self.thread.start()
+
+    def stop(self):
+        """Дожидается выполнения поставленных заданий и останавливает поток."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.jobs.put(STOP)
+            thread.join()
+
+    def submit(self, func, *args, **kwargs):
+        """Ставит запись в очередь; возвращает Future с её результатом."""
+        future = Future()
+        job = partial(func, *args, **kwargs)
+        if threading.current_thread() is self.thread:
+            # Запись изнутри другой записи уже идёт в транзакции пакета.
+            future.set_result(job())
+            return future
+        self.start()
+        self.jobs.put((future, job))
+        return future
+
+    def collect(self, first):
+        """Пакет: первое задание и всё, что накопилось за batch_delay."""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_delay
+        while len(batch) < self.batch_size:
+            try:
+                job = self.jobs.get(
+                    timeout=max(0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                break
+            if job is STOP:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def run(self):
+        stopping = False
+        try:
+            while not stopping:
+                job = self.jobs.get()
+                if job is STOP:
+                    break
+                batch, stopping = self.collect(job)
+                self.commit(batch)
+        finally:
+            connections.close_all()
+
+    def commit(self, batch):
+        """Выполняет пакет одной транзакцией и раздаёт результаты."""
+        close_old_connections()
+        results = []
+        try:
+            with transaction.atomic():
+                for future, job in batch:
+                    try:
+                        with transaction.atomic():
+                            results.append((future, job(), None))
+                    except Exception as error:
+                        results.append((future, None, error))
+        except Exception as error:
+            logger.exception('Пакет из %s записей не записан', len(batch))
+            for future, _ in batch:
+                future.set_exception(error)
+            return
+        self.batches += 1
+        self.committed += len(batch)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue(
+                settings.NOTES_WRITE_BATCH_SIZE,
+                settings.NOTES_WRITE_BATCH_DELAY,
+            )
+        return _writer
+
+
+def stop_writer():
+    """Останавливает общую очередь; следующая запись создаст новую."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def write(func, *args, **kwargs):
+    """Выполняет запись заметок: через очередь, если она включена."""
+    if not settings.NOTES_WRITE_QUEUE:
+        return func(*args, **kwargs)
+    return get_writer().submit(func, *args, **kwargs).result()
+
+
+async def awrite(func, *args, **kwargs):
+    """Асинхронная версия write: ожидание очереди не занимает поток."""
+    if not settings.NOTES_WRITE_QUEUE:
+        return await sync_to_async(func)(*args, **kwargs)
+    return await asyncio.wrap_future(
+        get_writer().submit(func, *args, **kwargs)
+    )
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.middleware.MetricsMiddleware',
+    'notes.middleware.ServerTimingMiddleware',
+    'notes.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -29,13 +33,16 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'notes.middleware.PrimaryPinMiddleware',
+    'notes.middleware.ShardMovedMiddleware',
 ]
 
 ROOT_URLCONF = 'yanote.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, который замеряет отрисовку (notes.timing).
+        'BACKEND': 'notes.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -56,9 +63,131 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Транзакция сразу берёт блокировку на запись. С отложенной
+            # транзакцией два пишущих соединения SQLite взаимно блокируются
+            # и одно из них падает с «database is locked», не дожидаясь
+            # освобождения базы.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Профиль базы: default или production (NOTES_DB_PROFILE=production).
+NOTES_DB_PROFILE = os.getenv('NOTES_DB_PROFILE', 'default')
+
+# Прагмы SQLite для production, выполняются при открытии соединения.
+# Время ожидания блокировки задаёт timeout из OPTIONS.
+NOTES_SQLITE_PRAGMAS = {
+    # Читатели не ждут писателя, писатель не ждёт читателей.
+    'journal_mode': 'WAL',
+    # В режиме WAL fsync нужен только при checkpoint: сбой питания
+    # может откатить последние транзакции, но не повредит базу.
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер кеша страниц в КиБ (64 МБ).
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+if NOTES_DB_PROFILE == 'production':
+    DATABASES['default']['OPTIONS']['init_command'] = ';'.join(
+        f'PRAGMA {name}={value}'
+        for name, value in NOTES_SQLITE_PRAGMAS.items()
+    )
+    # Соединение живёт между запросами, а не открывается на каждый.
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Реплики только для чтения: пути к копиям базы через запятую
+# (NOTES_DB_REPLICAS). Копии поддерживает внешняя репликация.
+for number, path in enumerate(
+    filter(None, os.getenv('NOTES_DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Алиасы реплик, с которых читают список, заметка и главная страница.
+NOTES_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# Шарды заметок: пути к дополнительным базам через запятую
+# (NOTES_DB_SHARDS). Заметки автора целиком лежат в одном шарде,
+# default — тоже шард. Перенос авторов — команда rebalance_shards.
+for number, path in enumerate(
+    filter(None, os.getenv('NOTES_DB_SHARDS', '').split(',')), start=1
+):
+    DATABASES[f'shard{number}'] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'NAME': path,
+    }
+
+NOTES_SHARDS = ['default'] + [
+    alias for alias in DATABASES if alias.startswith('shard')
+]
+
+DATABASE_ROUTERS = ['notes.routers.ShardRouter', 'notes.routers.ReplicaRouter']
+
+# Выбор реплики для запроса: random или round_robin.
+NOTES_REPLICA_SELECTION = os.getenv('NOTES_REPLICA_SELECTION', 'random')
+
+# Сколько секунд после записи пользователь читает только с основной
+# базы, чтобы увидеть свои изменения, пока реплика отстаёт.
+NOTES_REPLICA_PIN_SECONDS = 10
+
+# Кеш заметок: locmem по умолчанию, файловый — при NOTES_CACHE=file.
+# Для нескольких процессов подойдёт любой общий бэкенд Django.
+NOTES_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yanote-notes',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'notes',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'notes': NOTES_CACHE_BACKENDS[os.getenv('NOTES_CACHE', 'locmem')],
+}
+
+NOTES_CACHE_ALIAS = 'notes'
+
+# Время жизни записи кеша заметок в секундах.
+NOTES_CACHE_TIMEOUT = 300
+
+# Профиль сессий: db или cached (NOTES_SESSION_PROFILE=cached).
+# cached хранит сессии и пользователя request.user в кеше заметок,
+# поэтому нескольким процессам нужен общий бэкенд (NOTES_CACHE).
+NOTES_SESSION_PROFILE = os.getenv('NOTES_SESSION_PROFILE', 'db')
+
+# Как долго request.user берётся из кеша, в секундах.
+NOTES_USER_CACHE_TIMEOUT = 60
+
+# Как часто продление сессии записывается в базу, в секундах.
+NOTES_SESSION_TOUCH_INTERVAL = 300
+
+if NOTES_SESSION_PROFILE == 'cached':
+    SESSION_ENGINE = 'notes.sessions'
+    SESSION_CACHE_ALIAS = NOTES_CACHE_ALIAS
+    # Срок сессии продлевается на каждом запросе (см. notes.sessions).
+    SESSION_SAVE_EVERY_REQUEST = True
+    # ModelBackend остаётся для сессий, открытых до включения профиля.
+    AUTHENTICATION_BACKENDS = [
+        'notes.auth.CachedModelBackend',
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +216,129 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Количество заметок на одной странице списка.
+NOTES_PAGE_SIZE = 50
+
+# Асинхронные представления заметок (notes.async_views) для ASGI.
+NOTES_ASYNC_VIEWS = os.getenv('NOTES_ASYNC_VIEWS') == '1'
+
+# Максимальное количество результатов полнотекстового поиска.
+NOTES_SEARCH_LIMIT = 50
+
+# Сколько транслитераций заголовков держать в LRU-кеше.
+NOTES_SLUG_CACHE_SIZE = 10000
+
+# Количество заметок в одной транзакции при импорте.
+NOTES_IMPORT_BATCH_SIZE = 1000
+
+# Сколько заметок выгрузка читает из базы за один раз.
+NOTES_EXPORT_CHUNK_SIZE = 500
+
+# Наибольшее количество операций в одном запросе к пакетному API.
+NOTES_BATCH_MAX_OPERATIONS = 1000
+
+# Очередь записи с групповым коммитом (notes.writer).
+NOTES_WRITE_QUEUE = os.getenv('NOTES_WRITE_QUEUE') == '1'
+
+# Сколько записей очередь объединяет в одну транзакцию.
+NOTES_WRITE_BATCH_SIZE = 200
+
+# Сколько секунд ждать новых записей, прежде чем закрыть пакет.
+NOTES_WRITE_BATCH_DELAY = 0
+
+# Сжатие длинных текстов заметок в SQLite: off, zlib или zstd
+# (NOTES_TEXT_COMPRESSION). Для zstd нужен пакет zstandard.
+# Уже сохранённые заметки пересжимает команда compress_notes, она же
+# переводит поисковый индекс на схему со сжатием или без. Включая
+# сжатие, её запускают с новым значением до перезапуска сервера,
+# выключая — после: иначе сжатые строки попадут в индекс без сжатия.
+NOTES_TEXT_COMPRESSION = os.getenv('NOTES_TEXT_COMPRESSION', 'off')
+
+# С какого размера текста в байтах заметка хранится сжатой.
+NOTES_TEXT_COMPRESSION_THRESHOLD = 4096
+
+# Потоковая отдача длинных заметок на странице заметки
+# (NOTES_DETAIL_STREAMING=1, только SQLite).
+NOTES_DETAIL_STREAMING = os.getenv('NOTES_DETAIL_STREAMING') == '1'
+
+# С какого размера хранимого текста в байтах заметка отдаётся потоком.
+NOTES_DETAIL_STREAM_THRESHOLD = 1024 * 1024
+
+# Сколько байт текста читать из базы за один раз.
+NOTES_DETAIL_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Каждая какая версия заметки хранится полным текстом, а не дельтой.
+# Столько же, без одной, дельт применяется при восстановлении версии.
+NOTES_REVISION_SNAPSHOT_INTERVAL = 20
+
+# Через сколько дней prune_revisions удаляет старые версии заметок.
+NOTES_REVISION_MAX_AGE_DAYS = 180
+
+# Сколько последних версий каждой заметки не удаляется никогда.
+NOTES_REVISION_KEEP = 10
+
+# Доля запросов, для которых замеряются SQL, представление и шаблон
+# (заголовок Server-Timing и журнал notes.timing). 0 — замеры выключены,
+# в продакшене достаточно 0.01 (NOTES_TIMING_SAMPLE_RATE=0.01).
+NOTES_TIMING_SAMPLE_RATE = float(os.getenv('NOTES_TIMING_SAMPLE_RATE', '0'))
+
+# Сколько одинаковых SQL-запросов за запрос считать признаком N+1.
+NOTES_TIMING_REPEAT_THRESHOLD = 5
+
+# Профилирование части запросов (notes.profiling): cprofile или sampler.
+NOTES_PROFILER = os.getenv('NOTES_PROFILER', 'cprofile')
+
+# Доля запросов, которые профилируются; 0 — профилирование выключено.
+NOTES_PROFILE_SAMPLE_RATE = float(os.getenv('NOTES_PROFILE_SAMPLE_RATE', '0'))
+
+# Маршруты, запросы к которым профилируются с этой долей
+# (NOTES_PROFILE_URL_NAMES=notes:add,notes:list); пусто — все маршруты.
+NOTES_PROFILE_URL_NAMES = list(
+    filter(None, os.getenv('NOTES_PROFILE_URL_NAMES', '').split(','))
+)
+
+# Запрос с заголовком X-Notes-Profile, равным токену, профилируется
+# всегда, но в пределах лимитов. Пустой токен отключает заголовок.
+NOTES_PROFILE_TOKEN = os.getenv('NOTES_PROFILE_TOKEN', '')
+
+# Каталог профилей; в нём остаются только новейшие файлы.
+NOTES_PROFILE_DIR = os.getenv(
+    'NOTES_PROFILE_DIR', str(BASE_DIR / '.cache' / 'profiles')
+)
+
+# Сколько запросов в минуту может профилировать один процесс.
+# Одновременно профилируется не больше одного запроса.
+NOTES_PROFILE_MAX_PER_MINUTE = 6
+
+# Сколько файлов и байт профилей хранить.
+NOTES_PROFILE_MAX_FILES = 200
+NOTES_PROFILE_MAX_BYTES = 100 * 1024 * 1024
+
+# Раз в сколько секунд sampler снимает стек запроса.
+NOTES_PROFILE_SAMPLER_INTERVAL = 0.005
+
+# Метрики Prometheus на /metrics/ (NOTES_METRICS=1). Адрес стоит
+# закрыть от внешнего мира на прокси: его читает только Prometheus.
+NOTES_METRICS = os.getenv('NOTES_METRICS') == '1'
+
+# Каталог файлов метрик процессов (NOTES_METRICS_DIR): /metrics/
+# суммирует файлы всех воркеров. Каталог очищают перед запуском
+# сервера. Пусто — метрики только того процесса, что отвечает.
+NOTES_METRICS_DIR = os.getenv('NOTES_METRICS_DIR', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'notes': {
+            'handlers': ['console'],
+            'level': os.getenv('NOTES_LOG_LEVEL', 'INFO'),
+        },
+    },
+}